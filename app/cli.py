@@ -0,0 +1,548 @@
+"""
+Command-line tools for running the address pipeline without the HTTP stack.
+
+    python -m app.cli normalize in.csv out.csv --workers 8
+    python -m app.cli dedupe crm.csv clusters.csv --workers 8
+    python -m app.cli import-caps comuni.json --mongo
+    python -m app.cli import-streets stradario.csv
+    python -m app.cli seed
+    python -m app.cli rebuild-rollups
+    python -m app.cli build-snapshot
+"""
+import argparse
+import csv
+import heapq
+import io
+import json
+import os
+import sys
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from app.config import settings
+from app.services import dataset_files, streaming
+from app.services.cap_import import load_cap_source
+from app.services.dedupe import AddressDeduplicator, address_key, key_components
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.normalizer import AddressNormalizer
+from app.utils.street_types import register_street_types
+
+
+# Per-process normalizer, set up once by the pool initializer
+_normalizer: Optional[AddressNormalizer] = None
+
+DEDUPE_CSV_FIELDS = ["row", "cluster_id", "cluster_size", "canonical", "error"]
+
+
+def load_gazetteer(source: str) -> Gazetteer:
+    """Load the dataset once, from the bundled JSON files or from MongoDB."""
+    if source == "mongo":
+        from app.db import create_mongo_client, get_database
+        from app.repositories.caps_repo import CapsRepo
+        from app.repositories.comuni_repo import ComuniRepo
+        from app.repositories.synonyms_repo import SynonymsRepo
+
+        client = create_mongo_client()
+        try:
+            db = get_database(client)
+            return Gazetteer.from_repos(CapsRepo(db), ComuniRepo(db), SynonymsRepo(db))
+        finally:
+            client.close()
+    return Gazetteer.from_files()
+
+
+def _init_worker(gazetteer: Gazetteer) -> None:
+    global _normalizer
+    if settings.extra_street_types:
+        register_street_types(settings.extra_street_types)
+    _normalizer = AddressNormalizer(
+        GazetteerStore(gazetteer),
+        fuzzy_score_cutoff=settings.fuzzy_score_cutoff or None
+    )
+
+
+def _normalize_chunk(rows: List[streaming.Row], output_format: str):
+    """Normalize one chunk in a worker; returns (formatted output, issue counts, error count)."""
+    items = streaming.normalize_rows(_normalizer, rows)
+
+    issues = Counter()
+    errors = 0
+    for item in items:
+        if "error" in item:
+            errors += 1
+        issues.update(item.get("issues", []))
+
+    if output_format == streaming.CSV:
+        return streaming.format_csv_rows(items), issues, errors
+    return streaming.format_ndjson(items), issues, errors
+
+
+def _dedupe_chunk(rows: List[streaming.Row]) -> List[Tuple[int, Optional[tuple], Optional[str]]]:
+    """Normalize one chunk in a worker; returns (row, address key or None, error) per row."""
+    addresses = [address for _, address, error in rows if error is None]
+    extracted = iter(_normalizer.extract_components_batch(addresses))
+
+    keys = []
+    for row, _, error in rows:
+        if error is not None:
+            keys.append((row, None, error))
+            continue
+        components, issues = next(extracted)
+        keys.append((row, address_key(components, issues), None))
+    return keys
+
+
+def _map_chunks(gazetteer: Gazetteer, chunks: Iterator[List[streaming.Row]], workers: int, function, *args) -> Iterator:
+    """Apply ``function`` to each chunk in ``workers`` processes, yielding results in input order."""
+    if workers <= 1:
+        _init_worker(gazetteer)
+        for chunk in chunks:
+            yield function(chunk, *args)
+        return
+
+    # Keep a bounded window of chunks in flight so memory stays flat
+    # and results come back in input order.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(gazetteer,)
+    ) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(function, chunk, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _format_for_path(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    return streaming.CSV if path.lower().endswith(".csv") else streaming.NDJSON
+
+
+def _read_rows(source: TextIO, input_format: str, column: str) -> Iterator[streaming.Row]:
+    lines = streaming.iter_text_lines(source)
+
+    if input_format == streaming.CSV:
+        records = streaming.iter_csv_records(lines)
+        header = next(records, None)
+        if header is None:
+            return
+        parser = streaming.CsvRowParser(header, column)
+        parse = parser.parse
+    else:
+        records = lines
+        parse = lambda line: streaming.parse_ndjson_line(line, column)
+
+    row = 0
+    for record in records:
+        if not record.strip():
+            continue
+        row += 1
+        try:
+            yield row, parse(record), None
+        except ValueError as e:
+            yield row, record, str(e)
+
+
+def _chunked(rows: Iterator[streaming.Row], size: int) -> Iterator[List[streaming.Row]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_normalize(args) -> int:
+    input_format = _format_for_path(args.input, args.input_format)
+    output_format = _format_for_path(args.output, args.output_format)
+
+    load_start = time.time()
+    gazetteer = load_gazetteer(args.source)
+    print(
+        f"🗺️ Gazetteer {gazetteer.version} loaded from {gazetteer.source} "
+        f"in {time.time() - load_start:.2f}s",
+        file=sys.stderr
+    )
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+
+    total_rows = 0
+    total_errors = 0
+    issues = Counter()
+    start_time = time.time()
+
+    def write(result):
+        nonlocal total_errors
+        text, chunk_issues, chunk_errors = result
+        sink.write(text)
+        issues.update(chunk_issues)
+        total_errors += chunk_errors
+
+    try:
+        chunks = _chunked(_read_rows(source, input_format, args.column), args.chunk_size)
+        if output_format == streaming.CSV:
+            sink.write(streaming.format_csv_header())
+
+        def counted(chunks):
+            nonlocal total_rows
+            for chunk in chunks:
+                total_rows += len(chunk)
+                yield chunk
+
+        for result in _map_chunks(gazetteer, counted(chunks), args.workers, _normalize_chunk, output_format):
+            write(result)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    elapsed = time.time() - start_time
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    print(
+        f"✅ Normalized {total_rows} rows in {elapsed:.2f}s "
+        f"({rate:,.0f} rows/sec, {args.workers} workers, {total_errors} errors)",
+        file=sys.stderr
+    )
+    if issues:
+        print("📊 Issue distribution:", file=sys.stderr)
+        for issue, count in issues.most_common():
+            share = count / total_rows * 100 if total_rows else 0.0
+            print(f"   {issue:<36} {count:>10} ({share:.1f}%)", file=sys.stderr)
+    return 0
+
+
+def run_dedupe(args) -> int:
+    input_format = _format_for_path(args.input, args.input_format)
+    output_format = _format_for_path(args.output, args.output_format)
+
+    gazetteer = load_gazetteer(args.source)
+    print(f"🗺️ Gazetteer {gazetteer.version} loaded from {gazetteer.source}", file=sys.stderr)
+
+    # Only each record's compact address key is kept between the passes
+    deduplicator = AddressDeduplicator(args.similarity)
+    rows = array("I")
+    errors = {}
+    start_time = time.time()
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    try:
+        chunks = _chunked(_read_rows(source, input_format, args.column), args.chunk_size)
+        for keys in _map_chunks(gazetteer, chunks, args.workers, _dedupe_chunk):
+            for row, key, error in keys:
+                rows.append(row)
+                deduplicator.add(key)
+                if error is not None:
+                    errors[row] = error
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    normalized_at = time.time()
+
+    clustering = deduplicator.cluster()
+    del deduplicator
+    clustered_at = time.time()
+
+    formatter = AddressNormalizer(GazetteerStore(gazetteer))
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if output_format == streaming.CSV:
+            writer.writerow(DEDUPE_CSV_FIELDS)
+        for row, cluster_id in zip(rows, clustering.record_clusters):
+            item = {"row": row, "cluster_id": cluster_id or None, "cluster_size": None, "canonical": None}
+            if cluster_id:
+                item["cluster_size"] = clustering.sizes[cluster_id - 1]
+                item["canonical"] = formatter.format_address(key_components(clustering.representatives[cluster_id - 1]))
+            if row in errors:
+                item["error"] = errors[row]
+            if output_format == streaming.CSV:
+                writer.writerow(["" if item.get(field) is None else item[field] for field in DEDUPE_CSV_FIELDS])
+            else:
+                buffer.write(json.dumps(item, ensure_ascii=False) + "\n")
+            if buffer.tell() > 1 << 16:
+                sink.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+        sink.write(buffer.getvalue())
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+
+    duplicates = sum(size - 1 for size in clustering.sizes)
+    print(
+        f"✅ {len(rows)} rows in {len(clustering)} clusters, {duplicates} duplicates, {len(errors)} errors "
+        f"(normalize {normalized_at - start_time:.2f}s, cluster {clustered_at - normalized_at:.2f}s, "
+        f"write {time.time() - clustered_at:.2f}s)",
+        file=sys.stderr
+    )
+    if duplicates:
+        print("📊 Largest clusters:", file=sys.stderr)
+        for index in heapq.nlargest(5, range(len(clustering)), key=clustering.sizes.__getitem__):
+            if clustering.sizes[index] > 1:
+                canonical = formatter.format_address(key_components(clustering.representatives[index]))
+                print(f"   {index + 1:>8} {clustering.sizes[index]:>8}  {canonical}", file=sys.stderr)
+    return 0
+
+
+def _write_json(path: str, records: List[dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def run_import_caps(args) -> int:
+    try:
+        imported = load_cap_source(args.source, args.input_format)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if not imported.caps:
+        print("❌ No CAP records found", file=sys.stderr)
+        return 1
+
+    gazetteer = Gazetteer(imported.caps, imported.comuni, [], source="import")
+    stats = gazetteer.stats()
+    print(
+        f"📮 Parsed {stats['caps']} CAPs in {stats['cap_ranges']} ranges, "
+        f"{len(imported.caps)} CAP/comune pairs, {len(imported.comuni)} comuni "
+        f"({stats['geocoded_comuni']} with coordinates)",
+        file=sys.stderr
+    )
+    if imported.invalid_rows:
+        print(f"⚠️ Skipped {imported.invalid_rows} rows without a comune or CAP", file=sys.stderr)
+    if imported.skipped_homonyms:
+        print(
+            f"⚠️ {len(imported.skipped_homonyms)} homonymous comuni kept in caps only: "
+            f"{', '.join(imported.skipped_homonyms[:10])}",
+            file=sys.stderr
+        )
+
+    _write_json(args.caps_out, imported.caps)
+    _write_json(args.comuni_out, imported.comuni)
+    print(f"✅ Wrote {args.caps_out} and {args.comuni_out}", file=sys.stderr)
+
+    if args.mongo:
+        from app.db import create_mongo_client, get_database
+        from app.repositories.caps_repo import CapsRepo
+        from app.repositories.comuni_repo import ComuniRepo
+
+        client = create_mongo_client()
+        try:
+            db = get_database(client)
+            for name, repo, records in (("caps", CapsRepo(db), imported.caps), ("comuni", ComuniRepo(db), imported.comuni)):
+                repo.ensure_indexes()
+                changes = repo.sync(records)
+                print(
+                    f"✅ {name}: {changes['inserted']} inserted, {changes['updated']} updated, "
+                    f"{changes['deleted']} deleted, {changes['unchanged']} unchanged",
+                    file=sys.stderr
+                )
+        finally:
+            client.close()
+        print("🔄 POST /datasets/seed or restart the service to reload the in-memory gazetteer", file=sys.stderr)
+    return 0
+
+
+def run_import_streets(args) -> int:
+    from app.services.stradario import StreetIndex, load_street_source, stradario_path, write_street_index
+
+    if settings.extra_street_types:
+        register_street_types(settings.extra_street_types)
+    start_time = time.time()
+    try:
+        imported = load_street_source(args.source, args.input_format)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if not imported.rows:
+        print("❌ No street records found", file=sys.stderr)
+        return 1
+    if imported.invalid_rows:
+        print(f"⚠️ Skipped {imported.invalid_rows} rows without a comune or street", file=sys.stderr)
+
+    index = StreetIndex(imported.rows)
+    path = args.output or stradario_path()
+    write_street_index(index, path)
+    stats = index.stats()
+    print(
+        f"✅ Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB) in {time.time() - start_time:.2f}s: "
+        f"{stats['streets']} streets, {stats['rows']} CAP/civic ranges in {stats['comuni']} comuni",
+        file=sys.stderr
+    )
+    print("🔄 Rebuild the snapshot (build-snapshot) and restart, or POST /datasets/seed, to load it", file=sys.stderr)
+    return 0
+
+
+def run_seed(args) -> int:
+    """Create indexes and sync the MongoDB collections to the bundled dataset files."""
+    from app.db import create_mongo_client, get_database
+    from app.repositories.caps_repo import CapsRepo
+    from app.repositories.comuni_repo import ComuniRepo
+    from app.repositories.logs_repo import LogsRepo
+    from app.repositories.synonyms_repo import SynonymsRepo
+
+    caps_data, comuni_data, synonyms_data = dataset_files.load_all()
+    client = create_mongo_client()
+    try:
+        db = get_database(client)
+        LogsRepo(db).ensure_indexes()
+        for name, repo, records in (
+            ("caps", CapsRepo(db), caps_data),
+            ("comuni", ComuniRepo(db), comuni_data),
+            ("synonyms", SynonymsRepo(db), synonyms_data),
+        ):
+            repo.ensure_indexes()
+            if not records:
+                print(f"⚠️ {name}: no dataset file found, left unchanged", file=sys.stderr)
+                continue
+            changes = repo.sync(records)
+            print(
+                f"✅ {name}: {changes['inserted']} inserted, {changes['updated']} updated, "
+                f"{changes['deleted']} deleted, {changes['unchanged']} unchanged",
+                file=sys.stderr
+            )
+    except Exception as e:
+        print(f"❌ Seeding failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+def run_rebuild_rollups(args) -> int:
+    """Recompute the analytics rollups of past hours from the raw normalizations log (safe while serving)."""
+    from app.db import create_mongo_client, get_database
+    from app.repositories.logs_repo import LogsRepo
+
+    start_time = time.time()
+    client = create_mongo_client()
+    try:
+        repo = LogsRepo(get_database(client))
+        repo.ensure_indexes()
+        entries, cutoff = repo.rebuild_rollups()
+    except Exception as e:
+        print(f"❌ Rebuilding rollups failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    print(
+        f"✅ Rebuilt rollups before {cutoff}:00 UTC from {entries} log entries in {time.time() - start_time:.2f}s; "
+        f"later buckets are kept as written by the service",
+        file=sys.stderr
+    )
+    return 0
+
+
+def run_build_snapshot(args) -> int:
+    from app.services.snapshot import snapshot_path, write_snapshot
+
+    start_time = time.time()
+    try:
+        gazetteer = load_gazetteer(args.source)
+    except Exception as e:
+        print(f"❌ Loading the {args.source} dataset failed: {e}", file=sys.stderr)
+        return 1
+    path = args.output or snapshot_path()
+    metadata = write_snapshot(gazetteer, path)
+    print(
+        f"✅ Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB) in {time.time() - start_time:.2f}s: "
+        f"gazetteer {metadata['version']}, {metadata['caps']} CAPs, {metadata['comuni']} comuni, "
+        f"{metadata['synonyms']} synonyms",
+        file=sys.stderr
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    normalize = commands.add_parser("normalize", help="Normalize an NDJSON or CSV file of addresses")
+    normalize.add_argument("input", help="Input file (.csv or NDJSON), or - for stdin")
+    normalize.add_argument("output", help="Output file (.csv or NDJSON), or - for stdout")
+    normalize.add_argument("--source", choices=["files", "mongo"], default="files",
+                           help="Load the dataset from the bundled JSON files or MongoDB (default: files)")
+    normalize.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                           help="Worker processes (default: CPU count)")
+    normalize.add_argument("--chunk-size", type=int, default=2000, help="Rows per worker task (default: 2000)")
+    normalize.add_argument("--column", default="address", help="Field/column holding the address (default: address)")
+    normalize.add_argument("--input-format", choices=[streaming.NDJSON, streaming.CSV],
+                           help="Override input format detection by file extension")
+    normalize.add_argument("--output-format", choices=[streaming.NDJSON, streaming.CSV],
+                           help="Override output format detection by file extension")
+    normalize.set_defaults(handler=run_normalize)
+
+    dedupe = commands.add_parser("dedupe", help="Group an NDJSON or CSV file of addresses into duplicate clusters")
+    dedupe.add_argument("input", help="Input file (.csv or NDJSON), or - for stdin")
+    dedupe.add_argument("output", help="Output file (.csv or NDJSON) with one cluster assignment per row, or - for stdout")
+    dedupe.add_argument("--source", choices=["files", "mongo"], default="files",
+                        help="Load the dataset from the bundled JSON files or MongoDB (default: files)")
+    dedupe.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for normalization (default: CPU count)")
+    dedupe.add_argument("--chunk-size", type=int, default=2000, help="Rows per worker task (default: 2000)")
+    dedupe.add_argument("--column", default="address", help="Field/column holding the address (default: address)")
+    dedupe.add_argument("--similarity", type=float, default=settings.dedupe_street_similarity,
+                        help=f"Minimum street name similarity, 0-100 (default: DEDUPE_STREET_SIMILARITY, currently {settings.dedupe_street_similarity:g})")
+    dedupe.add_argument("--input-format", choices=[streaming.NDJSON, streaming.CSV],
+                        help="Override input format detection by file extension")
+    dedupe.add_argument("--output-format", choices=[streaming.NDJSON, streaming.CSV],
+                        help="Override output format detection by file extension")
+    dedupe.set_defaults(handler=run_dedupe)
+
+    import_caps = commands.add_parser("import-caps", help="Import the national comuni-CAP list (ISTAT/Poste export)")
+    import_caps.add_argument("source", help="JSON list of comuni (nome, sigla, cap) or CSV with comune/provincia/cap columns")
+    import_caps.add_argument("--input-format", choices=["json", "csv"],
+                             help="Override format detection by file extension")
+    import_caps.add_argument("--caps-out", default=dataset_files.CAPS_FILES[0],
+                             help="Where to write the caps dataset (default: the bundled comprehensive file)")
+    import_caps.add_argument("--comuni-out", default=dataset_files.COMUNI_FILES[0],
+                             help="Where to write the comuni dataset (default: the bundled comprehensive file)")
+    import_caps.add_argument("--mongo", action="store_true", help="Also sync the MongoDB caps and comuni collections to the imported data")
+    import_caps.set_defaults(handler=run_import_caps)
+
+    import_streets = commands.add_parser("import-streets", help="Compile a stradario export into the compact street index")
+    import_streets.add_argument("source", help="CSV or JSON rows with comune, provincia, street (or dug + street), cap and civic from/to/parity")
+    import_streets.add_argument("--input-format", choices=["json", "csv"],
+                                help="Override format detection by file extension")
+    import_streets.add_argument("--output", help="Index path (default: STRADARIO_PATH or app/data/stradario.bin)")
+    import_streets.set_defaults(handler=run_import_streets)
+
+    seed = commands.add_parser("seed", help="Create indexes and sync MongoDB to the bundled dataset files")
+    seed.set_defaults(handler=run_seed)
+
+    rebuild_rollups = commands.add_parser("rebuild-rollups", help="Recompute the GET /analytics rollups from the normalizations log")
+    rebuild_rollups.set_defaults(handler=run_rebuild_rollups)
+
+    build_snapshot = commands.add_parser("build-snapshot", help="Compile the datasets into a binary gazetteer snapshot")
+    build_snapshot.add_argument("--source", choices=["files", "mongo"], default="files",
+                                help="Build from the bundled JSON files or MongoDB (default: files)")
+    build_snapshot.add_argument("--output", help="Snapshot path (default: GAZETTEER_SNAPSHOT_PATH or app/data/gazetteer.snapshot)")
+    build_snapshot.set_defaults(handler=run_build_snapshot)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
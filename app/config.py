@@ -1,12 +1,51 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
     mongo_url: str = "mongodb://localhost:27017"
     mongo_db: str = "addresses"
+    # Shared connection pool used by all repositories
+    mongo_max_pool_size: int = 50
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int = 60000
+    mongo_wait_queue_timeout_ms: int = 2000
+    mongo_connect_timeout_ms: int = 5000
+    mongo_socket_timeout_ms: int = 10000
+    mongo_server_selection_timeout_ms: int = 5000
+    # How long a starting worker waits for MongoDB to answer a ping
+    mongo_startup_timeout_seconds: float = 10.0
     admin_token: str = "changeme"
     environment: str = "development"
+    # Worker processes forked by the pre-fork server (python -m app.server)
+    workers: int = 1
+    # Where the in-memory gazetteer is loaded from at startup: "snapshot",
+    # "mongo" or "files"; a missing snapshot falls back to mongo, then files
+    gazetteer_source: str = "snapshot"
+    # Prebuilt snapshot (python -m app.cli build-snapshot); defaults to app/data/gazetteer.snapshot
+    gazetteer_snapshot_path: Optional[str] = None
+    # Compact street index (python -m app.cli import-streets); defaults to app/data/stradario.bin
+    stradario_path: Optional[str] = None
+    # Minimum rapidfuzz score (0-100) to correct a misspelled comune; 0 disables
+    fuzzy_score_cutoff: float = 85.0
+    # Minimum rapidfuzz score (0-100) for two street names to count as duplicates
+    dedupe_street_similarity: float = 90.0
+    # Normalization result cache; 0 entries disables it
+    cache_max_entries: int = 50000
+    cache_ttl_seconds: float = 3600.0
+    # Background request log writer; overflow policy is drop_oldest, sample or block
+    log_queue_size: int = 10000
+    log_batch_size: int = 500
+    log_flush_interval_ms: int = 1000
+    log_overflow_policy: str = "drop_oldest"
+    log_sample_rate: float = 0.1
+    # Extra street types and their abbreviations, e.g.
+    # EXTRA_STREET_TYPES='{"Vicolo": ["vic."], "Contrada": ["c.da"], "Frazione": ["fraz."]}'
+    extra_street_types: Dict[str, List[str]] = {}
+    # Maximum number of items accepted by the batch endpoints (normalize, validate, reverse, dedupe)
+    batch_max_items: int = 10000
+    # Rows normalized per chunk by POST /normalize/stream
+    stream_chunk_size: int = 500
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from pymongo.database import Database
+
+from app.config import settings
+from app.services.metrics import MONGO_COMMAND_SECONDS
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so checkouts can be watched at runtime."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pools_created = 0
+        self.pools_cleared = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures = 0
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def pool_created(self, event):
+        self._incr("pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._incr("checkouts")
+
+    def connection_checked_in(self, event):
+        self._incr("checkins")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pools_created": self.pools_created,
+                "pools_cleared": self.pools_cleared,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "connections_open": self.connections_created - self.connections_closed,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checkouts - self.checkins,
+                "checkout_failures": self.checkout_failures,
+                "max_pool_size": settings.mongo_max_pool_size,
+                "min_pool_size": settings.mongo_min_pool_size,
+            }
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Feeds every MongoDB command's round trip time into the metrics registry."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.command_name, event.duration_micros / 1e6)
+
+
+def _client_options(listener: Optional[PoolStatsListener]) -> dict:
+    return {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "event_listeners": [CommandTimingListener()] + ([listener] if listener else []),
+    }
+
+
+def create_mongo_client(listener: Optional[PoolStatsListener] = None) -> MongoClient:
+    """Create a blocking MongoClient with the configured pool settings (CLI and scripts)."""
+    return MongoClient(settings.mongo_url, **_client_options(listener))
+
+
+def create_async_mongo_client(listener: Optional[PoolStatsListener] = None) -> AsyncIOMotorClient:
+    """Create the process-wide asyncio client used by the web app."""
+    return AsyncIOMotorClient(settings.mongo_url, **_client_options(listener))
+
+
+def get_database(client: MongoClient) -> Database:
+    return client[settings.mongo_db]
+
+
+def get_async_database(client: AsyncIOMotorClient) -> AsyncIOMotorDatabase:
+    return client[settings.mongo_db]
+
+
+async def wait_for_mongo(client: AsyncIOMotorClient, timeout_seconds: float) -> bool:
+    """Ping MongoDB until it answers or ``timeout_seconds`` pass; returns whether it is reachable."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+    delay = 0.05
+    while True:
+        remaining = deadline - loop.time()
+        try:
+            await asyncio.wait_for(client.admin.command("ping"), timeout=max(remaining, 0.01))
+            return True
+        except (PyMongoError, asyncio.TimeoutError):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
@@ -1,47 +1,85 @@
-from app.repositories.caps_repo import CapsRepo
-from app.repositories.comuni_repo import ComuniRepo
-from app.repositories.synonyms_repo import SynonymsRepo
-from app.repositories.logs_repo import LogsRepo
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException, Query, Request
+
+from app.db import PoolStatsListener
+from app.repositories.caps_repo import AsyncCapsRepo
+from app.repositories.comuni_repo import AsyncComuniRepo
+from app.repositories.synonyms_repo import AsyncSynonymsRepo
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.services.cache import NormalizationCache
+from app.services.gazetteer import GazetteerStore
 from app.services.normalizer import AddressNormalizer
+from app.services.tracing import RequestTrace
 from app.services.validators import AddressValidator
 
 
-def get_caps_repo() -> CapsRepo:
-    """Dependency to get CapsRepo instance."""
-    return CapsRepo()
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Verify admin token for protected endpoints."""
+    expected_token = os.getenv("ADMIN_TOKEN", "changeme")
+    if not x_admin_token or x_admin_token != expected_token:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+# Repositories and services are built once in the app lifespan (see app.main)
+# and shared by every request.
+
+def get_caps_repo(request: Request) -> AsyncCapsRepo:
+    """Dependency to get the shared AsyncCapsRepo instance."""
+    return request.app.state.caps_repo
+
+
+def get_comuni_repo(request: Request) -> AsyncComuniRepo:
+    """Dependency to get the shared AsyncComuniRepo instance."""
+    return request.app.state.comuni_repo
+
+
+def get_synonyms_repo(request: Request) -> AsyncSynonymsRepo:
+    """Dependency to get the shared AsyncSynonymsRepo instance."""
+    return request.app.state.synonyms_repo
+
+
+def get_logs_repo(request: Request) -> AsyncLogsRepo:
+    """Dependency to get the shared AsyncLogsRepo instance."""
+    return request.app.state.logs_repo
+
+
+def get_gazetteer_store(request: Request) -> GazetteerStore:
+    """Dependency to get the app-wide GazetteerStore."""
+    return request.app.state.gazetteer
 
 
-def get_comuni_repo() -> ComuniRepo:
-    """Dependency to get ComuniRepo instance."""
-    return ComuniRepo()
+def get_normalization_cache(request: Request) -> Optional[NormalizationCache]:
+    """Dependency to get the normalization cache (None when disabled)."""
+    return request.app.state.normalization_cache
 
 
-def get_synonyms_repo() -> SynonymsRepo:
-    """Dependency to get SynonymsRepo instance."""
-    return SynonymsRepo()
+def get_address_normalizer(request: Request) -> AddressNormalizer:
+    """Dependency to get the shared AddressNormalizer instance."""
+    return request.app.state.normalizer
 
 
-def get_logs_repo() -> LogsRepo:
-    """Dependency to get LogsRepo instance."""
-    return LogsRepo()
+def get_address_validator(request: Request) -> AddressValidator:
+    """Dependency to get the shared AddressValidator instance."""
+    return request.app.state.validator
 
 
-def get_address_normalizer(
-    caps_repo: CapsRepo = None,
-    synonyms_repo: SynonymsRepo = None
-) -> AddressNormalizer:
-    """Dependency to get AddressNormalizer instance."""
-    if caps_repo is None:
-        caps_repo = get_caps_repo()
-    if synonyms_repo is None:
-        synonyms_repo = get_synonyms_repo()
-    
-    return AddressNormalizer(caps_repo, synonyms_repo)
+def get_pool_stats(request: Request) -> PoolStatsListener:
+    """Dependency to get the MongoDB connection pool listener."""
+    return request.app.state.pool_stats
 
 
-def get_address_validator(caps_repo: CapsRepo = None) -> AddressValidator:
-    """Dependency to get AddressValidator instance."""
-    if caps_repo is None:
-        caps_repo = get_caps_repo()
-    
-    return AddressValidator(caps_repo)
\ No newline at end of file
+def get_request_trace(
+    trace: bool = Query(False, description="Return a detailed lookup trace (requires X-Admin-Token)"),
+    x_trace: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
+) -> RequestTrace:
+    """
+    Dependency timing the request for the Server-Timing header. A detailed
+    trace is opted into with ?trace=true or X-Trace: 1 and is admin-only.
+    """
+    detailed = trace or (x_trace or "").lower() in ("1", "true", "yes")
+    if detailed:
+        verify_admin_token(x_admin_token)
+    return RequestTrace(detailed=detailed)
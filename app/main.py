@@ -1,18 +1,115 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from app.routers import normalize, validate, datasets, health
+from app.routers import normalize, validate, autocomplete, reverse, dedupe, analytics, datasets, health, metrics
 from app.config import settings
+from app.db import PoolStatsListener, create_async_mongo_client, get_async_database, wait_for_mongo
+from app.repositories.caps_repo import AsyncCapsRepo
+from app.repositories.comuni_repo import AsyncComuniRepo
+from app.repositories.synonyms_repo import AsyncSynonymsRepo
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.services.cache import NormalizationCache
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.normalizer import AddressNormalizer
+from app.services.snapshot import load_snapshot
+from app.services.validators import AddressValidator
+from app.utils.street_types import register_street_types
+import asyncio
 import os
 
+
+async def prepare_datasets(app: FastAPI):
+    """Load the gazetteer and wait for MongoDB; seeding is an explicit admin/CLI step."""
+    source = settings.gazetteer_source
+    # Workers forked by the pre-fork server (app.server) inherit the master's gazetteer
+    preloaded = getattr(app.state, "preloaded_gazetteer", None)
+    
+    # The readiness wait overlaps with mapping the snapshot, which needs no database
+    mongo_ready, gazetteer = await asyncio.gather(
+        wait_for_mongo(app.state.mongo_client, settings.mongo_startup_timeout_seconds),
+        asyncio.to_thread(load_snapshot) if source == "snapshot" and preloaded is None else asyncio.sleep(0, preloaded)
+    )
+    if not mongo_ready:
+        print(f"⚠️ MongoDB not reachable after {settings.mongo_startup_timeout_seconds:.0f}s; serving from local data")
+    
+    if gazetteer is None and source in ("snapshot", "mongo") and mongo_ready:
+        try:
+            gazetteer = await Gazetteer.from_async_repos(
+                app.state.caps_repo, app.state.comuni_repo, app.state.synonyms_repo
+            )
+            if not gazetteer.stats()["caps"]:
+                print("⚠️ MongoDB has no CAP data; run `python -m app.cli seed` or POST /datasets/seed")
+                gazetteer = None
+        except Exception as e:
+            print(f"⚠️ Loading the gazetteer from MongoDB failed: {e}")
+            gazetteer = None
+    
+    # Fall back to the bundled files when nothing else is available
+    if gazetteer is None:
+        gazetteer = await asyncio.to_thread(Gazetteer.from_files)
+    app.state.gazetteer.swap(gazetteer)
+    
+    stats = gazetteer.stats()
+    print(f"🗺️ Gazetteer {stats['version']} loaded from {stats['source']}: {stats['caps']} CAPs, {stats['comuni']} comuni, {stats['synonyms']} synonyms")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the asyncio MongoDB pool, repositories and services once per worker."""
+    # Already registered by the pre-fork master
+    if settings.extra_street_types and getattr(app.state, "preloaded_gazetteer", None) is None:
+        register_street_types(settings.extra_street_types)
+    
+    pool_stats = PoolStatsListener()
+    client = create_async_mongo_client(pool_stats)
+    db = get_async_database(client)
+    
+    app.state.pool_stats = pool_stats
+    app.state.mongo_client = client
+    app.state.caps_repo = AsyncCapsRepo(db)
+    app.state.comuni_repo = AsyncComuniRepo(db)
+    app.state.synonyms_repo = AsyncSynonymsRepo(db)
+    app.state.logs_repo = AsyncLogsRepo(db)
+    
+    # In-memory dataset snapshot shared by all requests
+    app.state.gazetteer = GazetteerStore()
+    app.state.normalization_cache = (
+        NormalizationCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+        if settings.cache_max_entries > 0 else None
+    )
+    app.state.normalizer = AddressNormalizer(
+        app.state.gazetteer,
+        fuzzy_score_cutoff=settings.fuzzy_score_cutoff or None,
+        cache=app.state.normalization_cache
+    )
+    app.state.validator = AddressValidator(app.state.gazetteer)
+    
+    await prepare_datasets(app)
+    
+    # Request logs are written off the response path in batches
+    app.state.logs_repo.start_writer(
+        max_queue_size=settings.log_queue_size,
+        batch_size=settings.log_batch_size,
+        flush_interval_seconds=settings.log_flush_interval_ms / 1000,
+        overflow_policy=settings.log_overflow_policy,
+        sample_rate=settings.log_sample_rate
+    )
+    
+    yield
+    
+    await app.state.logs_repo.stop_writer()
+    client.close()
+
 # Create FastAPI app instance
 app = FastAPI(
     title="Italian Address Normalization Service",
     description="A microservice that normalizes messy Italian addresses into postal-correct, standardized format",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -32,61 +129,13 @@ if os.path.exists(static_dir):
 # Include routers
 app.include_router(normalize.router)
 app.include_router(validate.router)
+app.include_router(autocomplete.router)
+app.include_router(reverse.router)
+app.include_router(dedupe.router)
+app.include_router(analytics.router)
 app.include_router(datasets.router)
 app.include_router(health.router)
-
-# Auto-seed database on startup for development
-@app.on_event("startup")
-async def startup_event():
-    """Auto-seed database with Italian address data on startup."""
-    try:
-        import asyncio
-        from app.repositories.caps_repo import CapsRepo
-        from app.repositories.comuni_repo import ComuniRepo
-        from app.repositories.synonyms_repo import SynonymsRepo
-        import json
-        
-        # Wait a moment for MongoDB to be ready
-        await asyncio.sleep(2)
-        
-        caps_repo = CapsRepo()
-        comuni_repo = ComuniRepo()
-        synonyms_repo = SynonymsRepo()
-        
-        # Check if data already exists
-        if caps_repo.count() > 0:
-            print("📊 Database already seeded")
-            return
-        
-        print("🌱 Auto-seeding database with Italian address data...")
-        
-        # Seed CAPs data
-        data_dir = os.path.join(os.path.dirname(__file__), "..", "comprehensive_italian_caps.json")
-        if os.path.exists(data_dir):
-            with open(data_dir, "r", encoding="utf-8") as f:
-                caps_data = json.load(f)
-            caps_repo.insert_many(caps_data)
-        
-        # Seed comuni data
-        comuni_file = os.path.join(os.path.dirname(__file__), "data", "comprehensive_comuni.json")
-        if os.path.exists(comuni_file):
-            with open(comuni_file, "r", encoding="utf-8") as f:
-                comuni_data = json.load(f)
-            comuni_repo.insert_many(comuni_data)
-        
-        # Seed synonyms data
-        synonyms_file = os.path.join(os.path.dirname(__file__), "data", "comprehensive_synonyms.json")
-        if os.path.exists(synonyms_file):
-            with open(synonyms_file, "r", encoding="utf-8") as f:
-                synonyms_data = json.load(f)
-            synonyms_repo.insert_many(synonyms_data)
-        
-        print(f"✅ Auto-seeded: {caps_repo.count()} CAPs, {comuni_repo.count()} comuni, {synonyms_repo.count()} synonyms")
-        
-    except Exception as e:
-        print(f"⚠️ Auto-seeding failed: {e}")
-        # Continue startup even if seeding fails
-
+app.include_router(metrics.router)
 
 @app.get("/", tags=["root"])
 async def root():
@@ -102,8 +151,13 @@ async def root():
             "endpoints": {
                 "normalize": "/normalize - Normalize free-form addresses",
                 "validate": "/validate - Validate structured address components", 
+                "autocomplete": "/autocomplete - Comune/CAP suggestions for partial input",
+                "reverse": "/reverse - Nearest comuni for GPS coordinates",
+                "dedupe": "/dedupe - Duplicate clusters in a batch of addresses",
+                "analytics": "/analytics - Traffic, latency and issue rollups",
                 "datasets": "/datasets - Manage datasets",
                 "health": "/health - Health check",
+                "metrics": "/metrics - Prometheus metrics",
                 "docs": "/docs - API documentation"
             }
         }
@@ -119,8 +173,13 @@ async def api_info():
         "endpoints": {
             "normalize": "/normalize - Normalize free-form addresses",
             "validate": "/validate - Validate structured address components", 
+            "autocomplete": "/autocomplete - Comune/CAP suggestions for partial input",
+            "reverse": "/reverse - Nearest comuni for GPS coordinates",
+            "dedupe": "/dedupe - Duplicate clusters in a batch of addresses",
+            "analytics": "/analytics - Traffic, latency and issue rollups",
             "datasets": "/datasets - Manage datasets",
             "health": "/health - Health check",
+            "metrics": "/metrics - Prometheus metrics",
             "docs": "/docs - API documentation"
         }
     }
@@ -1,21 +1,39 @@
-from typing import Optional, List
-from pymongo import MongoClient
-import os
+import asyncio
+from typing import Dict, Optional, List
+from pymongo.database import Database
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.repositories.sync import plan_sync
+
+
+# Fields identifying a document when reloading the dataset
+CAPS_KEY = ("cap", "comune")
 
 
 class CapsRepo:
-    def __init__(self):
-        self.client = MongoClient(os.getenv("MONGO_URL", "mongodb://mongo:27017"))
-        self.db = self.client[os.getenv("MONGO_DB", "addresses")]
-        self.col = self.db["caps"]
-        self.col.create_index("cap", unique=True)
+    def __init__(self, db: Database):
+        self.col = db["caps"]
+
+    def ensure_indexes(self) -> None:
+        # CAPs shared by several comuni have one document per comune
+        if self.col.index_information().get("cap_1", {}).get("unique"):
+            self.col.drop_index("cap_1")
+        self.col.create_index("cap")
+        self.col.create_index([("cap", 1), ("comune", 1)], unique=True)
         self.col.create_index("comune")
 
     def find_by_cap(self, cap: str) -> Optional[dict]:
-        return self.col.find_one({"cap": cap}, {"_id": 0})
+        # Primary owner of a shared CAP is the first comune inserted
+        return self.col.find_one({"cap": cap}, {"_id": 0}, sort=[("_id", 1)])
+
+    def find_all_by_cap(self, cap: str) -> List[dict]:
+        return list(self.col.find({"cap": cap}, {"_id": 0}).sort("_id", 1))
 
     def find_by_comune(self, comune: str) -> List[dict]:
-        return list(self.col.find({"comune": comune}, {"_id": 0}))
+        return list(self.col.find({"comune": comune}, {"_id": 0}).sort("cap", 1))
+
+    def find_all(self) -> List[dict]:
+        return list(self.col.find({}, {"_id": 0}))
 
     def insert_many(self, caps_data: List[dict]) -> bool:
         try:
@@ -25,6 +43,13 @@ class CapsRepo:
             print(f"Error inserting caps data: {e}")
             return False
 
+    def sync(self, caps_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match caps_data with one unordered bulk_write."""
+        operations, counts = plan_sync(self.col.find({}), caps_data, CAPS_KEY)
+        if operations:
+            self.col.bulk_write(operations, ordered=False)
+        return counts
+
     def count(self) -> int:
         return self.col.count_documents({})
 
@@ -33,4 +58,58 @@ class CapsRepo:
             self.col.delete_many({})
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+class AsyncCapsRepo:
+    """CapsRepo on the asyncio driver, for use inside request handlers."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.col = db["caps"]
+
+    async def ensure_indexes(self) -> None:
+        # CAPs shared by several comuni have one document per comune
+        if (await self.col.index_information()).get("cap_1", {}).get("unique"):
+            await self.col.drop_index("cap_1")
+        await self.col.create_index("cap")
+        await self.col.create_index([("cap", 1), ("comune", 1)], unique=True)
+        await self.col.create_index("comune")
+
+    async def find_by_cap(self, cap: str) -> Optional[dict]:
+        return await self.col.find_one({"cap": cap}, {"_id": 0}, sort=[("_id", 1)])
+
+    async def find_all_by_cap(self, cap: str) -> List[dict]:
+        return await self.col.find({"cap": cap}, {"_id": 0}).sort("_id", 1).to_list(None)
+
+    async def find_by_comune(self, comune: str) -> List[dict]:
+        return await self.col.find({"comune": comune}, {"_id": 0}).sort("cap", 1).to_list(None)
+
+    async def find_all(self) -> List[dict]:
+        return await self.col.find({}, {"_id": 0}).to_list(None)
+
+    async def insert_many(self, caps_data: List[dict]) -> bool:
+        try:
+            await self.col.insert_many(caps_data)
+            return True
+        except Exception as e:
+            print(f"Error inserting caps data: {e}")
+            return False
+
+    async def sync(self, caps_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match caps_data with one unordered bulk_write."""
+        existing = await self.col.find({}).to_list(None)
+        # Diffing the national dataset takes a moment; keep it off the event loop
+        operations, counts = await asyncio.to_thread(plan_sync, existing, caps_data, CAPS_KEY)
+        if operations:
+            await self.col.bulk_write(operations, ordered=False)
+        return counts
+
+    async def count(self) -> int:
+        return await self.col.count_documents({})
+
+    async def clear(self) -> bool:
+        try:
+            await self.col.delete_many({})
+            return True
+        except Exception:
+            return False
@@ -1,13 +1,20 @@
-from typing import Optional, List
-from pymongo import MongoClient
-import os
+import asyncio
+from typing import Dict, Optional, List
+from pymongo.database import Database
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.repositories.sync import plan_sync
+
+
+# Fields identifying a document when reloading the dataset
+COMUNI_KEY = ("comune",)
 
 
 class ComuniRepo:
-    def __init__(self):
-        self.client = MongoClient(os.getenv("MONGO_URL", "mongodb://mongo:27017"))
-        self.db = self.client[os.getenv("MONGO_DB", "addresses")]
-        self.col = self.db["comuni"]
+    def __init__(self, db: Database):
+        self.col = db["comuni"]
+
+    def ensure_indexes(self) -> None:
         self.col.create_index("comune", unique=True)
         self.col.create_index("provincia")
 
@@ -17,6 +24,9 @@ class ComuniRepo:
     def find_by_provincia(self, provincia: str) -> List[dict]:
         return list(self.col.find({"provincia": provincia}, {"_id": 0}))
 
+    def find_all(self) -> List[dict]:
+        return list(self.col.find({}, {"_id": 0}))
+
     def insert_many(self, comuni_data: List[dict]) -> bool:
         try:
             self.col.insert_many(comuni_data)
@@ -25,6 +35,13 @@ class ComuniRepo:
             print(f"Error inserting comuni data: {e}")
             return False
 
+    def sync(self, comuni_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match comuni_data with one unordered bulk_write."""
+        operations, counts = plan_sync(self.col.find({}), comuni_data, COMUNI_KEY)
+        if operations:
+            self.col.bulk_write(operations, ordered=False)
+        return counts
+
     def count(self) -> int:
         return self.col.count_documents({})
 
@@ -33,4 +50,51 @@ class ComuniRepo:
             self.col.delete_many({})
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+class AsyncComuniRepo:
+    """ComuniRepo on the asyncio driver, for use inside request handlers."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.col = db["comuni"]
+
+    async def ensure_indexes(self) -> None:
+        await self.col.create_index("comune", unique=True)
+        await self.col.create_index("provincia")
+
+    async def find_by_comune(self, comune: str) -> Optional[dict]:
+        return await self.col.find_one({"comune": comune}, {"_id": 0})
+
+    async def find_by_provincia(self, provincia: str) -> List[dict]:
+        return await self.col.find({"provincia": provincia}, {"_id": 0}).to_list(None)
+
+    async def find_all(self) -> List[dict]:
+        return await self.col.find({}, {"_id": 0}).to_list(None)
+
+    async def insert_many(self, comuni_data: List[dict]) -> bool:
+        try:
+            await self.col.insert_many(comuni_data)
+            return True
+        except Exception as e:
+            print(f"Error inserting comuni data: {e}")
+            return False
+
+    async def sync(self, comuni_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match comuni_data with one unordered bulk_write."""
+        existing = await self.col.find({}).to_list(None)
+        # Diffing the national dataset takes a moment; keep it off the event loop
+        operations, counts = await asyncio.to_thread(plan_sync, existing, comuni_data, COMUNI_KEY)
+        if operations:
+            await self.col.bulk_write(operations, ordered=False)
+        return counts
+
+    async def count(self) -> int:
+        return await self.col.count_documents({})
+
+    async def clear(self) -> bool:
+        try:
+            await self.col.delete_many({})
+            return True
+        except Exception:
+            return False
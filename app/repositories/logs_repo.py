@@ -1,40 +1,383 @@
-from typing import Dict, Any, List
-from pymongo import MongoClient
-from datetime import datetime
-import os
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.database import Database
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from collections import deque
+from datetime import datetime, timedelta
+import asyncio
+import random
+import time
+
+from app.services.analytics import ROLLUP_GRANULARITIES, RollupBatch
+from app.services.metrics import LOG_WRITE_SECONDS
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "sample", "block")
+
+# Entries read per batch when rebuilding rollups from the raw log
+REBUILD_BATCH_SIZE = 5000
+# The rebuild stops at an hour boundary at least this far in the past, so
+# log batches still queued in running writers only touch later buckets
+REBUILD_SETTLE_SECONDS = 300
+
+
+def _rollup_operations(batch: RollupBatch) -> List[UpdateOne]:
+    # Applied with ordered=True: a rollup's conditional value updates rely on its upsert running first
+    return [UpdateOne(query, update, upsert=upsert) for query, update, upsert in batch.updates()]
+
+
+def _rollup_query(granularity: str, since: str, until: str) -> dict:
+    return {"granularity": granularity, "bucket": {"$gte": since, "$lte": until}}
+
+
+class BufferedLogWriter:
+    """
+    Bounded in-memory log queue drained by a background task.
+
+    Entries are written with insert_many in batches, flushed when a batch is
+    full or the flush interval elapses. When the queue is full the overflow
+    policy decides what gives: "drop_oldest" discards the oldest entry,
+    "sample" sheds load by admitting only a fraction of new entries once the
+    queue is half full, and "block" makes producers wait for space.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[dict]], Awaitable[None]],
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 1.0,
+        overflow_policy: str = "drop_oldest",
+        sample_rate: float = 0.1
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy: {overflow_policy}")
+        self._write_batch = write_batch
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+
+        self._buffer: deque = deque()
+        self._batch_ready = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the background task."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+
+    async def put(self, entry: dict) -> None:
+        if len(self._buffer) >= self.max_queue_size:
+            if self.overflow_policy == "block":
+                while len(self._buffer) >= self.max_queue_size:
+                    self._space_available.clear()
+                    await self._space_available.wait()
+            elif self.overflow_policy == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return
+        elif self.overflow_policy == "sample" and len(self._buffer) >= self.max_queue_size // 2:
+            if random.random() >= self.sample_rate:
+                self.dropped += 1
+                return
+
+        self._buffer.append(entry)
+        self.enqueued += 1
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            if len(self._buffer) < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._space_available.set()
+                started = time.perf_counter()
+                try:
+                    await self._write_batch(batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                    LOG_WRITE_SECONDS.observe("ok", time.perf_counter() - started)
+                except Exception as e:
+                    self.failed += len(batch)
+                    LOG_WRITE_SECONDS.observe("error", time.perf_counter() - started)
+                    print(f"Error writing log batch: {e}")
+                # Only keep draining partial batches when shutting down
+                if len(self._buffer) < self.batch_size and not self._stopping:
+                    break
+
+            if self._stopping and not self._buffer:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": len(self._buffer),
+            "max_queue_size": self.max_queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "overflow_policy": self.overflow_policy,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
 
 
 class LogsRepo:
-    def __init__(self):
-        self.client = MongoClient(os.getenv("MONGO_URL", "mongodb://mongo:27017"))
-        self.db = self.client[os.getenv("MONGO_DB", "addresses")]
-        self.col = self.db["normalizations"]
+    """
+    The normalizations log, plus the per-minute and per-hour rollups of it
+    (see app.services.analytics) updated with every write.
+    """
+
+    def __init__(self, db: Database):
+        self.col = db["normalizations"]
+        self.rollups = db["normalization_rollups"]
+        self.writer: Optional[BufferedLogWriter] = None
+
+    def ensure_indexes(self) -> None:
         self.col.create_index("timestamp")
+        self.rollups.create_index([("granularity", 1), ("bucket", 1)])
+
+    def start_writer(self, **options) -> None:
+        """Route save()/save_many() through a background BufferedLogWriter."""
+        self.writer = BufferedLogWriter(self._insert_batch, **options)
+        self.writer.start()
+
+    async def stop_writer(self) -> None:
+        if self.writer is not None:
+            await self.writer.stop()
+
+    async def _insert_batch(self, entries: List[dict]) -> None:
+        await asyncio.to_thread(self._insert_entries, entries)
+
+    def _insert_entries(self, entries: List[dict]) -> None:
+        self.col.insert_many(entries, ordered=False)
+        self._update_rollups(entries)
+
+    def _update_rollups(self, entries: List[dict]) -> None:
+        # A failed rollup update must not fail the log write; rebuild_rollups() repairs past buckets
+        try:
+            operations = _rollup_operations(RollupBatch().add_many(entries))
+            if operations:
+                self.rollups.bulk_write(operations, ordered=True)
+        except Exception as e:
+            print(f"Error updating log rollups: {e}")
+
+    @staticmethod
+    def _build_entry(log_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "input": log_data.get("input"),
+            "output": log_data.get("output"),
+            "timestamp": log_data.get("ts", datetime.utcnow().isoformat()),
+            "user_agent": log_data.get("user_agent"),
+            "latency_ms": log_data.get("latency_ms")
+        }
 
     async def save(self, log_data: Dict[str, Any]) -> bool:
+        if self.writer is not None and self.writer.running:
+            await self.writer.put(self._build_entry(log_data))
+            return True
         try:
-            log_entry = {
-                "input": log_data.get("input"),
-                "output": log_data.get("output"),
-                "timestamp": log_data.get("ts", datetime.utcnow().isoformat()),
-                "user_agent": log_data.get("user_agent"),
-                "latency_ms": log_data.get("latency_ms")
-            }
-            self.col.insert_one(log_entry)
+            self._insert_entries([self._build_entry(log_data)])
             return True
         except Exception as e:
             print(f"Error saving log: {e}")
             return False
 
+    async def save_many(self, logs_data: List[Dict[str, Any]]) -> bool:
+        if not logs_data:
+            return True
+        if self.writer is not None and self.writer.running:
+            for log_data in logs_data:
+                await self.writer.put(self._build_entry(log_data))
+            return True
+        try:
+            self._insert_entries([self._build_entry(log_data) for log_data in logs_data])
+            return True
+        except Exception as e:
+            print(f"Error saving logs: {e}")
+            return False
+
     def find_recent(self, limit: int = 100) -> List[dict]:
         return list(self.col.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit))
 
     def count(self) -> int:
         return self.col.count_documents({})
 
+    def find_rollups(self, granularity: str, since: str, until: str) -> List[dict]:
+        """Rollups whose bucket lies in [since, until] (bucket-prefix strings), oldest first."""
+        return list(self.rollups.find(_rollup_query(granularity, since, until), {"_id": 0}).sort("bucket", 1))
+
+    def rebuild_rollups(self, cutoff: Optional[datetime] = None) -> Tuple[int, str]:
+        """
+        Recompute the rollups of every entry logged before ``cutoff`` (default:
+        the start of the hour REBUILD_SETTLE_SECONDS ago) with one pass over
+        the raw log; returns the entries read and the cutoff used.
+
+        Safe while the service is writing logs: live writers only touch the
+        buckets of recent entries, and those from the cutoff on are left to
+        them. Rollups are built in a staging collection and then replace the
+        live ones document by document. A rename over the live collection
+        would lose increments applied between building and renaming.
+        """
+        if cutoff is None:
+            cutoff = datetime.utcnow() - timedelta(seconds=REBUILD_SETTLE_SECONDS)
+        cutoff_key = cutoff.replace(minute=0, second=0, microsecond=0).isoformat()
+        rebuilt_at = datetime.utcnow().isoformat()
+
+        staging = self.rollups.database[f"{self.rollups.name}_rebuild"]
+        staging.drop()
+        cursor = self.col.find(
+            {"timestamp": {"$lt": cutoff_key}},
+            {"timestamp": 1, "latency_ms": 1, "output": 1, "_id": 0},
+            batch_size=REBUILD_BATCH_SIZE
+        )
+        batch = RollupBatch()
+        total = 0
+        for total, entry in enumerate(cursor, start=1):
+            batch.add(entry)
+            if total % REBUILD_BATCH_SIZE == 0:
+                staging.bulk_write(_rollup_operations(batch), ordered=True)
+                batch = RollupBatch()
+        if batch:
+            staging.bulk_write(_rollup_operations(batch), ordered=True)
+
+        # Swap in the rebuilt rollups, then drop the old ones nothing replaced
+        operations = []
+        for rollup in staging.find({}):
+            rollup["rebuilt_at"] = rebuilt_at
+            operations.append(ReplaceOne({"_id": rollup["_id"]}, rollup, upsert=True))
+            if len(operations) >= REBUILD_BATCH_SIZE:
+                self.rollups.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            self.rollups.bulk_write(operations, ordered=False)
+        for granularity, length in ROLLUP_GRANULARITIES.items():
+            self.rollups.delete_many({
+                "granularity": granularity,
+                "bucket": {"$lt": cutoff_key[:length]},
+                "rebuilt_at": {"$ne": rebuilt_at},
+            })
+        staging.drop()
+        return total, cutoff_key[:ROLLUP_GRANULARITIES["hour"]]
+
     def clear(self) -> bool:
         try:
             self.col.delete_many({})
+            self.rollups.delete_many({})
+            return True
+        except Exception:
+            return False
+
+
+
+class AsyncLogsRepo:
+    """LogsRepo on the asyncio driver, for use inside request handlers."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.col = db["normalizations"]
+        self.rollups = db["normalization_rollups"]
+        self.writer: Optional[BufferedLogWriter] = None
+
+    async def ensure_indexes(self) -> None:
+        await self.col.create_index("timestamp")
+        await self.rollups.create_index([("granularity", 1), ("bucket", 1)])
+
+    def start_writer(self, **options) -> None:
+        """Route save()/save_many() through a background BufferedLogWriter."""
+        self.writer = BufferedLogWriter(self._insert_batch, **options)
+        self.writer.start()
+
+    async def stop_writer(self) -> None:
+        if self.writer is not None:
+            await self.writer.stop()
+
+    async def _insert_batch(self, entries: List[dict]) -> None:
+        await self.col.insert_many(entries, ordered=False)
+        await self._update_rollups(entries)
+
+    async def _update_rollups(self, entries: List[dict]) -> None:
+        try:
+            operations = _rollup_operations(RollupBatch().add_many(entries))
+            if operations:
+                await self.rollups.bulk_write(operations, ordered=True)
+        except Exception as e:
+            print(f"Error updating log rollups: {e}")
+
+    async def save(self, log_data: Dict[str, Any]) -> bool:
+        entry = LogsRepo._build_entry(log_data)
+        if self.writer is not None and self.writer.running:
+            await self.writer.put(entry)
+            return True
+        try:
+            await self._insert_batch([entry])
+            return True
+        except Exception as e:
+            print(f"Error saving log: {e}")
+            return False
+
+    async def save_many(self, logs_data: List[Dict[str, Any]]) -> bool:
+        if not logs_data:
+            return True
+        entries = [LogsRepo._build_entry(log_data) for log_data in logs_data]
+        if self.writer is not None and self.writer.running:
+            for entry in entries:
+                await self.writer.put(entry)
+            return True
+        try:
+            await self._insert_batch(entries)
+            return True
+        except Exception as e:
+            print(f"Error saving logs: {e}")
+            return False
+
+    async def find_recent(self, limit: int = 100) -> List[dict]:
+        return await self.col.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(None)
+
+    async def count(self) -> int:
+        return await self.col.count_documents({})
+
+    async def find_rollups(self, granularity: str, since: str, until: str) -> List[dict]:
+        return await self.rollups.find(_rollup_query(granularity, since, until), {"_id": 0}).sort("bucket", 1).to_list(None)
+
+    async def clear(self) -> bool:
+        try:
+            await self.col.delete_many({})
+            await self.rollups.delete_many({})
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+
+
+def plan_sync(existing: Iterable[dict], desired: Iterable[dict], key_fields: Sequence[str]) -> Tuple[List, Dict[str, int]]:
+    """
+    Diff a collection's documents against the desired dataset.
+
+    Returns the bulk_write operations that turn ``existing`` (documents with
+    their ``_id``) into ``desired``, plus expected inserted/updated/deleted/
+    unchanged counts. Documents are matched on ``key_fields``; unchanged
+    documents are left alone, so readers never see the collection empty.
+    """
+    def key(document: dict) -> tuple:
+        return tuple(document.get(name) for name in key_fields)
+
+    current = {}
+    duplicates = []
+    for document in existing:
+        document_key = key(document)
+        if document_key in current:
+            duplicates.append(document["_id"])
+        else:
+            current[document_key] = document
+
+    operations = []
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    seen = set()
+    for document in desired:
+        document_key = key(document)
+        if document_key in seen:
+            continue  # first entry wins, as with the in-memory gazetteer
+        seen.add(document_key)
+
+        stored = current.get(document_key)
+        if stored is None:
+            operations.append(InsertOne(dict(document)))
+            counts["inserted"] += 1
+        elif {name: value for name, value in stored.items() if name != "_id"} != document:
+            operations.append(ReplaceOne({"_id": stored["_id"]}, dict(document)))
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+
+    for document_key, stored in current.items():
+        if document_key not in seen:
+            operations.append(DeleteOne({"_id": stored["_id"]}))
+            counts["deleted"] += 1
+    for document_id in duplicates:
+        operations.append(DeleteOne({"_id": document_id}))
+        counts["deleted"] += 1
+
+    return operations, counts
@@ -1,13 +1,32 @@
+import asyncio
 from typing import Optional, List, Dict
-from pymongo import MongoClient
-import os
+from pymongo.database import Database
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.repositories.sync import plan_sync
+
+
+# Fields identifying a document when reloading the dataset
+SYNONYMS_KEY = ("type", "original")
+
+
+def _prepare_synonyms(synonyms_data: List[dict]) -> List[dict]:
+    """Synonym originals are stored lowercased for case-insensitive lookups."""
+    return [
+        {
+            "type": item["type"],
+            "original": item["original"].lower(),
+            "translation": item["translation"]
+        }
+        for item in synonyms_data
+    ]
 
 
 class SynonymsRepo:
-    def __init__(self):
-        self.client = MongoClient(os.getenv("MONGO_URL", "mongodb://mongo:27017"))
-        self.db = self.client[os.getenv("MONGO_DB", "addresses")]
-        self.col = self.db["synonyms"]
+    def __init__(self, db: Database):
+        self.col = db["synonyms"]
+
+    def ensure_indexes(self) -> None:
         self.col.create_index("type")
         self.col.create_index("original")
 
@@ -21,21 +40,24 @@ class SynonymsRepo:
         result = self.find_by_type_and_original(synonym_type, original.lower())
         return result["translation"] if result else original
 
+    def find_all(self) -> List[dict]:
+        return list(self.col.find({}, {"_id": 0}))
+
     def insert_many(self, synonyms_data: List[dict]) -> bool:
         try:
-            processed_data = []
-            for item in synonyms_data:
-                processed_data.append({
-                    "type": item["type"],
-                    "original": item["original"].lower(),
-                    "translation": item["translation"]
-                })
-            self.col.insert_many(processed_data)
+            self.col.insert_many(_prepare_synonyms(synonyms_data))
             return True
         except Exception as e:
             print(f"Error inserting synonyms data: {e}")
             return False
 
+    def sync(self, synonyms_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match synonyms_data with one unordered bulk_write."""
+        operations, counts = plan_sync(self.col.find({}), _prepare_synonyms(synonyms_data), SYNONYMS_KEY)
+        if operations:
+            self.col.bulk_write(operations, ordered=False)
+        return counts
+
     def count(self) -> int:
         return self.col.count_documents({})
 
@@ -44,4 +66,55 @@ class SynonymsRepo:
             self.col.delete_many({})
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+class AsyncSynonymsRepo:
+    """SynonymsRepo on the asyncio driver, for use inside request handlers."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.col = db["synonyms"]
+
+    async def ensure_indexes(self) -> None:
+        await self.col.create_index("type")
+        await self.col.create_index("original")
+
+    async def find_by_type_and_original(self, synonym_type: str, original: str) -> Optional[dict]:
+        return await self.col.find_one({"type": synonym_type, "original": original.lower()}, {"_id": 0})
+
+    async def find_all_by_type(self, synonym_type: str) -> List[dict]:
+        return await self.col.find({"type": synonym_type}, {"_id": 0}).to_list(None)
+
+    async def get_translation(self, synonym_type: str, original: str) -> str:
+        result = await self.find_by_type_and_original(synonym_type, original.lower())
+        return result["translation"] if result else original
+
+    async def find_all(self) -> List[dict]:
+        return await self.col.find({}, {"_id": 0}).to_list(None)
+
+    async def insert_many(self, synonyms_data: List[dict]) -> bool:
+        try:
+            await self.col.insert_many(_prepare_synonyms(synonyms_data))
+            return True
+        except Exception as e:
+            print(f"Error inserting synonyms data: {e}")
+            return False
+
+    async def sync(self, synonyms_data: List[dict]) -> Dict[str, int]:
+        """Update the collection in place to match synonyms_data with one unordered bulk_write."""
+        existing = await self.col.find({}).to_list(None)
+        # Diffing the national dataset takes a moment; keep it off the event loop
+        operations, counts = await asyncio.to_thread(plan_sync, existing, _prepare_synonyms(synonyms_data), SYNONYMS_KEY)
+        if operations:
+            await self.col.bulk_write(operations, ordered=False)
+        return counts
+
+    async def count(self) -> int:
+        return await self.col.count_documents({})
+
+    async def clear(self) -> bool:
+        try:
+            await self.col.delete_many({})
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Literal, Optional
+
+from app.schemas.address import AnalyticsResponse
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.services.analytics import (
+    BUCKET_PREFIX_LENGTHS, QUERY_GRANULARITIES, ROLLUP_GRANULARITIES, summarize, summarize_buckets
+)
+from app.deps import verify_admin_token, get_logs_repo
+
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+BUCKET_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Range returned when ``since`` is omitted
+DEFAULT_RANGES = {"minute": timedelta(hours=1), "hour": timedelta(days=1), "day": timedelta(days=30)}
+# Largest number of buckets one query may span (a day of minutes)
+MAX_BUCKETS = 1440
+
+
+def _parse_time(value: str, name: str, end_of_day: bool = False) -> datetime:
+    """
+    ISO 8601 date or datetime. Log timestamps are naive UTC, so aware values
+    are converted to match; a bare date ends the range at the day's last minute.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO 8601 date or datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59)
+    return parsed
+
+
+@router.get("", response_model=AnalyticsResponse)
+async def normalization_analytics(
+    granularity: Literal["minute", "hour", "day"] = Query("hour", description="Bucket size"),
+    since: Optional[str] = Query(None, description="Start of the range (ISO 8601 date or datetime, UTC when naive)"),
+    until: Optional[str] = Query(None, description="End of the range, inclusive (defaults to now)"),
+    top: int = Query(10, ge=1, le=100, description="Unknown CAPs/comuni listed per bucket"),
+    logs_repo: AsyncLogsRepo = Depends(get_logs_repo),
+    _: None = Depends(verify_admin_token)
+):
+    """
+    Normalization traffic per time bucket: request count, latency
+    percentiles, issue frequencies, confidence distribution and the most
+    frequent unknown CAPs and comuni, plus totals over the range.
+    Requires X-Admin-Token header with valid token.
+
+    Served from per-minute and per-hour rollups kept up to date as request
+    logs are written ("day" merges hourly rollups); the raw log is never
+    scanned. Buckets without traffic are omitted.
+    """
+    until = _parse_time(until, "until", end_of_day=True) if until is not None else datetime.utcnow()
+    since = (
+        _parse_time(since, "since") if since is not None
+        else until - DEFAULT_RANGES[granularity] + BUCKET_STEPS[granularity]
+    )
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if granularity == "day":
+        since = since.replace(hour=0, minute=0)
+        until = until.replace(hour=23, minute=59)
+    if (until - since) // BUCKET_STEPS[granularity] >= MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too large: more than {MAX_BUCKETS} {granularity} buckets; use a coarser granularity"
+        )
+
+    stored = QUERY_GRANULARITIES[granularity]
+    length = ROLLUP_GRANULARITIES[stored]
+    rollups = await logs_repo.find_rollups(stored, since.isoformat()[:length], until.isoformat()[:length])
+
+    return AnalyticsResponse(
+        granularity=granularity,
+        since=since.isoformat()[:BUCKET_PREFIX_LENGTHS[granularity]],
+        until=until.isoformat()[:BUCKET_PREFIX_LENGTHS[granularity]],
+        totals=summarize(rollups, top),
+        buckets=summarize_buckets(rollups, granularity, top)
+    )
@@ -0,0 +1,32 @@
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from app.schemas.address import AutocompleteResponse, AutocompleteSuggestion
+from app.services.autocomplete import MAX_SUGGESTIONS
+from app.services.gazetteer import GazetteerStore
+from app.deps import get_gazetteer_store
+
+
+router = APIRouter(prefix="/autocomplete", tags=["autocomplete"])
+
+
+@router.get("", response_model=AutocompleteResponse)
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100, description="Partial comune name, city synonym, CAP or province code"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="Maximum number of suggestions"),
+    provincia: Optional[str] = Query(None, pattern=r"^[A-Za-z]{2}$", description="Only suggest comuni in this province"),
+    gazetteer_store: GazetteerStore = Depends(get_gazetteer_store)
+):
+    """
+    Ranked comune/CAP/province suggestions for a partial input, e.g. as the
+    user types a city. Matching ignores case and accents ("forli" finds
+    Forlì) and follows city synonyms ("venic" finds Venezia). Served from
+    the in-memory prefix index only; no database access.
+    """
+    suggestions = gazetteer_store.current.autocomplete(q, limit, provincia)
+    return AutocompleteResponse(
+        query=q,
+        suggestions=[AutocompleteSuggestion(**asdict(suggestion)) for suggestion in suggestions],
+        count=len(suggestions)
+    )
@@ -1,104 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
-import json
-import os
+import asyncio
 
+from app.config import settings
 from app.schemas.address import SeedDataRequest
 from app.schemas.responses import SuccessResponse
-from app.repositories.caps_repo import CapsRepo
-from app.repositories.comuni_repo import ComuniRepo
-from app.repositories.synonyms_repo import SynonymsRepo
+from app.repositories.caps_repo import AsyncCapsRepo
+from app.repositories.comuni_repo import AsyncComuniRepo
+from app.repositories.synonyms_repo import AsyncSynonymsRepo
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.services import dataset_files
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.cache import NormalizationCache
+from app.services.snapshot import write_snapshot
+from app.services.reload import request_reload
+from app.deps import verify_admin_token, get_caps_repo, get_comuni_repo, get_synonyms_repo, get_logs_repo, get_gazetteer_store, get_normalization_cache
 
 
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
+# One reload at a time; concurrent diffs against the same collections would race
+_reload_lock = asyncio.Lock()
 
-def get_caps_repo() -> CapsRepo:
-    return CapsRepo()
 
-
-def get_comuni_repo() -> ComuniRepo:
-    return ComuniRepo()
-
-
-def get_synonyms_repo() -> SynonymsRepo:
-    return SynonymsRepo()
-
-
-def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
-    """Verify admin token for protected endpoints."""
-    expected_token = os.getenv("ADMIN_TOKEN", "changeme")
-    if not x_admin_token or x_admin_token != expected_token:
-        raise HTTPException(status_code=401, detail="Invalid admin token")
+async def _unchanged(repo) -> dict:
+    """Change counts for a collection left as is (its dataset file is missing or empty)."""
+    return {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": await repo.count()}
 
 
 @router.post("/seed", response_model=SuccessResponse)
 async def seed_datasets(
-    caps_repo: CapsRepo = Depends(get_caps_repo),
-    comuni_repo: ComuniRepo = Depends(get_comuni_repo),
-    synonyms_repo: SynonymsRepo = Depends(get_synonyms_repo),
+    caps_repo: AsyncCapsRepo = Depends(get_caps_repo),
+    comuni_repo: AsyncComuniRepo = Depends(get_comuni_repo),
+    synonyms_repo: AsyncSynonymsRepo = Depends(get_synonyms_repo),
+    logs_repo: AsyncLogsRepo = Depends(get_logs_repo),
+    gazetteer_store: GazetteerStore = Depends(get_gazetteer_store),
+    cache: Optional[NormalizationCache] = Depends(get_normalization_cache),
     _: None = Depends(verify_admin_token)
 ):
     """
     Seed the database with initial datasets.
     Requires X-Admin-Token header with valid token.
+    
+    Collections are updated incrementally: each one is diffed against the
+    dataset files and only changed documents are inserted, replaced or
+    deleted, in one unordered bulk_write, so they are never empty mid-reload.
+    Requests keep using the previous in-memory snapshot until the new one is
+    swapped in at the end. When workers boot from a snapshot, it is rewritten
+    so the next worker start picks up the new data. Under the pre-fork server
+    the master then reloads the data and replaces every worker.
     """
     try:
-        data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        
-        # Load and insert CAPs data - use comprehensive dataset
-        project_root = os.path.join(os.path.dirname(__file__), "..", "..")
-        caps_file = os.path.join(project_root, "comprehensive_italian_caps.json")
-        if os.path.exists(caps_file):
-            with open(caps_file, "r", encoding="utf-8") as f:
-                caps_data = json.load(f)
-            caps_repo.clear()  # Clear existing data
-            caps_repo.insert_many(caps_data)
-        else:
-            # Fallback to original small dataset
-            fallback_caps_file = os.path.join(data_dir, "seed_caps.json")
-            if os.path.exists(fallback_caps_file):
-                with open(fallback_caps_file, "r", encoding="utf-8") as f:
-                    caps_data = json.load(f)
-                caps_repo.clear()  # Clear existing data
-                caps_repo.insert_many(caps_data)
-        
-        # Load and insert comuni data - use comprehensive dataset
-        comprehensive_comuni_file = os.path.join(data_dir, "comprehensive_comuni.json")
-        if os.path.exists(comprehensive_comuni_file):
-            with open(comprehensive_comuni_file, "r", encoding="utf-8") as f:
-                comuni_data = json.load(f)
-            comuni_repo.clear()  # Clear existing data
-            comuni_repo.insert_many(comuni_data)
-        else:
-            # Fallback to original small dataset
-            fallback_comuni_file = os.path.join(data_dir, "seed_comuni.json")
-            if os.path.exists(fallback_comuni_file):
-                with open(fallback_comuni_file, "r", encoding="utf-8") as f:
-                    comuni_data = json.load(f)
-                comuni_repo.clear()  # Clear existing data
-                comuni_repo.insert_many(comuni_data)
-        
-        # Load and insert synonyms data - use comprehensive dataset
-        comprehensive_synonyms_file = os.path.join(data_dir, "comprehensive_synonyms.json")
-        if os.path.exists(comprehensive_synonyms_file):
-            with open(comprehensive_synonyms_file, "r", encoding="utf-8") as f:
-                synonyms_data = json.load(f)
-            synonyms_repo.clear()  # Clear existing data
-            synonyms_repo.insert_many(synonyms_data)
-        else:
-            # Fallback to original small dataset
-            fallback_synonyms_file = os.path.join(data_dir, "seed_synonyms.json")
-            if os.path.exists(fallback_synonyms_file):
-                with open(fallback_synonyms_file, "r", encoding="utf-8") as f:
-                    synonyms_data = json.load(f)
-                synonyms_repo.clear()  # Clear existing data
-                synonyms_repo.insert_many(synonyms_data)
-        
-        # Count loaded records
-        caps_count = caps_repo.count()
-        comuni_count = comuni_repo.count()
-        synonyms_count = synonyms_repo.count()
+        async with _reload_lock:
+            # Index DDL lives here rather than in every worker's start-up
+            await asyncio.gather(*(
+                repo.ensure_indexes()
+                for repo in (caps_repo, comuni_repo, synonyms_repo, logs_repo)
+            ))
+            
+            # Load datasets - comprehensive files with fallback to the small seed files
+            caps_data, comuni_data, synonyms_data = await asyncio.to_thread(dataset_files.load_all)
+            
+            # The three collections are independent, so reload them concurrently
+            pairs = ((caps_repo, caps_data), (comuni_repo, comuni_data), (synonyms_repo, synonyms_data))
+            caps_changes, comuni_changes, synonyms_changes = await asyncio.gather(*(
+                repo.sync(data) if data else _unchanged(repo)
+                for repo, data in pairs
+            ))
+            
+            # Publish a fresh in-memory snapshot of what was just written
+            gazetteer = await Gazetteer.from_async_repos(caps_repo, comuni_repo, synonyms_repo)
+            if gazetteer.version != gazetteer_store.current.version:
+                gazetteer_store.swap(gazetteer)
+                if cache is not None:
+                    cache.clear()
+                if settings.gazetteer_source == "snapshot":
+                    try:
+                        await asyncio.to_thread(write_snapshot, gazetteer)
+                    except OSError as e:
+                        print(f"⚠️ Could not refresh the gazetteer snapshot: {e}")
+                # Other workers of the pre-fork server still hold the old data
+                request_reload()
+            
+            # Count loaded records
+            caps_count, comuni_count, synonyms_count = await asyncio.gather(
+                caps_repo.count(), comuni_repo.count(), synonyms_repo.count()
+            )
         
         return SuccessResponse(
             success=True,
@@ -106,7 +93,11 @@ async def seed_datasets(
             data={
                 "caps_loaded": caps_count,
                 "comuni_loaded": comuni_count,
-                "synonyms_loaded": synonyms_count
+                "synonyms_loaded": synonyms_count,
+                "caps_changes": caps_changes,
+                "comuni_changes": comuni_changes,
+                "synonyms_changes": synonyms_changes,
+                "gazetteer_version": gazetteer.version
             }
         )
         
@@ -116,13 +107,18 @@ async def seed_datasets(
 
 @router.get("/stats", response_model=dict)
 async def get_dataset_stats(
-    caps_repo: CapsRepo = Depends(get_caps_repo),
-    comuni_repo: ComuniRepo = Depends(get_comuni_repo),
-    synonyms_repo: SynonymsRepo = Depends(get_synonyms_repo)
+    caps_repo: AsyncCapsRepo = Depends(get_caps_repo),
+    comuni_repo: AsyncComuniRepo = Depends(get_comuni_repo),
+    synonyms_repo: AsyncSynonymsRepo = Depends(get_synonyms_repo),
+    gazetteer_store: GazetteerStore = Depends(get_gazetteer_store)
 ):
     """Get statistics about loaded datasets."""
+    caps_count, comuni_count, synonyms_count = await asyncio.gather(
+        caps_repo.count(), comuni_repo.count(), synonyms_repo.count()
+    )
     return {
-        "caps_count": caps_repo.count(),
-        "comuni_count": comuni_repo.count(),
-        "synonyms_count": synonyms_repo.count()
+        "caps_count": caps_count,
+        "comuni_count": comuni_count,
+        "synonyms_count": synonyms_count,
+        "gazetteer": gazetteer_store.current.stats()
     }
\ No newline at end of file
@@ -0,0 +1,74 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List
+
+from app.config import settings
+from app.schemas.address import DedupeCluster, DedupeRecord, DedupeRequest, DedupeResponse
+from app.services.dedupe import AddressDeduplicator, key_components
+from app.services.normalizer import AddressNormalizer
+from app.deps import get_address_normalizer
+
+
+router = APIRouter(prefix="/dedupe", tags=["dedupe"])
+
+
+@router.post("", response_model=DedupeResponse)
+async def dedupe_addresses(
+    payload: DedupeRequest,
+    normalizer: AddressNormalizer = Depends(get_address_normalizer)
+):
+    """
+    Group a batch of free-form addresses into duplicate clusters.
+
+    Every address is normalized as by POST /normalize/batch; addresses that
+    normalize to the same street, civic number and comune, with matching or
+    missing CAPs and street names that differ only by small typos, share a
+    cluster. Each cluster is represented by its most frequent normalized
+    address. Clusters are numbered from 1 in order of first appearance.
+    Extraction and clustering run in a worker thread so a large batch does
+    not stall the event loop for other requests.
+    """
+    if len(payload.addresses) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.addresses)} addresses (max {settings.batch_max_items})"
+        )
+
+    return await asyncio.to_thread(_dedupe, normalizer, payload.addresses)
+
+
+def _dedupe(normalizer: AddressNormalizer, addresses: List[str]) -> DedupeResponse:
+    extracted = normalizer.extract_components_batch(addresses)
+    deduplicator = AddressDeduplicator(settings.dedupe_street_similarity)
+    deduplicator.add_results(extracted)
+    clustering = deduplicator.cluster()
+
+    results = []
+    members: Dict[int, List[int]] = {}
+    for index, ((components, _), cluster_id) in enumerate(zip(extracted, clustering.record_clusters)):
+        results.append(DedupeRecord(
+            index=index,
+            cluster_id=cluster_id or None,
+            formatted=normalizer.format_address(components)
+        ))
+        if cluster_id:
+            members.setdefault(cluster_id, []).append(index)
+
+    clusters = []
+    for cluster_id, key in enumerate(clustering.representatives, start=1):
+        components = key_components(key)
+        clusters.append(DedupeCluster(
+            cluster_id=cluster_id,
+            representative=normalizer.format_address(components),
+            components=components,
+            size=clustering.sizes[cluster_id - 1],
+            members=members[cluster_id]
+        ))
+
+    return DedupeResponse(
+        results=results,
+        clusters=clusters,
+        count=len(results),
+        cluster_count=len(clusters),
+        duplicate_count=sum(size - 1 for size in clustering.sizes)
+    )
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from typing import Optional
 from app.schemas.address import HealthResponse
+from app.db import PoolStatsListener
+from app.deps import get_pool_stats, get_normalization_cache, get_logs_repo
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.services.cache import NormalizationCache
 
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -8,4 +13,26 @@ router = APIRouter(prefix="/health", tags=["health"])
 @router.get("", response_model=HealthResponse)
 async def health_check():
     """Simple health check endpoint."""
-    return HealthResponse(status="ok")
\ No newline at end of file
+    return HealthResponse(status="ok")
+
+
+@router.get("/pool", response_model=dict)
+async def pool_stats(pool_stats: PoolStatsListener = Depends(get_pool_stats)):
+    """MongoDB connection pool counters (checkouts, open connections, failures)."""
+    return pool_stats.snapshot()
+
+
+@router.get("/cache", response_model=dict)
+async def cache_stats(cache: Optional[NormalizationCache] = Depends(get_normalization_cache)):
+    """Normalization cache counters (hits, misses, evictions, size)."""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@router.get("/logs", response_model=dict)
+async def log_writer_stats(logs_repo: AsyncLogsRepo = Depends(get_logs_repo)):
+    """Background log writer counters (queued, written, dropped, failed)."""
+    if logs_repo.writer is None:
+        return {"running": False}
+    return logs_repo.writer.stats()
\ No newline at end of file
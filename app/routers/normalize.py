@@ -1,42 +1,45 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
+from typing import List, Optional
+import asyncio
 import time
 
-from app.schemas.address import NormalizeRequest, NormalizeResponse
+from app.config import settings
+from app.schemas.address import NormalizeRequest, NormalizeResponse, BatchNormalizeRequest, BatchNormalizeResponse
 from app.services.normalizer import AddressNormalizer
-from app.repositories.caps_repo import CapsRepo
-from app.repositories.synonyms_repo import SynonymsRepo
-from app.repositories.logs_repo import LogsRepo
+from app.services import streaming
+from app.services.tracing import RequestTrace
+from app.repositories.logs_repo import AsyncLogsRepo
+from app.deps import get_address_normalizer, get_logs_repo, get_request_trace
 
 
 router = APIRouter(prefix="/normalize", tags=["normalize"])
 
 
-def get_caps_repo() -> CapsRepo:
-    return CapsRepo()
-
-
-def get_synonyms_repo() -> SynonymsRepo:
-    return SynonymsRepo()
-
-
-def get_logs_repo() -> LogsRepo:
-    return LogsRepo()
-
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for handlers that keep reading the request body while
+    responding. The stock response listens for disconnects on receive(),
+    which would consume the body messages the handler still needs; a client
+    disconnect surfaces through request.stream() instead.
+    """
 
-def get_normalizer(
-    caps_repo: CapsRepo = Depends(get_caps_repo),
-    synonyms_repo: SynonymsRepo = Depends(get_synonyms_repo)
-) -> AddressNormalizer:
-    return AddressNormalizer(caps_repo, synonyms_repo)
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
 
 
 @router.post("", response_model=NormalizeResponse)
 async def normalize_address(
     payload: NormalizeRequest,
     request: Request,
-    normalizer: AddressNormalizer = Depends(get_normalizer),
-    logs_repo: LogsRepo = Depends(get_logs_repo)
+    response: Response,
+    normalizer: AddressNormalizer = Depends(get_address_normalizer),
+    logs_repo: AsyncLogsRepo = Depends(get_logs_repo),
+    trace: RequestTrace = Depends(get_request_trace)
 ):
     """
     Normalize a free-form Italian address into standardized postal format.
@@ -46,20 +49,22 @@ async def normalize_address(
     - components: Structured address parts  
     - confidence: Quality score (0-1)
     - issues: List of warnings/corrections made
-    """
-    start_time = time.time()
     
+    Stage durations are returned in the Server-Timing header. With
+    ?trace=true (or X-Trace: 1) and a valid X-Admin-Token, the response
+    also carries a trace of every lookup and its duration.
+    """
     # Extract and normalize components
-    components, issues = normalizer.extract_components(payload.address)
+    components, issues = normalizer.extract_components(payload.address, trace=trace)
     
     # Format the address
-    formatted_address = normalizer.format_address(components)
+    formatted_address = normalizer.format_address(components, trace=trace)
     
     # Calculate confidence
     confidence = normalizer.calculate_confidence(issues)
     
     # Create response
-    response = NormalizeResponse(
+    result = NormalizeResponse(
         formatted=formatted_address,
         components=components,
         confidence=confidence,
@@ -67,15 +72,162 @@ async def normalize_address(
     )
     
     # Log the operation
-    latency_ms = int((time.time() - start_time) * 1000)
+    latency_ms = int(trace.elapsed() * 1000)
+    user_agent = request.headers.get("user-agent", "")
+    
+    with trace.stage("log"):
+        await logs_repo.save({
+            "input": payload.address,
+            "output": result.dict(),
+            "ts": datetime.utcnow().isoformat(),
+            "user_agent": user_agent,
+            "latency_ms": latency_ms
+        })
+    
+    if trace.detailed:
+        content = jsonable_encoder({**result.model_dump(), "trace": trace.to_dict()})
+        return JSONResponse(content, headers={"Server-Timing": trace.server_timing()})
+    
+    response.headers["Server-Timing"] = trace.server_timing()
+    return result
+
+
+def _normalize_all(normalizer: AddressNormalizer, addresses: List[str]) -> List[NormalizeResponse]:
+    return [
+        NormalizeResponse(
+            formatted=normalizer.format_address(components),
+            components=components,
+            confidence=normalizer.calculate_confidence(issues),
+            issues=issues
+        )
+        for components, issues in normalizer.extract_components_batch(addresses)
+    ]
+
+
+@router.post("/batch", response_model=BatchNormalizeResponse)
+async def normalize_batch(
+    payload: BatchNormalizeRequest,
+    request: Request,
+    normalizer: AddressNormalizer = Depends(get_address_normalizer),
+    logs_repo: AsyncLogsRepo = Depends(get_logs_repo)
+):
+    """
+    Normalize a list of free-form Italian addresses in one call.
+    
+    Results are returned in input order and are identical to calling
+    POST /normalize once per address. All addresses are resolved against
+    the same dataset snapshot and logged with a single bulk insert.
+    Normalization runs in a worker thread so a large batch does not stall
+    the event loop for other requests.
+    """
+    if len(payload.addresses) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.addresses)} addresses (max {settings.batch_max_items})"
+        )
+    
+    start_time = time.time()
+    
+    results = await asyncio.to_thread(_normalize_all, normalizer, payload.addresses)
+    
+    # Log every item in one round trip; latency is the per-item average
+    latency_ms = int((time.time() - start_time) * 1000 / len(results))
+    user_agent = request.headers.get("user-agent", "")
+    ts = datetime.utcnow().isoformat()
+    
+    await logs_repo.save_many([
+        {
+            "input": address,
+            "output": result.dict(),
+            "ts": ts,
+            "user_agent": user_agent,
+            "latency_ms": latency_ms
+        }
+        for address, result in zip(payload.addresses, results)
+    ])
+    
+    return BatchNormalizeResponse(results=results, count=len(results))
+
+
+@router.post("/stream")
+async def normalize_stream(
+    request: Request,
+    output: Optional[str] = Query(None, description="Output format: ndjson or csv (defaults to the input format)"),
+    column: str = Query("address", description="Field/column holding the address"),
+    normalizer: AddressNormalizer = Depends(get_address_normalizer),
+    logs_repo: AsyncLogsRepo = Depends(get_logs_repo)
+):
+    """
+    Normalize an NDJSON or CSV request body as a stream.
+    
+    The input format follows the Content-Type header (text/csv, otherwise
+    NDJSON). Rows are read incrementally, normalized in bounded chunks and
+    streamed back in input order as they are produced, so memory stays flat
+    regardless of body size. Each chunk is normalized in a worker thread.
+    Malformed rows yield a per-row error instead of aborting the stream.
+    """
+    input_format = streaming.detect_format(request.headers.get("content-type"))
+    output_format = (output or input_format).lower()
+    if output_format not in (streaming.NDJSON, streaming.CSV):
+        raise HTTPException(status_code=400, detail=f"Unsupported output format: {output}")
+    
+    records = streaming.iter_lines(request.stream())
+    if input_format == streaming.CSV:
+        records = streaming.aiter_csv_records(records)
+        try:
+            parser = streaming.CsvRowParser(await records.__anext__(), column)
+        except StopAsyncIteration:
+            raise HTTPException(status_code=400, detail="Empty CSV body")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        parse = parser.parse
+    else:
+        parse = lambda line: streaming.parse_ndjson_line(line, column)
+    
     user_agent = request.headers.get("user-agent", "")
     
-    await logs_repo.save({
-        "input": payload.address,
-        "output": response.dict(),
-        "ts": datetime.utcnow().isoformat(),
-        "user_agent": user_agent,
-        "latency_ms": latency_ms
-    })
+    async def process(chunk):
+        start_time = time.time()
+        items = await asyncio.to_thread(streaming.normalize_rows, normalizer, chunk)
+        latency_ms = int((time.time() - start_time) * 1000 / len(chunk))
+        ts = datetime.utcnow().isoformat()
+        
+        await logs_repo.save_many([
+            {
+                "input": item["input"],
+                "output": {key: item[key] for key in ("formatted", "components", "confidence", "issues")},
+                "ts": ts,
+                "user_agent": user_agent,
+                "latency_ms": latency_ms
+            }
+            for item in items if "error" not in item
+        ])
+        
+        if output_format == streaming.CSV:
+            return streaming.format_csv_rows(items)
+        return streaming.format_ndjson(items)
+    
+    async def generate():
+        if output_format == streaming.CSV:
+            yield streaming.format_csv_header()
+        
+        chunk = []
+        row = 0
+        async for record in records:
+            if not record.strip():
+                continue
+            row += 1
+            try:
+                chunk.append((row, parse(record), None))
+            except ValueError as e:
+                chunk.append((row, record, str(e)))
+            
+            if len(chunk) >= settings.stream_chunk_size:
+                yield await process(chunk)
+                chunk = []
+        
+        if chunk:
+            yield await process(chunk)
     
-    return response
\ No newline at end of file
+    media_type = "text/csv" if output_format == streaming.CSV else "application/x-ndjson"
+    return BodyStreamingResponse(generate(), media_type=media_type)
\ No newline at end of file
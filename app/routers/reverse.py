@@ -0,0 +1,72 @@
+import asyncio
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+
+from app.config import settings
+from app.schemas.address import (
+    BatchReverseGeocodeRequest, BatchReverseGeocodeResponse, NearbyComuneResult, ReverseGeocodeResponse
+)
+from app.services.geo_index import MAX_RESULTS, NearbyComune
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.deps import get_gazetteer_store
+
+
+router = APIRouter(prefix="/reverse", tags=["reverse"])
+
+
+def _response(lat: float, lon: float, nearby: List[NearbyComune]) -> ReverseGeocodeResponse:
+    return ReverseGeocodeResponse(
+        lat=lat,
+        lon=lon,
+        results=[NearbyComuneResult(**asdict(item)) for item in nearby],
+        count=len(nearby)
+    )
+
+
+@router.get("", response_model=ReverseGeocodeResponse)
+async def reverse_geocode(
+    lat: float = Query(..., ge=-90.0, le=90.0, description="Latitude in decimal degrees (WGS84)"),
+    lon: float = Query(..., ge=-180.0, le=180.0, description="Longitude in decimal degrees (WGS84)"),
+    limit: int = Query(5, ge=1, le=MAX_RESULTS, description="Maximum number of comuni"),
+    max_distance_km: Optional[float] = Query(None, gt=0, description="Ignore comuni farther than this"),
+    gazetteer_store: GazetteerStore = Depends(get_gazetteer_store)
+):
+    """
+    Comuni nearest to a GPS position, closest first, with their distance in
+    km from the comune centroid. The CAP is returned when the comune has only
+    one. Served from the in-memory grid index only; no database access or
+    external geocoder.
+    """
+    nearby = gazetteer_store.current.reverse(lat, lon, limit, max_distance_km)
+    return _response(lat, lon, nearby)
+
+
+def _reverse_all(gazetteer: Gazetteer, payload: BatchReverseGeocodeRequest) -> List[ReverseGeocodeResponse]:
+    return [
+        _response(point.lat, point.lon, gazetteer.reverse(point.lat, point.lon, payload.limit, payload.max_distance_km))
+        for point in payload.points
+    ]
+
+
+@router.post("/batch", response_model=BatchReverseGeocodeResponse)
+async def reverse_geocode_batch(
+    payload: BatchReverseGeocodeRequest,
+    gazetteer_store: GazetteerStore = Depends(get_gazetteer_store)
+):
+    """
+    Reverse-geocode a list of points in one call.
+
+    Results are returned in input order and match GET /reverse point by
+    point; all points are resolved against the same dataset snapshot.
+    limit defaults to 1, the nearest comune. Lookups run in a worker
+    thread so a large batch does not stall the event loop.
+    """
+    if len(payload.points) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.points)} points (max {settings.batch_max_items})"
+        )
+
+    results = await asyncio.to_thread(_reverse_all, gazetteer_store.current, payload)
+    return BatchReverseGeocodeResponse(results=results, count=len(results))
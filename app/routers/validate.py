@@ -1,25 +1,25 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from collections import Counter
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 
-from app.schemas.address import ValidateRequest, ValidateResponse
+from app.config import settings
+from app.schemas.address import ValidateRequest, ValidateResponse, BatchValidateRequest, BatchValidateResponse
+from app.services.tracing import RequestTrace
 from app.services.validators import AddressValidator
-from app.repositories.caps_repo import CapsRepo
+from app.deps import get_address_validator, get_request_trace
 
 
 router = APIRouter(prefix="/validate", tags=["validate"])
 
 
-def get_caps_repo() -> CapsRepo:
-    return CapsRepo()
-
-
-def get_validator(caps_repo: CapsRepo = Depends(get_caps_repo)) -> AddressValidator:
-    return AddressValidator(caps_repo)
-
-
 @router.post("", response_model=ValidateResponse)
 async def validate_address(
     payload: ValidateRequest,
-    validator: AddressValidator = Depends(get_validator)
+    response: Response,
+    validator: AddressValidator = Depends(get_address_validator),
+    trace: RequestTrace = Depends(get_request_trace)
 ):
     """
     Validate structured address components.
@@ -28,11 +28,56 @@ async def validate_address(
     - valid: Whether the address is valid
     - issues: List of validation problems found
     - confidence: Quality score (0-1)
+    
+    Stage durations are returned in the Server-Timing header; see
+    POST /normalize for the admin-only detailed trace.
     """
-    is_valid, issues, confidence = validator.validate_components(payload.components)
+    is_valid, issues, confidence = validator.validate_components(payload.components, trace=trace)
     
-    return ValidateResponse(
+    result = ValidateResponse(
         valid=is_valid,
         issues=issues,
         confidence=confidence
+    )
+    
+    if trace.detailed:
+        content = jsonable_encoder({**result.model_dump(), "trace": trace.to_dict()})
+        return JSONResponse(content, headers={"Server-Timing": trace.server_timing()})
+    
+    response.headers["Server-Timing"] = trace.server_timing()
+    return result
+
+
+@router.post("/batch", response_model=BatchValidateResponse)
+async def validate_batch(
+    payload: BatchValidateRequest,
+    validator: AddressValidator = Depends(get_address_validator)
+):
+    """
+    Validate a list of structured address components in one call.
+    
+    Results are returned in input order and are identical to calling
+    POST /validate once per item. Each distinct CAP in the batch is looked up
+    once; issue_counts aggregates the issue codes across all items.
+    Validation runs in a worker thread so a large batch does not stall the
+    event loop for other requests.
+    """
+    if len(payload.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.items)} items (max {settings.batch_max_items})"
+        )
+    
+    results = []
+    issue_counts = Counter()
+    outcomes = await asyncio.to_thread(validator.validate_components_batch, payload.items)
+    for is_valid, issues, confidence in outcomes:
+        results.append(ValidateResponse(valid=is_valid, issues=issues, confidence=confidence))
+        issue_counts.update(issues)
+    
+    return BatchValidateResponse(
+        results=results,
+        count=len(results),
+        valid_count=sum(1 for result in results if result.valid),
+        issue_counts=dict(issue_counts)
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class AddressComponents(BaseModel):
@@ -22,6 +22,15 @@ class NormalizeResponse(BaseModel):
     issues: List[str] = []
 
 
+class BatchNormalizeRequest(BaseModel):
+    addresses: List[str] = Field(min_length=1)
+
+
+class BatchNormalizeResponse(BaseModel):
+    results: List[NormalizeResponse]
+    count: int
+
+
 class ValidateRequest(BaseModel):
     components: AddressComponents
 
@@ -32,6 +41,132 @@ class ValidateResponse(BaseModel):
     confidence: float = Field(ge=0.0, le=1.0)
 
 
+class BatchValidateRequest(BaseModel):
+    items: List[AddressComponents] = Field(min_length=1)
+
+
+class BatchValidateResponse(BaseModel):
+    results: List[ValidateResponse]
+    count: int
+    valid_count: int
+    issue_counts: Dict[str, int] = {}
+
+
+class AutocompleteSuggestion(BaseModel):
+    match: str
+    matched: str
+    comune: Optional[str] = None
+    provincia: Optional[str] = None
+    cap: Optional[str] = None
+    cap_count: int = 0
+
+
+class AutocompleteResponse(BaseModel):
+    query: str
+    suggestions: List[AutocompleteSuggestion]
+    count: int
+
+
+class DedupeRequest(BaseModel):
+    addresses: List[str] = Field(min_length=1)
+
+
+class DedupeRecord(BaseModel):
+    index: int
+    # None when nothing was recognised in the address
+    cluster_id: Optional[int] = None
+    formatted: str
+
+
+class DedupeCluster(BaseModel):
+    cluster_id: int
+    representative: str
+    components: AddressComponents
+    size: int
+    members: List[int]
+
+
+class DedupeResponse(BaseModel):
+    results: List[DedupeRecord]
+    clusters: List[DedupeCluster]
+    count: int
+    cluster_count: int
+    duplicate_count: int
+
+
+class GeoPoint(BaseModel):
+    lat: float = Field(ge=-90.0, le=90.0)
+    lon: float = Field(ge=-180.0, le=180.0)
+
+
+class NearbyComuneResult(BaseModel):
+    comune: str
+    provincia: Optional[str] = None
+    cap: Optional[str] = None
+    cap_count: int = 0
+    lat: float
+    lon: float
+    distance_km: float
+
+
+class ReverseGeocodeResponse(BaseModel):
+    lat: float
+    lon: float
+    results: List[NearbyComuneResult]
+    count: int
+
+
+class BatchReverseGeocodeRequest(BaseModel):
+    points: List[GeoPoint] = Field(min_length=1)
+    limit: int = Field(1, ge=1, le=20)
+    max_distance_km: Optional[float] = Field(None, gt=0)
+
+
+class BatchReverseGeocodeResponse(BaseModel):
+    results: List[ReverseGeocodeResponse]
+    count: int
+
+
+class LatencySummary(BaseModel):
+    # Percentiles are estimated from a fixed-bucket histogram
+    avg: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ValueCount(BaseModel):
+    value: str
+    count: int
+
+
+class AnalyticsSummary(BaseModel):
+    count: int
+    latency_ms: LatencySummary
+    issues: Dict[str, int]
+    # Confidence range ("0.9-1.0", exact "1.0") -> count
+    confidence: Dict[str, int]
+    unknown_caps: List[ValueCount]
+    unknown_comuni: List[ValueCount]
+    # Unknown values past the per-rollup tracking cap, counted without their value
+    unknown_caps_other: int = 0
+    unknown_comuni_other: int = 0
+
+
+class AnalyticsBucket(AnalyticsSummary):
+    bucket: str
+
+
+class AnalyticsResponse(BaseModel):
+    granularity: str
+    since: str
+    until: str
+    totals: AnalyticsSummary
+    buckets: List[AnalyticsBucket]
+
+
 class SeedDataRequest(BaseModel):
     token: str
 
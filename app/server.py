@@ -0,0 +1,259 @@
+"""
+Pre-fork server: one master process, several uvicorn workers.
+
+    python -m app.server --host 0.0.0.0 --port 8000 --workers 4
+
+The master loads the gazetteer and compiles the street-type and tokenizer
+tables once, then forks the workers, which share those pages copy-on-write
+instead of each building its own copy. The master only connects to MongoDB
+to load the gazetteer from it (GAZETTEER_SOURCE=mongo, or no usable
+snapshot), with a short-lived blocking client that is closed before any
+fork; every worker opens its own pool after the fork.
+
+The master replaces workers that die and handles these signals:
+
+- SIGHUP: reload the gazetteer, then replace the workers one at a time, each
+  new worker taking over once it is serving. POST /datasets/seed sends it
+  when the data changed, so every worker picks up the new data.
+- SIGTERM / SIGINT: stop the workers gracefully, then exit.
+
+Metrics are not aggregated: each worker serves its own counters on
+/metrics, labelled with its pid, from whichever worker takes the scrape.
+"""
+import argparse
+import gc
+import os
+import select
+import signal
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional, Set
+
+import uvicorn
+
+from app.config import settings
+from app.services.reload import register_master
+
+
+# Seconds a worker has to finish its requests on shutdown before being killed
+GRACEFUL_TIMEOUT = 30.0
+
+
+def load_gazetteer():
+    """The gazetteer as a worker would load it: snapshot, then MongoDB, then the bundled files."""
+    from app.cli import load_gazetteer as load_from_source
+    from app.services.gazetteer import Gazetteer
+    from app.services.snapshot import load_snapshot
+
+    source = settings.gazetteer_source
+    gazetteer = load_snapshot() if source == "snapshot" else None
+    if gazetteer is None and source in ("snapshot", "mongo"):
+        try:
+            gazetteer = load_from_source("mongo")
+            if not gazetteer.stats()["caps"]:
+                print("⚠️ MongoDB has no CAP data; run `python -m app.cli seed` or POST /datasets/seed")
+                gazetteer = None
+        except Exception as e:
+            print(f"⚠️ Loading the gazetteer from MongoDB failed: {e}")
+            gazetteer = None
+    if gazetteer is None:
+        gazetteer = Gazetteer.from_files()
+    return gazetteer
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that reports on a pipe once its lifespan has started."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+
+class PreforkServer:
+    """Loads shared state once, forks ``workers`` uvicorn processes and supervises them."""
+
+    def __init__(self, host: str, port: int, workers: int, startup_timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, workers)
+        self.startup_timeout = startup_timeout
+        # Worker pid -> read end of its readiness pipe (None once read)
+        self.workers: Dict[int, Optional[int]] = {}
+        # Workers told to stop, which must not be replaced when they exit
+        self.retiring: Set[int] = set()
+        self.pending_signals: List[int] = []
+        self.app = None
+        self.config: Optional[uvicorn.Config] = None
+        self.socket = None
+
+    def preload(self) -> None:
+        """Build the state workers inherit: street types, gazetteer, tokenizer tables."""
+        from app.main import app
+        from app.utils.street_types import register_street_types
+        from app.utils.tokenizer import tokenize
+
+        if settings.extra_street_types:
+            register_street_types(settings.extra_street_types)
+        gazetteer = load_gazetteer()
+        # Compiles the lexer for the registered street types before the fork
+        tokenize("Via Roma 1, 00184 Roma (RM)", gazetteer.provinces)
+        app.state.preloaded_gazetteer = gazetteer
+        self.app = app
+
+        stats = gazetteer.stats()
+        print(f"🗺️ Gazetteer {stats['version']} preloaded from {stats['source']}: {stats['caps']} CAPs, {stats['comuni']} comuni, {stats['synonyms']} synonyms")
+
+        # Move everything allocated so far out of the collector's reach, so GC
+        # passes in the workers do not write to (and copy) the shared pages
+        gc.collect()
+        gc.freeze()
+
+    def run(self) -> int:
+        self.preload()
+        self.config = uvicorn.Config(self.app, host=self.host, port=self.port)
+        self.socket = self.config.bind_socket()
+        master_pid = register_master()
+
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.pending_signals.append(signum))
+
+        for _ in range(self.worker_count):
+            self.spawn()
+        for pid in list(self.workers):
+            if not self.wait_ready(pid):
+                print(f"❌ Worker {pid} failed to start", file=sys.stderr)
+                self.stop()
+                return 1
+        print(f"🚀 {self.worker_count} workers serving on http://{self.host}:{self.port} (master {master_pid})")
+
+        while True:
+            while self.pending_signals:
+                signum = self.pending_signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    self.stop()
+                    return 0
+            self.reap()
+            time.sleep(0.2)
+
+    def spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            status = 1
+            try:
+                _WorkerServer(self.config, write_fd).run(sockets=[self.socket])
+                status = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        self.workers[pid] = read_fd
+        return pid
+
+    def wait_ready(self, pid: int) -> bool:
+        """Wait until worker ``pid`` serves requests; False if it exits or times out first."""
+        read_fd = self.workers.get(pid)
+        if read_fd is None:
+            return pid in self.workers
+        try:
+            readable, _, _ = select.select([read_fd], [], [], self.startup_timeout)
+            return bool(readable) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+            self.workers[pid] = None
+
+    def reload(self) -> None:
+        """Reload the gazetteer and replace the workers one at a time."""
+        current = self.app.state.preloaded_gazetteer
+        try:
+            gazetteer = load_gazetteer()
+        except Exception as e:
+            print(f"⚠️ Reloading the gazetteer failed, keeping {current.version}: {e}")
+            return
+        if gazetteer.version == current.version:
+            print(f"🗺️ Gazetteer {current.version} unchanged; workers kept")
+            return
+
+        self.app.state.preloaded_gazetteer = gazetteer
+        gc.collect()
+        gc.freeze()
+        print(f"🔄 Gazetteer {gazetteer.version} loaded; replacing {len(self.workers)} workers")
+
+        for old_pid in [pid for pid in self.workers if pid not in self.retiring]:
+            new_pid = self.spawn()
+            if not self.wait_ready(new_pid):
+                print(f"⚠️ Replacement worker {new_pid} failed to start; keeping the remaining workers", file=sys.stderr)
+                self.retire(new_pid)
+                return
+            self.retire(old_pid)
+
+    def retire(self, pid: int) -> None:
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self) -> None:
+        """Collect exited workers and replace the ones that were not told to stop."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            read_fd = self.workers.pop(pid, None)
+            if read_fd is not None:
+                os.close(read_fd)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; starting a new one")
+            self.spawn()
+
+    def stop(self) -> None:
+        """Stop all workers, killing the ones still running after GRACEFUL_TIMEOUT."""
+        for pid in list(self.workers):
+            self.retire(pid)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.workers.pop(pid)
+        self.socket.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.server", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address (default: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=8000, help="Bind port (default: 8000)")
+    parser.add_argument("--workers", type=int, default=settings.workers,
+                        help=f"Worker processes (default: WORKERS, currently {settings.workers})")
+    args = parser.parse_args(argv)
+    return PreforkServer(args.host, args.port, args.workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
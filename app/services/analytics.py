@@ -0,0 +1,256 @@
+"""
+Pre-aggregated traffic analytics over the normalizations log.
+
+Every batch of log entries is folded into per-minute and per-hour rollup
+documents (request count, latency histogram, issue and confidence counts,
+unknown CAPs and comuni) applied with $inc upserts, so analytics queries
+read a handful of rollups instead of the raw log.
+
+Unknown CAPs and comuni come from user input, so each rollup tracks at
+most MAX_TRACKED_VALUES distinct values per field. A new value is only
+added while the rollup's ``<field>_tracked`` counter is below the cap
+(checked by the update filter, so concurrent writers cannot overshoot);
+occurrences of values past the cap are counted in ``<field>_other``.
+Counts can be slightly low when two writers add the same new value at once.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.text import fold_text
+
+
+# Stored rollup granularities and the ISO timestamp prefix that keys them
+# ("2024-05-01T10:31" for a minute, "2024-05-01T10" for an hour)
+ROLLUP_GRANULARITIES = {"minute": 16, "hour": 13}
+# Query granularities and the stored rollups they are merged from
+QUERY_GRANULARITIES = {"minute": "minute", "hour": "hour", "day": "hour"}
+BUCKET_PREFIX_LENGTHS = {"minute": 16, "hour": 13, "day": 10}
+
+# Latency histogram upper bounds in ms; the last bucket is unbounded. Logged
+# latencies are whole ms, so 0 gets its own bucket. Stored rollups count by
+# bucket index: after changing the bounds run `python -m app.cli rebuild-rollups`
+LATENCY_BUCKETS_MS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PERCENTILES = (50, 90, 95, 99)
+
+# Issues whose offending value is counted per bucket, and where it is
+ISSUE_VALUES = {"CAP_UNKNOWN": ("unknown_caps", "cap"), "COMUNE_NOT_FOUND": ("unknown_comuni", "comune")}
+# Unknown values are folded to these characters (safe as MongoDB field
+# names) and cut to this length to keep rollups small
+UNSAFE_VALUE_CHARS = re.compile(r"[^a-z0-9 ]+")
+MAX_VALUE_LENGTH = 64
+# Distinct unknown values tracked per field in one rollup document
+MAX_TRACKED_VALUES = 100
+
+
+def rollup_id(granularity: str, bucket: str) -> str:
+    return f"{granularity}:{bucket}"
+
+
+def value_key(value) -> str:
+    """An unknown CAP/comune as a rollup field name; empty when nothing usable is left."""
+    return UNSAFE_VALUE_CHARS.sub("", fold_text(str(value or "")))[:MAX_VALUE_LENGTH].strip()
+
+
+def _confidence_bin(confidence) -> Optional[str]:
+    """Tenth of the confidence range, "0" (0.0-0.1) to "10" (exactly 1.0)."""
+    if not isinstance(confidence, (int, float)):
+        return None
+    if confidence >= 1:
+        return "10"
+    return str(min(9, max(0, int(round(confidence * 100)) // 10)))
+
+
+class RollupBatch:
+    """$inc deltas for the rollups touched by a batch of log entries."""
+
+    def __init__(self):
+        # Minute bucket -> $inc fields; hourly deltas are summed from these
+        self._minutes: Dict[str, Counter] = {}
+        # Minute bucket -> unknown value field -> value counts
+        self._values: Dict[str, Dict[str, Counter]] = {}
+        self._max_latency: Dict[str, float] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._minutes)
+
+    def add(self, entry: dict) -> None:
+        timestamp = entry.get("timestamp")
+        if not isinstance(timestamp, str) or len(timestamp) < ROLLUP_GRANULARITIES["minute"]:
+            return
+        minute = timestamp[:ROLLUP_GRANULARITIES["minute"]]
+        output = entry.get("output") or {}
+        fields = self._minutes.get(minute)
+        if fields is None:
+            fields = self._minutes[minute] = Counter()
+
+        fields["count"] += 1
+        latency = entry.get("latency_ms")
+        if isinstance(latency, (int, float)):
+            fields["latency_ms.count"] += 1
+            fields["latency_ms.sum"] += latency
+            fields[f"latency_ms.buckets.{bisect_left(LATENCY_BUCKETS_MS, latency)}"] += 1
+            if latency > self._max_latency.get(minute, -1):
+                self._max_latency[minute] = latency
+        confidence_bin = _confidence_bin(output.get("confidence"))
+        if confidence_bin is not None:
+            fields[f"confidence.{confidence_bin}"] += 1
+        for issue in output.get("issues") or []:
+            fields[f"issues.{issue}"] += 1
+            if issue in ISSUE_VALUES:
+                field, component = ISSUE_VALUES[issue]
+                value = value_key((output.get("components") or {}).get(component))
+                if value:
+                    self._values.setdefault(minute, {}).setdefault(field, Counter())[value] += 1
+                else:
+                    fields[f"{field}_other"] += 1
+
+    def add_many(self, entries: Iterable[dict]) -> "RollupBatch":
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def updates(self) -> List[Tuple[dict, dict, bool]]:
+        """
+        (filter, update, upsert) triples to apply in order: an upsert per
+        touched rollup, then the conditional updates for its unknown values.
+        """
+        buckets: Dict[Tuple[str, str], Counter] = {}
+        values: Dict[Tuple[str, str], Dict[str, Counter]] = {}
+        max_latency: Dict[Tuple[str, str], float] = {}
+        for minute, fields in self._minutes.items():
+            for granularity, length in ROLLUP_GRANULARITIES.items():
+                key = (granularity, minute[:length])
+                if key in buckets:
+                    buckets[key].update(fields)
+                else:
+                    buckets[key] = Counter(fields)
+                for field, counts in self._values.get(minute, {}).items():
+                    values.setdefault(key, {}).setdefault(field, Counter()).update(counts)
+                if minute in self._max_latency:
+                    max_latency[key] = max(max_latency.get(key, -1), self._max_latency[minute])
+
+        updates = []
+        for (granularity, bucket), fields in buckets.items():
+            query = {"_id": rollup_id(granularity, bucket)}
+            value_updates = []
+            for field, counts in values.get((granularity, bucket), {}).items():
+                ranked = counts.most_common()
+                # No more values than the cap can be new to the rollup
+                for value, count in ranked[:MAX_TRACKED_VALUES]:
+                    value_updates.extend(_value_updates(query, field, value, count))
+                if len(ranked) > MAX_TRACKED_VALUES:
+                    fields[f"{field}_other"] += sum(count for _, count in ranked[MAX_TRACKED_VALUES:])
+
+            update = {
+                "$setOnInsert": {"granularity": granularity, "bucket": bucket},
+                "$inc": dict(fields),
+            }
+            if (granularity, bucket) in max_latency:
+                update["$max"] = {"latency_ms.max": max_latency[(granularity, bucket)]}
+            updates.append((query, update, True))
+            updates.extend(value_updates)
+        return updates
+
+
+def _value_updates(query: dict, field: str, value: str, count: int) -> List[Tuple[dict, dict, bool]]:
+    """
+    Count ``value`` in an existing rollup: increment it if already tracked,
+    else add it if the rollup has room, else count it in ``<field>_other``.
+    Exactly one of the three filters matches when applied in order.
+    """
+    path = f"{field}.{value}"
+    return [
+        ({**query, path: {"$exists": True}}, {"$inc": {path: count}}, False),
+        (
+            {**query, path: {"$exists": False}, f"{field}_tracked": {"$not": {"$gte": MAX_TRACKED_VALUES}}},
+            {"$inc": {path: count, f"{field}_tracked": 1}},
+            False,
+        ),
+        (
+            {**query, path: {"$exists": False}, f"{field}_tracked": {"$gte": MAX_TRACKED_VALUES}},
+            {"$inc": {f"{field}_other": count}},
+            False,
+        ),
+    ]
+
+
+def _percentile(buckets: List[int], total: int, percentile: float, maximum: Optional[float]) -> Optional[float]:
+    """Percentile from histogram counts, interpolated linearly inside its bucket."""
+    if not total:
+        return None
+    rank = total * percentile / 100
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else maximum
+            if upper is None:
+                return float(lower)
+            if maximum is not None:
+                upper = min(upper, maximum)
+            return round(lower + (upper - lower) * (rank - seen) / count, 2)
+        seen += count
+    return maximum
+
+
+def summarize(rollups: Iterable[dict], top: int = 10) -> dict:
+    """Merge rollup documents into one summary: counts, latency percentiles, issues, confidence, top unknowns."""
+    count = 0
+    latency_count = 0
+    latency_sum = 0.0
+    latency_max: Optional[float] = None
+    latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    issues: Counter = Counter()
+    confidence: Counter = Counter()
+    unknown = {field: Counter() for field, _ in ISSUE_VALUES.values()}
+    unknown_other = Counter()
+
+    for rollup in rollups:
+        count += rollup.get("count", 0)
+        latency = rollup.get("latency_ms") or {}
+        latency_count += latency.get("count", 0)
+        latency_sum += latency.get("sum", 0)
+        if latency.get("max") is not None:
+            latency_max = max(latency_max or 0, latency["max"])
+        for index, bucket_count in (latency.get("buckets") or {}).items():
+            latency_buckets[int(index)] += bucket_count
+        issues.update(rollup.get("issues") or {})
+        confidence.update(rollup.get("confidence") or {})
+        for field, counts in unknown.items():
+            counts.update(rollup.get(field) or {})
+            unknown_other[field] += rollup.get(f"{field}_other", 0)
+
+    return {
+        "count": count,
+        "latency_ms": {
+            "avg": round(latency_sum / latency_count, 2) if latency_count else None,
+            **{
+                f"p{percentile}": _percentile(latency_buckets, latency_count, percentile, latency_max)
+                for percentile in PERCENTILES
+            },
+            "max": latency_max,
+        },
+        "issues": dict(issues.most_common()),
+        # "0.9-1.0" style labels, lowest first; exact 1.0 is its own bin
+        "confidence": {
+            (f"{int(tenth) / 10:.1f}-{(int(tenth) + 1) / 10:.1f}" if tenth != "10" else "1.0"): confidence[tenth]
+            for tenth in sorted(confidence, key=int)
+        },
+        **{
+            field: [{"value": value, "count": value_count} for value, value_count in counts.most_common(top)]
+            for field, counts in unknown.items()
+        },
+        # Occurrences of values not tracked individually (see MAX_TRACKED_VALUES)
+        **{f"{field}_other": unknown_other[field] for field in unknown},
+    }
+
+
+def summarize_buckets(rollups: List[dict], granularity: str, top: int = 10) -> List[dict]:
+    """Per-bucket summaries at ``granularity``, merging finer rollups ("day" from hours) as needed."""
+    length = BUCKET_PREFIX_LENGTHS[granularity]
+    grouped: Dict[str, List[dict]] = {}
+    for rollup in rollups:
+        grouped.setdefault(rollup["bucket"][:length], []).append(rollup)
+    return [{"bucket": bucket, **summarize(grouped[bucket], top)} for bucket in sorted(grouped)]
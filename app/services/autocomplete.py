@@ -0,0 +1,186 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.text import fold_text
+
+
+# Match tiers, best first; a matching province code is listed after the full-name matches
+EXACT = 0
+PREFIX = 1
+WORD_PREFIX = 2
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    # "comune", "synonym", "cap" or "provincia": what the query matched
+    match: str
+    # The name, synonym, CAP or province code that matched
+    matched: str
+    comune: Optional[str]
+    provincia: Optional[str]
+    # The matched CAP, or the comune's only CAP; None when it has several
+    cap: Optional[str]
+    cap_count: int
+
+
+# Queries up to this length have their ranking precomputed: their prefix runs
+# span a large share of the national dataset and are the slowest to scan
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+# Most suggestions returned for one query
+MAX_SUGGESTIONS = 50
+
+
+class _PrefixTable:
+    """
+    Sorted name keys and their (tier, match kind, -CAP count, comune, place id,
+    matched text) entries; keys sharing a prefix form one contiguous run.
+    """
+
+    __slots__ = ("keys", "entries", "precomputed")
+
+    def __init__(self, names: List[Tuple[str, tuple]], precompute: bool):
+        names.sort()
+        self.keys = [key for key, _ in names]
+        self.entries = [entry for _, entry in names]
+        # Short prefix -> its ranked entries, MAX_SUGGESTIONS at most
+        self.precomputed: Dict[str, List[tuple]] = {}
+        if precompute:
+            prefixes = {key[:length] for key in self.keys for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1)}
+            for prefix in prefixes:
+                self.precomputed[prefix] = self.scan(prefix)[:MAX_SUGGESTIONS]
+
+    def scan(self, query: str) -> List[tuple]:
+        """Entries whose key starts with ``query``, best per place, ranked."""
+        best: Dict[int, tuple] = {}
+        keys = self.keys
+        index = bisect_left(keys, query)
+        while index < len(keys) and keys[index].startswith(query):
+            entry = self.entries[index]
+            if entry[0] == PREFIX and keys[index] == query:
+                entry = (EXACT,) + entry[1:]
+            index += 1
+            place_id = entry[4]
+            if place_id not in best or entry < best[place_id]:
+                best[place_id] = entry
+        return sorted(best.values())
+
+    def ranked(self, query: str) -> List[tuple]:
+        ranked = self.precomputed.get(query)
+        return self.scan(query) if ranked is None else ranked
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over comune names, city synonyms, CAPs and province codes.
+
+    Names are folded (lowercase, no accents) and kept in a sorted array, so
+    the keys sharing a prefix are one contiguous run found with bisect. Each
+    comune is indexed under its full name, the name without spaces
+    ("laquila") and every later word ("emilia" for "Reggio Emilia"); CAPs
+    have their own sorted array. Suggestions are ranked by match tier, then
+    by CAP count as a proxy for city size, so "ro" suggests Roma first.
+
+    One- to three-letter queries match thousands of keys nationally, so
+    their rankings are computed once at build time; a province filter uses
+    that province's own, much smaller table.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, Optional[str], Iterable[str]]]):
+        """entries: (name variant, comune, provincia, caps) tuples; a variant other than the comune is a synonym."""
+        self._comuni: List[str] = []
+        self._provincia: List[Optional[str]] = []
+        self._caps: List[Tuple[str, ...]] = []
+        place_ids: Dict[Tuple[str, Optional[str]], int] = {}
+
+        names: List[Tuple[str, tuple]] = []
+        caps: List[Tuple[str, int]] = []
+        seen = set()
+        for variant, comune, provincia, place_caps in entries:
+            place = (comune, provincia)
+            place_id = place_ids.get(place)
+            if place_id is None:
+                place_id = place_ids[place] = len(self._comuni)
+                self._comuni.append(comune)
+                self._provincia.append(provincia)
+                self._caps.append(tuple(sorted(set(place_caps))))
+                caps.extend((cap, place_id) for cap in self._caps[place_id])
+
+            folded = fold_text(variant)
+            if not folded:
+                continue
+            kind = "comune" if variant == comune else "synonym"
+            matched = comune if kind == "comune" else variant
+            keys = [(folded, PREFIX), (folded.replace(" ", ""), PREFIX)]
+            words = folded.split(" ")
+            keys.extend((" ".join(words[index:]), WORD_PREFIX) for index in range(1, len(words)))
+            for key, tier in keys:
+                if (key, place_id) not in seen:
+                    seen.add((key, place_id))
+                    rank = (tier, kind != "comune", -len(self._caps[place_id]), comune, place_id, matched)
+                    names.append((key, rank))
+
+        self._names = _PrefixTable(list(names), precompute=True)
+        by_provincia: Dict[str, List[Tuple[str, tuple]]] = {}
+        for key, rank in names:
+            provincia = self._provincia[rank[4]]
+            if provincia:
+                by_provincia.setdefault(provincia, []).append((key, rank))
+        self._names_by_provincia = {
+            provincia: _PrefixTable(items, precompute=False) for provincia, items in by_provincia.items()
+        }
+
+        caps.sort()
+        self._cap_keys = [cap for cap, _ in caps]
+        self._cap_places = [place_id for _, place_id in caps]
+
+    def __len__(self) -> int:
+        return len(self._comuni)
+
+    def _suggestion(self, place_id: int, match: str, matched: str, cap: Optional[str] = None) -> Suggestion:
+        caps = self._caps[place_id]
+        if cap is None and len(caps) == 1:
+            cap = caps[0]
+        return Suggestion(
+            match=match,
+            matched=matched,
+            comune=self._comuni[place_id],
+            provincia=self._provincia[place_id],
+            cap=cap,
+            cap_count=len(caps),
+        )
+
+    def suggest(self, query: str, limit: int = 10, provincia: Optional[str] = None) -> List[Suggestion]:
+        """Best ``limit`` (up to MAX_SUGGESTIONS) suggestions for a partial comune name, synonym, CAP or province code."""
+        query = fold_text(query)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not query or limit <= 0:
+            return []
+        provincia = provincia.upper() if provincia else None
+        if query.isdigit():
+            return self._suggest_caps(query, limit, provincia)
+
+        table = self._names_by_provincia.get(provincia) if provincia else self._names
+        ranked = table.ranked(query)[:limit] if table else []
+        suggestions = [
+            self._suggestion(place_id, "synonym" if synonym else "comune", matched)
+            for _, synonym, _, _, place_id, matched in ranked
+        ]
+
+        code = query.upper()
+        if len(code) == 2 and code in self._names_by_provincia and provincia in (None, code):
+            province = Suggestion(match="provincia", matched=code, comune=None, provincia=code, cap=None, cap_count=0)
+            suggestions.insert(sum(1 for entry in ranked if entry[0] != WORD_PREFIX), province)
+        return suggestions[:limit]
+
+    def _suggest_caps(self, prefix: str, limit: int, provincia: Optional[str]) -> List[Suggestion]:
+        suggestions = []
+        keys = self._cap_keys
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix) and len(suggestions) < limit:
+            place_id = self._cap_places[index]
+            if not provincia or self._provincia[place_id] == provincia:
+                suggestions.append(self._suggestion(place_id, "cap", keys[index], keys[index]))
+            index += 1
+        return suggestions
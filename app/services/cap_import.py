@@ -0,0 +1,172 @@
+"""
+Import of the national comuni-CAP list (ISTAT/Poste exports) into the
+caps/comuni dataset format.
+
+Accepts JSON lists (e.g. the comuni-json layout: nome, sigla, cap[]) or
+CSV files with a header row. CAP cells may hold a single code, a list
+("20121 20122") or a range ("00118-00199"); CAPs shared by several comuni
+produce one caps record per comune. Optional latitude/longitude columns
+become the comune's centroid for reverse geocoding.
+"""
+import csv
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+COMUNE_FIELDS = ("comune", "nome", "denominazione", "denominazione_ita", "denominazione in italiano")
+PROVINCIA_FIELDS = ("provincia", "sigla", "sigla_provincia", "sigla automobilistica", "prov")
+CAP_FIELDS = ("caps", "cap")
+ISTAT_FIELDS = ("istat", "codice", "codice_istat", "codice comune formato alfanumerico")
+LAT_FIELDS = ("lat", "latitudine", "latitude")
+LON_FIELDS = ("lon", "lng", "longitudine", "longitude")
+# Nested {"lat": ..., "lng": ...} objects
+COORDINATE_FIELDS = ("coordinate", "coordinates", "geo", "centroid")
+
+CAP_RANGE_PATTERN = re.compile(r"^(\d{1,5})\s*[-–]\s*(\d{1,5})$")
+CAP_SEPARATORS = re.compile(r"[\s,;|/]+")
+
+
+@dataclass
+class CapImport:
+    caps: List[dict] = field(default_factory=list)
+    comuni: List[dict] = field(default_factory=list)
+    # Same comune name in another provincia; the comuni collection is keyed by name
+    skipped_homonyms: List[str] = field(default_factory=list)
+    invalid_rows: int = 0
+
+
+def _pick(row: Dict[str, object], names: Iterable[str]):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def parse_caps(value) -> List[str]:
+    """Expand a CAP cell (code, list of codes or range) into 5-digit codes."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [cap for item in value for cap in parse_caps(item)]
+    if isinstance(value, int):
+        value = str(value)
+
+    caps = []
+    text = str(value).strip()
+    match = CAP_RANGE_PATTERN.match(text)
+    if match:
+        start, end = int(match.group(1)), int(match.group(2))
+        if start <= end:
+            caps.extend(f"{cap:05d}" for cap in range(start, end + 1))
+        return caps
+
+    for token in CAP_SEPARATORS.split(text):
+        match = CAP_RANGE_PATTERN.match(token)
+        if match:
+            caps.extend(parse_caps(token))
+        elif token.isdigit() and len(token) <= 5:
+            # Spreadsheets drop leading zeros ("118" for 00118)
+            caps.append(token.zfill(5))
+    return caps
+
+
+def parse_coordinates(row: Dict[str, object]) -> Optional[Tuple[float, float]]:
+    """(lat, lon) from a row's coordinate columns or nested object; None if absent or out of range."""
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    nested = _pick(row, COORDINATE_FIELDS)
+    if isinstance(nested, dict):
+        row = {str(key).strip().lower(): value for key, value in nested.items()}
+    lat, lon = _pick(row, LAT_FIELDS), _pick(row, LON_FIELDS)
+    try:
+        # Italian exports write decimal commas ("45,4642")
+        lat, lon = (float(str(value).strip().replace(",", ".")) for value in (lat, lon))
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return round(lat, 6), round(lon, 6)
+
+
+def _normalize_row(row: Dict[str, object]) -> Tuple[Optional[str], Optional[str], List[str], Optional[str]]:
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    comune = _pick(row, COMUNE_FIELDS)
+    provincia = _pick(row, PROVINCIA_FIELDS)
+    if isinstance(provincia, dict):
+        # comuni-json nests the provincia; the sigla sits on the comune itself
+        provincia = provincia.get("sigla")
+    istat = _pick(row, ISTAT_FIELDS)
+    caps = parse_caps(_pick(row, CAP_FIELDS))
+    return (
+        str(comune).strip() if comune else None,
+        str(provincia).strip().upper() if provincia else None,
+        caps,
+        str(istat).strip() if istat else None,
+    )
+
+
+def _iter_json_rows(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("comuni") or data.get("data") or []
+    yield from data
+
+
+def _iter_csv_rows(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(8192)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.DictReader(f, dialect=dialect)
+
+
+def build_datasets(rows: Iterable[dict]) -> CapImport:
+    """Turn raw comune rows into caps records (one per CAP and comune) and comuni records."""
+    result = CapImport()
+    comuni: Dict[str, dict] = {}
+    seen_caps = set()
+
+    for row in rows:
+        comune, provincia, caps, istat = _normalize_row(row)
+        if not comune or not caps:
+            result.invalid_rows += 1
+            continue
+
+        for cap in caps:
+            if (cap, comune, provincia) not in seen_caps:
+                seen_caps.add((cap, comune, provincia))
+                result.caps.append({"cap": cap, "comune": comune, "provincia": provincia})
+
+        record = comuni.get(comune)
+        if record is None:
+            record = comuni[comune] = {"comune": comune, "provincia": provincia, "caps": []}
+            if istat:
+                record["istat"] = istat
+            coordinates = parse_coordinates(row)
+            if coordinates:
+                record["lat"], record["lon"] = coordinates
+        elif record["provincia"] != provincia:
+            result.skipped_homonyms.append(f"{comune} ({provincia})")
+            continue
+        record["caps"].extend(cap for cap in caps if cap not in record["caps"])
+
+    # Stable sort keeps the input order among comuni sharing a CAP, so the
+    # first listed comune stays the CAP's primary owner
+    result.caps.sort(key=lambda record: record["cap"])
+    for record in comuni.values():
+        record["caps"].sort()
+    result.comuni = list(comuni.values())
+    return result
+
+
+def load_cap_source(path: str, input_format: Optional[str] = None) -> CapImport:
+    """Read an ISTAT/Poste export (json or csv, detected from the extension by default)."""
+    input_format = (input_format or ("json" if path.lower().endswith(".json") else "csv")).lower()
+    rows = _iter_json_rows(path) if input_format == "json" else _iter_csv_rows(path)
+    return build_datasets(rows)
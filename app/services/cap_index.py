@@ -0,0 +1,168 @@
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class CapRangeIndex:
+    """
+    Compact CAP table for the in-memory gazetteer.
+
+    Runs of consecutive CAPs belonging to the same comune (Roma 00118-00199,
+    Milano 20121-20162) are stored as one [start, end] range in sorted integer
+    arrays and resolved with bisect, so memory grows with the number of ranges
+    rather than CAPs and lookups stay O(log n). A CAP shared by several comuni
+    keeps its first owner as the primary, mirroring find_one on the caps
+    collection; the others are kept in a small side table.
+    """
+
+    __slots__ = (
+        "_starts", "_ends", "_owners", "_place_comune", "_place_provincia", "_shared",
+        "_groups", "_group_bounds", "_group_counts", "_group_starts", "_group_ends", "_group_owners",
+        "size",
+    )
+
+    def __init__(self, records: Iterable[dict]):
+        """records: {"cap", "comune", "provincia"} dicts, possibly several per CAP."""
+        self._place_comune: List[str] = []
+        self._place_provincia: List[Optional[str]] = []
+        place_ids: Dict[Tuple[str, Optional[str]], int] = {}
+        primary: Dict[int, int] = {}
+        shared: Dict[int, List[int]] = {}
+        caps_by_place: Dict[int, set] = {}
+
+        for record in records:
+            cap = record.get("cap")
+            if not self._is_cap(cap):
+                continue
+            cap = int(cap)
+            place = (record["comune"], record.get("provincia"))
+            place_id = place_ids.get(place)
+            if place_id is None:
+                place_id = place_ids[place] = len(self._place_comune)
+                self._place_comune.append(sys.intern(place[0]))
+                self._place_provincia.append(sys.intern(place[1]) if place[1] else place[1])
+
+            owned = caps_by_place.setdefault(place_id, set())
+            if cap in owned:
+                continue
+            owned.add(cap)
+            if cap not in primary:
+                primary[cap] = place_id
+            else:
+                shared.setdefault(cap, []).append(place_id)
+
+        self._starts = array("i")
+        self._ends = array("i")
+        self._owners = array("I")
+        for start, end, place_id in self._ranges(sorted(primary.items())):
+            self._starts.append(start)
+            self._ends.append(end)
+            self._owners.append(place_id)
+        self._shared: Dict[int, Tuple[int, ...]] = {cap: tuple(ids) for cap, ids in shared.items()}
+
+        # Ranges grouped per comune name (homonyms in different provinces share
+        # a group), flattened into arrays; _groups maps the name to its slot
+        by_comune: Dict[str, List[Tuple[int, int, int]]] = {}
+        for place_id, caps in caps_by_place.items():
+            by_comune.setdefault(self._place_comune[place_id], []).extend(
+                self._ranges((cap, place_id) for cap in sorted(caps))
+            )
+        self._groups: Dict[str, int] = {}
+        self._group_bounds = array("I", [0])
+        self._group_counts = array("I")
+        self._group_starts = array("i")
+        self._group_ends = array("i")
+        self._group_owners = array("I")
+        for comune, ranges in by_comune.items():
+            self._groups[comune] = len(self._group_counts)
+            count = 0
+            for start, end, place_id in sorted(ranges):
+                self._group_starts.append(start)
+                self._group_ends.append(end)
+                self._group_owners.append(place_id)
+                count += end - start + 1
+            self._group_bounds.append(len(self._group_starts))
+            self._group_counts.append(count)
+
+        self.size = len(primary)
+
+    @staticmethod
+    def _is_cap(cap) -> bool:
+        return isinstance(cap, str) and len(cap) == 5 and cap.isdigit()
+
+    @staticmethod
+    def _ranges(owned: Iterable[Tuple[int, int]]) -> Iterator[Tuple[int, int, int]]:
+        """Collapse sorted (cap, place) pairs into (start, end, place) runs."""
+        start = end = owner = None
+        for cap, place_id in owned:
+            if owner == place_id and cap == end + 1:
+                end = cap
+                continue
+            if owner is not None:
+                yield start, end, owner
+            start = end = cap
+            owner = place_id
+        if owner is not None:
+            yield start, end, owner
+
+    def _record(self, cap: str, place_id: int) -> dict:
+        return {"cap": cap, "comune": self._place_comune[place_id], "provincia": self._place_provincia[place_id]}
+
+    def _primary_owner(self, cap: str) -> Optional[int]:
+        if not self._is_cap(cap):
+            return None
+        number = int(cap)
+        index = bisect_right(self._starts, number) - 1
+        if index >= 0 and number <= self._ends[index]:
+            return self._owners[index]
+        return None
+
+    def find_by_cap(self, cap: str) -> Optional[dict]:
+        place_id = self._primary_owner(cap)
+        return None if place_id is None else self._record(cap, place_id)
+
+    def find_all_by_cap(self, cap: str) -> List[dict]:
+        """Every comune served by a CAP, primary owner first."""
+        place_id = self._primary_owner(cap)
+        if place_id is None:
+            return []
+        return [self._record(cap, owner) for owner in (place_id,) + self._shared.get(int(cap), ())]
+
+    def find_by_comune(self, comune: str) -> List[dict]:
+        """Records for every CAP of a comune, in ascending CAP order."""
+        group = self._groups.get(comune)
+        if group is None:
+            return []
+        return [
+            self._record(f"{cap:05d}", self._group_owners[index])
+            for index in range(self._group_bounds[group], self._group_bounds[group + 1])
+            for cap in range(self._group_starts[index], self._group_ends[index] + 1)
+        ]
+
+    def first_by_comune(self, comune: str) -> Tuple[Optional[dict], int]:
+        """(lowest-CAP record, number of CAPs) for a comune without expanding its ranges."""
+        group = self._groups.get(comune)
+        if group is None:
+            return None, 0
+        index = self._group_bounds[group]
+        return self._record(f"{self._group_starts[index]:05d}", self._group_owners[index]), self._group_counts[group]
+
+    def places(self) -> Iterator[Tuple[str, Optional[str], List[str]]]:
+        """(comune, provincia, caps) for every comune with at least one CAP."""
+        for group in range(len(self._group_counts)):
+            by_place: Dict[int, List[str]] = {}
+            for index in range(self._group_bounds[group], self._group_bounds[group + 1]):
+                by_place.setdefault(self._group_owners[index], []).extend(
+                    f"{cap:05d}" for cap in range(self._group_starts[index], self._group_ends[index] + 1)
+                )
+            for place_id, caps in by_place.items():
+                yield self._place_comune[place_id], self._place_provincia[place_id], caps
+
+    def stats(self) -> dict:
+        return {
+            "caps": self.size,
+            "ranges": len(self._starts),
+            "shared_caps": len(self._shared),
+            "comuni": len(self._place_comune),
+        }
@@ -0,0 +1,48 @@
+import json
+import os
+from typing import List, Tuple
+
+
+APP_DIR = os.path.join(os.path.dirname(__file__), "..")
+DATA_DIR = os.path.join(APP_DIR, "data")
+PROJECT_ROOT = os.path.join(APP_DIR, "..")
+
+# Comprehensive datasets first, small seed datasets as fallback
+CAPS_FILES = [
+    os.path.join(PROJECT_ROOT, "comprehensive_italian_caps.json"),
+    os.path.join(DATA_DIR, "seed_caps.json"),
+]
+COMUNI_FILES = [
+    os.path.join(DATA_DIR, "comprehensive_comuni.json"),
+    os.path.join(DATA_DIR, "seed_comuni.json"),
+]
+SYNONYMS_FILES = [
+    os.path.join(DATA_DIR, "comprehensive_synonyms.json"),
+    os.path.join(DATA_DIR, "seed_synonyms.json"),
+]
+
+
+def _load_first_existing(paths: List[str]) -> List[dict]:
+    """Load the first dataset file that exists, or an empty list."""
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return []
+
+
+def load_caps() -> List[dict]:
+    return _load_first_existing(CAPS_FILES)
+
+
+def load_comuni() -> List[dict]:
+    return _load_first_existing(COMUNI_FILES)
+
+
+def load_synonyms() -> List[dict]:
+    return _load_first_existing(SYNONYMS_FILES)
+
+
+def load_all() -> Tuple[List[dict], List[dict], List[dict]]:
+    """Load (caps, comuni, synonyms) from the bundled JSON files."""
+    return load_caps(), load_comuni(), load_synonyms()
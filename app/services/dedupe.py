@@ -0,0 +1,232 @@
+"""
+Duplicate detection over normalized addresses.
+
+Records are reduced to their normalized (street, number, cap, comune,
+provincia) key, so inputs that only differ in abbreviations, English city
+names or a missing CAP collapse to the same key. Distinct keys are then
+blocked by locality (comune, or CAP without one) and civic number, and
+only keys sharing a block are compared; large blocks are narrowed further
+by the street's most distinctive word and by sorted-neighbourhood windows.
+The work grows with the number of records, not with the number of pairs.
+"""
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz import fuzz
+
+from app.schemas.address import AddressComponents
+from app.utils.street_types import STREET_TYPES
+from app.utils.text import fold_text
+
+
+# Minimum rapidfuzz ratio (0-100) between two street names in the same block
+DEFAULT_STREET_SIMILARITY = 90.0
+
+# Blocks with more distinct streets than this are not compared pairwise:
+# only streets sharing their blocking word, or sorting within SORTED_WINDOW
+# of each other by name or reversed name, are compared
+MAX_PAIRWISE_STREETS = 50
+SORTED_WINDOW = 8
+
+# Particles never used as the blocking word of a street name
+STREET_STOPWORDS = frozenset({
+    "di", "da", "del", "della", "dello", "dei", "degli", "delle", "dal", "dalla",
+    "al", "alla", "ai", "agli", "alle", "in", "san", "santa", "santo", "s", "e", "d", "l",
+})
+
+# Record with nothing to cluster on (parse error or empty components)
+NO_KEY = -1
+
+# (street, number, cap, comune, provincia), as normalized
+AddressKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+def address_key(components: AddressComponents, issues: Iterable[str] = ()) -> Optional[AddressKey]:
+    """
+    The record's clustering key; None when nothing was recognised. A CAP the
+    normalizer picked among several of the comune's is left out, as it says
+    nothing about where the address is.
+    """
+    cap = None if "MULTIPLE_CAPS_FOR_COMUNE" in issues else components.cap
+    key = (components.street, components.number, cap, components.comune, components.provincia)
+    return key if any(key) else None
+
+
+def key_components(key: AddressKey) -> AddressComponents:
+    street, number, cap, comune, provincia = key
+    return AddressComponents(street=street, number=number, cap=cap, comune=comune, provincia=provincia)
+
+
+def blocking_word(folded_street: str, street_types: frozenset) -> str:
+    """The street's longest word that is not a street type or particle ("garibaldi" for "via giuseppe garibaldi")."""
+    words = [
+        word for word in folded_street.split(" ")
+        if word not in street_types and word not in STREET_STOPWORDS
+    ]
+    return max(words, key=lambda word: (len(word), word), default=folded_street)
+
+
+@dataclass
+class Clustering:
+    # Cluster id per record, in record order (1-based, numbered by first
+    # appearance); 0 for records without a key
+    record_clusters: array
+    # Indexed by cluster id - 1
+    representatives: List[AddressKey]
+    sizes: array
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+
+class AddressDeduplicator:
+    """
+    Accumulates normalized records and groups them into duplicate clusters.
+
+    Memory is one int per record plus one entry per distinct key. Two keys
+    are duplicates when they share comune (or CAP when there is no comune)
+    and civic number, their CAPs do not conflict (equal, or one missing),
+    and their street names are at least ``street_similarity`` similar;
+    clusters are the transitive closure of that relation. Each cluster is
+    represented by its most frequent key.
+    """
+
+    def __init__(self, street_similarity: float = DEFAULT_STREET_SIMILARITY):
+        self.street_similarity = street_similarity
+        self._key_ids: Dict[AddressKey, int] = {}
+        self._keys: List[AddressKey] = []
+        self._counts = array("I")
+        self._records = array("i")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, key: Optional[AddressKey]) -> None:
+        """Add one record by its address_key (None for records that failed to parse)."""
+        if key is None:
+            self._records.append(NO_KEY)
+            return
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            # Keys repeat the same comune and street names; share one copy
+            key = tuple(sys.intern(part) if part else part for part in key)
+            key_id = self._key_ids[key] = len(self._keys)
+            self._keys.append(key)
+            self._counts.append(0)
+        self._counts[key_id] += 1
+        self._records.append(key_id)
+
+    def add_results(self, results: Iterable[Tuple[AddressComponents, List[str]]]) -> None:
+        """Add the (components, issues) pairs of AddressNormalizer.extract_components_batch."""
+        for components, issues in results:
+            self.add(address_key(components, issues))
+
+    def cluster(self) -> Clustering:
+        """Union duplicate keys within each block, then number the clusters."""
+        parent = array("i", range(len(self._keys)))
+
+        def find(key_id: int) -> int:
+            while parent[key_id] != key_id:
+                parent[key_id] = parent[parent[key_id]]
+                key_id = parent[key_id]
+            return key_id
+
+        street_types = frozenset(fold_text(street_type) for street_type in STREET_TYPES)
+        blocks, folded_streets = self._blocks()
+        for block in blocks.values():
+            for left, right in self._candidate_pairs(block, folded_streets, street_types):
+                left_root, right_root = find(left), find(right)
+                if left_root != right_root and self._is_duplicate(left, right, folded_streets):
+                    parent[max(left_root, right_root)] = min(left_root, right_root)
+        del blocks, folded_streets
+
+        # Number clusters by first appearance and pick each one's most frequent key
+        cluster_of_root: Dict[int, int] = {}
+        representatives: List[int] = []
+        sizes = array("I")
+        record_clusters = array("I", bytes(4 * len(self._records)))
+        for index, key_id in enumerate(self._records):
+            if key_id == NO_KEY:
+                continue
+            root = find(key_id)
+            cluster_id = cluster_of_root.get(root)
+            if cluster_id is None:
+                cluster_id = cluster_of_root[root] = len(representatives) + 1
+                representatives.append(key_id)
+                sizes.append(0)
+            sizes[cluster_id - 1] += 1
+            record_clusters[index] = cluster_id
+            representative = representatives[cluster_id - 1]
+            if key_id != representative and self._rank(key_id) > self._rank(representative):
+                representatives[cluster_id - 1] = key_id
+
+        return Clustering(
+            record_clusters=record_clusters,
+            representatives=[self._keys[key_id] for key_id in representatives],
+            sizes=sizes,
+        )
+
+    def _rank(self, key_id: int) -> tuple:
+        """Representative preference: most frequent, then most complete, then first seen."""
+        return self._counts[key_id], sum(1 for part in self._keys[key_id] if part), -key_id
+
+    def _blocks(self) -> Tuple[Dict[Tuple[str, str], List[int]], List[str]]:
+        """
+        Key ids by (locality, civic number), and every key's folded street.
+        Keys without a locality or street are only merged when equal.
+        """
+        folded: Dict[str, str] = {}
+
+        def fold(text: Optional[str]) -> str:
+            if not text:
+                return ""
+            result = folded.get(text)
+            if result is None:
+                result = folded[text] = sys.intern(fold_text(text))
+            return result
+
+        blocks: Dict[Tuple[str, str], List[int]] = {}
+        folded_streets: List[str] = []
+        for key_id, (street, number, cap, comune, _) in enumerate(self._keys):
+            locality = fold(comune) or cap
+            folded_streets.append(fold(street))
+            if locality and folded_streets[key_id]:
+                blocks.setdefault((locality, (number or "").upper()), []).append(key_id)
+        return blocks, folded_streets
+
+    def _candidate_pairs(
+        self, block: List[int], folded_streets: List[str], street_types: frozenset
+    ) -> Iterable[Tuple[int, int]]:
+        if len(block) <= MAX_PAIRWISE_STREETS:
+            for index, left in enumerate(block):
+                for right in block[index + 1:]:
+                    yield left, right
+            return
+
+        # Streets sharing their most distinctive word ("Via G. Garibaldi", "Piazza Garibaldi")
+        by_word: Dict[str, List[int]] = {}
+        for key_id in block:
+            by_word.setdefault(blocking_word(folded_streets[key_id], street_types), []).append(key_id)
+        for group in by_word.values():
+            if len(group) <= MAX_PAIRWISE_STREETS:
+                for index, left in enumerate(group):
+                    for right in group[index + 1:]:
+                        yield left, right
+
+        # Sorted neighbourhood, forwards and backwards, for typos in any part of the name
+        for sort_key in (folded_streets.__getitem__, lambda key_id: folded_streets[key_id][::-1]):
+            ordered = sorted(block, key=sort_key)
+            for index, left in enumerate(ordered):
+                for right in ordered[index + 1:index + 1 + SORTED_WINDOW]:
+                    yield left, right
+
+    def _is_duplicate(self, left: int, right: int, folded_streets: List[str]) -> bool:
+        _, _, left_cap, _, left_provincia = self._keys[left]
+        _, _, right_cap, _, right_provincia = self._keys[right]
+        if left_cap and right_cap and left_cap != right_cap:
+            return False
+        if left_provincia and right_provincia and left_provincia != right_provincia:
+            return False
+        return fuzz.ratio(folded_streets[left], folded_streets[right], score_cutoff=self.street_similarity) > 0
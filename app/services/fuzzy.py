@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+from app.utils.text import fold_text
+
+
+# Names shorter than this are too ambiguous to correct
+MIN_QUERY_LENGTH = 3
+
+# Length tolerance for the default (first letter, length) block
+LENGTH_WINDOW = 2
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    comune: str
+    provincia: Optional[str]
+    matched: str
+    score: float
+
+
+class ComuneFuzzyIndex:
+    """
+    Fuzzy lookup over comune names and city synonyms.
+
+    Choices are pre-folded (lowercase, no accents) and split into blocks so a
+    query only scores a few dozen candidates: by CAP prefix or provincia when
+    those are known, otherwise by first letter and approximate name length.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, Optional[str], Iterable[str]]]):
+        """entries: (name variant, comune, provincia, caps) tuples."""
+        self._names: List[str] = []
+        self._targets: List[Tuple[str, Optional[str]]] = []
+        self._by_letter_length: Dict[Tuple[str, int], List[int]] = {}
+        self._by_provincia: Dict[str, List[int]] = {}
+        self._by_cap_prefix: Dict[str, List[int]] = {}
+
+        seen = set()
+        for variant, comune, provincia, caps in entries:
+            folded = fold_text(variant)
+            if not folded or (folded, comune) in seen:
+                continue
+            seen.add((folded, comune))
+
+            index = len(self._names)
+            self._names.append(folded)
+            self._targets.append((comune, provincia))
+
+            self._by_letter_length.setdefault((folded[0], len(folded)), []).append(index)
+            if provincia:
+                self._by_provincia.setdefault(provincia, []).append(index)
+            for prefix in {cap[:2] for cap in caps if cap}:
+                self._by_cap_prefix.setdefault(prefix, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _block(self, query: str, cap: Optional[str], provincia: Optional[str]) -> List[int]:
+        if cap and cap[:2] in self._by_cap_prefix:
+            return self._by_cap_prefix[cap[:2]]
+        if provincia and provincia in self._by_provincia:
+            return self._by_provincia[provincia]
+
+        block = []
+        for length in range(len(query) - LENGTH_WINDOW, len(query) + LENGTH_WINDOW + 1):
+            block.extend(self._by_letter_length.get((query[0], length), ()))
+        return block
+
+    def exact(self, name: str, provincia: Optional[str] = None) -> Optional[FuzzyMatch]:
+        """Comune whose name or synonym equals ``name`` up to case, accents and punctuation ("MILANO", "Forli")."""
+        query = fold_text(name)
+        if not query:
+            return None
+        found = None
+        for index in self._by_letter_length.get((query[0], len(query)), ()):
+            if self._names[index] == query:
+                comune, target_provincia = self._targets[index]
+                if found is None or (provincia and target_provincia == provincia and found.provincia != provincia):
+                    found = FuzzyMatch(comune=comune, provincia=target_provincia, matched=query, score=100.0)
+        return found
+
+    def match(
+        self,
+        name: str,
+        score_cutoff: float,
+        cap: Optional[str] = None,
+        provincia: Optional[str] = None,
+    ) -> Optional[FuzzyMatch]:
+        """Best comune for a possibly misspelled name, or None below score_cutoff."""
+        query = fold_text(name)
+        if len(query) < MIN_QUERY_LENGTH:
+            return None
+
+        block = self._block(query, cap, provincia)
+        if not block:
+            return None
+
+        result = process.extractOne(
+            query,
+            [self._names[index] for index in block],
+            scorer=fuzz.ratio,
+            score_cutoff=score_cutoff,
+        )
+        if result is None:
+            return None
+
+        matched, score, position = result
+        comune, provincia = self._targets[block[position]]
+        return FuzzyMatch(comune=comune, provincia=provincia, matched=matched, score=score)
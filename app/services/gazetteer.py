@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services import dataset_files
+from app.services.autocomplete import AutocompleteIndex, Suggestion
+from app.services.cap_index import CapRangeIndex
+from app.services.fuzzy import ComuneFuzzyIndex
+from app.services.geo_index import GeoGridIndex, NearbyComune
+from app.services.stradario import StreetIndex, StreetMatch, load_street_index
+
+
+class Gazetteer:
+    """
+    Immutable in-memory snapshot of the CAP, comuni and synonyms datasets.
+
+    Mirrors the lookup surface of CapsRepo, ComuniRepo and SynonymsRepo so the
+    normalizer and validator can resolve addresses without a database round trip.
+    CAPs live in a range-encoded CapRangeIndex and their records are built per
+    lookup; other records are shared between callers and must be treated as
+    read-only. Comuni records with ``lat``/``lon`` centroids feed the
+    reverse-geocoding grid. The optional street index (stradario) is loaded
+    from its own file and travels with the snapshot.
+    """
+
+    __slots__ = ("_caps", "_comuni", "_synonyms", "provinces", "fuzzy_index", "autocomplete_index", "geo_index", "streets", "version", "source", "loaded_at")
+
+    def __init__(
+        self,
+        caps: Iterable[dict],
+        comuni: Iterable[dict],
+        synonyms: Iterable[dict],
+        source: str = "memory",
+        streets: Optional[StreetIndex] = None,
+    ):
+        caps = [dict(record) for record in caps]
+        comuni = [dict(record) for record in comuni]
+        synonyms = [
+            {
+                "type": item["type"],
+                "original": item["original"].lower(),
+                "translation": item["translation"],
+            }
+            for item in synonyms
+        ]
+
+        self._caps = CapRangeIndex(caps)
+
+        self._comuni: Dict[str, dict] = {}
+        for record in comuni:
+            self._comuni.setdefault(record["comune"], record)
+
+        # First entry wins, matching find_one on the synonyms collection
+        self._synonyms: Dict[Tuple[str, str], str] = {}
+        for item in synonyms:
+            self._synonyms.setdefault((item["type"], item["original"]), item["translation"])
+
+        # Province codes the tokenizer recognises in free-form input ("(MI)")
+        self.provinces = frozenset(
+            record["provincia"] for record in caps + comuni if record.get("provincia")
+        )
+
+        entries = list(self._fuzzy_entries())
+        self.fuzzy_index = ComuneFuzzyIndex(entries)
+        self.autocomplete_index = AutocompleteIndex(entries)
+        self.geo_index = GeoGridIndex(self._geo_entries())
+
+        self.streets = streets
+
+        self.version = self._compute_version(caps, comuni, synonyms, streets)
+        self.source = source
+        self.loaded_at = datetime.utcnow().isoformat()
+
+    def _fuzzy_entries(self):
+        """(name variant, comune, provincia, caps) for every comune and city synonym."""
+        locations = {}
+        for comune, provincia, caps in self._caps.places():
+            yield comune, comune, provincia, caps
+            locations.setdefault(comune, (provincia, caps))
+        for comune, record in self._comuni.items():
+            if comune not in locations:
+                locations[comune] = (record.get("provincia"), list(record.get("caps", [])))
+                yield comune, comune, locations[comune][0], locations[comune][1]
+
+        for (synonym_type, original), translation in self._synonyms.items():
+            if synonym_type == "city" and translation in locations:
+                provincia, caps = locations[translation]
+                yield original, translation, provincia, caps
+
+    def _geo_entries(self):
+        """(comune, provincia, lat, lon, caps) for every comune with a centroid."""
+        for comune, record in self._comuni.items():
+            lat, lon = record.get("lat"), record.get("lon")
+            if lat is None or lon is None:
+                continue
+            caps = [cap_record["cap"] for cap_record in self._caps.find_by_comune(comune)] or record.get("caps", [])
+            yield comune, record.get("provincia"), float(lat), float(lon), caps
+
+    @staticmethod
+    def _compute_version(caps: List[dict], comuni: List[dict], synonyms: List[dict], streets: Optional[StreetIndex]) -> str:
+        """Content hash of the datasets, stable across processes and reloads."""
+        payload = json.dumps([caps, comuni, synonyms, streets.version if streets else None], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def empty(cls) -> "Gazetteer":
+        return cls([], [], [], source="empty")
+
+    @classmethod
+    def from_files(cls) -> "Gazetteer":
+        """Build a snapshot from the bundled JSON dataset files."""
+        caps, comuni, synonyms = dataset_files.load_all()
+        return cls(caps, comuni, synonyms, source="files", streets=load_street_index())
+
+    @classmethod
+    def from_repos(cls, caps_repo, comuni_repo, synonyms_repo) -> "Gazetteer":
+        """Build a snapshot from the MongoDB collections."""
+        return cls(
+            caps_repo.find_all(),
+            comuni_repo.find_all(),
+            synonyms_repo.find_all(),
+            source="mongo",
+            streets=load_street_index(),
+        )
+
+    @classmethod
+    async def from_async_repos(cls, caps_repo, comuni_repo, synonyms_repo) -> "Gazetteer":
+        """Build a snapshot from the MongoDB collections, reading them concurrently."""
+        caps, comuni, synonyms, streets = await asyncio.gather(
+            caps_repo.find_all(),
+            comuni_repo.find_all(),
+            synonyms_repo.find_all(),
+            asyncio.to_thread(load_street_index),
+        )
+        # Indexing the national dataset is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(cls, caps, comuni, synonyms, "mongo", streets)
+
+    def find_by_cap(self, cap: str) -> Optional[dict]:
+        return self._caps.find_by_cap(cap)
+
+    def find_all_by_cap(self, cap: str) -> List[dict]:
+        return self._caps.find_all_by_cap(cap)
+
+    def find_by_comune(self, comune: str) -> List[dict]:
+        return self._caps.find_by_comune(comune)
+
+    def first_by_comune(self, comune: str) -> Tuple[Optional[dict], int]:
+        """(lowest-CAP record, number of CAPs) for a comune; cheaper than find_by_comune for large cities."""
+        return self._caps.first_by_comune(comune)
+
+    def find_comune(self, comune: str) -> Optional[dict]:
+        return self._comuni.get(comune)
+
+    def get_translation(self, synonym_type: str, original: str) -> str:
+        return self._synonyms.get((synonym_type, original.lower()), original)
+
+    def has_streets(self, comune: str, provincia: Optional[str] = None) -> bool:
+        """Whether the stradario lists this comune's streets."""
+        return self.streets is not None and self.streets.covers(comune, provincia)
+
+    def find_street(
+        self, comune: str, street: str, number: Optional[str] = None, provincia: Optional[str] = None
+    ) -> Optional[StreetMatch]:
+        if self.streets is None:
+            return None
+        return self.streets.find(comune, street, number, provincia)
+
+    def autocomplete(self, query: str, limit: int = 10, provincia: Optional[str] = None) -> List[Suggestion]:
+        return self.autocomplete_index.suggest(query, limit, provincia)
+
+    def reverse(self, lat: float, lon: float, limit: int = 5, max_distance_km: Optional[float] = None) -> List[NearbyComune]:
+        return self.geo_index.nearest(lat, lon, limit, max_distance_km)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "caps": self._caps.size,
+            "cap_ranges": self._caps.stats()["ranges"],
+            "comuni": len(self._comuni),
+            "synonyms": len(self._synonyms),
+            "geocoded_comuni": len(self.geo_index),
+            "streets": self.streets.stats()["streets"] if self.streets else 0,
+        }
+
+
+class GazetteerStore:
+    """
+    Holds the current Gazetteer snapshot.
+
+    Readers take ``current`` once per operation; reloads build a new snapshot
+    off to the side and publish it with a single reference swap.
+    """
+
+    def __init__(self, gazetteer: Optional[Gazetteer] = None):
+        self._current = gazetteer or Gazetteer.empty()
+
+    @property
+    def current(self) -> Gazetteer:
+        return self._current
+
+    def swap(self, gazetteer: Gazetteer) -> Gazetteer:
+        """Publish a new snapshot and return the previous one."""
+        previous, self._current = self._current, gazetteer
+        return previous
@@ -0,0 +1,172 @@
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cell edge in degrees: about 11 km north-south, 8 km east-west in Italy,
+# so a national dataset averages under one comune per occupied cell
+GRID_CELL_DEGREES = 0.1
+
+# Most comuni returned for one point
+MAX_RESULTS = 20
+
+
+@dataclass(frozen=True)
+class NearbyComune:
+    comune: str
+    provincia: Optional[str]
+    # The comune's only CAP; None when it has several
+    cap: Optional[str]
+    cap_count: int
+    lat: float
+    lon: float
+    distance_km: float
+
+
+class GeoGridIndex:
+    """
+    Nearest-comune lookup over centroid coordinates.
+
+    Centroids are bucketed into a uniform grid of square cells, each cell
+    holding the ids of its comuni; only occupied cells are stored. A query
+    scans rings of cells around its own, nearest first, and stops once the
+    next ring cannot hold anything closer than the results it already has
+    (or than ``max_distance_km``). Coordinates live in flat float arrays,
+    kept in radians for the distance computation.
+
+    Cells are GRID_CELL_DEGREES wide for a national dataset and grow for
+    sparse ones, so a query scans a handful of cells either way. A point
+    outside the occupied cells starts at the first ring that reaches them,
+    so however far away it is the scan never exceeds the occupied grid.
+    """
+
+    __slots__ = ("_comuni", "_provincia", "_caps", "_lats", "_lons", "_phi", "_lambda", "_cos_phi", "_cell_degrees", "_cells", "_bounds")
+
+    def __init__(self, entries: Iterable[Tuple[str, Optional[str], float, float, Iterable[str]]]):
+        """entries: (comune, provincia, lat, lon, caps) tuples."""
+        self._comuni: List[str] = []
+        self._provincia: List[Optional[str]] = []
+        self._caps: List[Tuple[str, ...]] = []
+        self._lats = array("d")
+        self._lons = array("d")
+        for comune, provincia, lat, lon, caps in entries:
+            self._comuni.append(comune)
+            self._provincia.append(provincia)
+            self._caps.append(tuple(sorted(set(caps))))
+            self._lats.append(lat)
+            self._lons.append(lon)
+
+        self._phi = array("d", (math.radians(lat) for lat in self._lats))
+        self._lambda = array("d", (math.radians(lon) for lon in self._lons))
+        self._cos_phi = array("d", (math.cos(phi) for phi in self._phi))
+
+        # About one comune per cell over the dataset's bounding box
+        self._cell_degrees = GRID_CELL_DEGREES
+        if self._comuni:
+            area = (max(self._lats) - min(self._lats)) * (max(self._lons) - min(self._lons))
+            self._cell_degrees = max(GRID_CELL_DEGREES, math.sqrt(area / len(self._comuni)))
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for place_id, (lat, lon) in enumerate(zip(self._lats, self._lons)):
+            cells.setdefault(self._cell(lat, lon), []).append(place_id)
+        self._cells: Dict[Tuple[int, int], Tuple[int, ...]] = {cell: tuple(ids) for cell, ids in cells.items()}
+        # (min row, max row, min col, max col) of the occupied cells
+        self._bounds = (
+            min(row for row, _ in cells), max(row for row, _ in cells),
+            min(col for _, col in cells), max(col for _, col in cells),
+        ) if cells else None
+
+    def __len__(self) -> int:
+        return len(self._comuni)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_degrees), math.floor(lon / self._cell_degrees)
+
+    def _ring(self, row: int, col: int, radius: int) -> Iterable[Tuple[int, int]]:
+        """Cells at Chebyshev distance ``radius`` from (row, col), clipped to the occupied bounds."""
+        min_row, max_row, min_col, max_col = self._bounds
+        if radius == 0:
+            yield row, col
+            return
+        cols = range(max(col - radius, min_col), min(col + radius, max_col) + 1)
+        for edge_row in (row - radius, row + radius):
+            if min_row <= edge_row <= max_row:
+                for cell_col in cols:
+                    yield edge_row, cell_col
+        rows = range(max(row - radius + 1, min_row), min(row + radius - 1, max_row) + 1)
+        for edge_col in (col - radius, col + radius):
+            if min_col <= edge_col <= max_col:
+                for cell_row in rows:
+                    yield cell_row, edge_col
+
+    def _clearance_km(self, lat: float, lon: float, row: int, col: int, radius: int) -> float:
+        """
+        Lower bound on the distance from the point to any comune outside the
+        cells scanned so far: the distance to the nearest parallel or
+        meridian bounding that block of cells.
+        """
+        size = self._cell_degrees
+        across_lat = min(lat - (row - radius) * size, (row + radius + 1) * size - lat)
+        across_lon = min(lon - (col - radius) * size, (col + radius + 1) * size - lon)
+        # Distance from a point to a meridian Δλ away: asin(cos φ · sin Δλ)
+        to_meridian = math.asin(min(1.0, math.cos(math.radians(lat)) * math.sin(math.radians(min(across_lon, 90.0)))))
+        return EARTH_RADIUS_KM * min(math.radians(across_lat), to_meridian)
+
+    def nearest(self, lat: float, lon: float, limit: int = 5, max_distance_km: Optional[float] = None) -> List[NearbyComune]:
+        """Up to ``limit`` (at most MAX_RESULTS) comuni nearest to the point, closest first."""
+        limit = min(limit, MAX_RESULTS)
+        if self._bounds is None or limit <= 0:
+            return []
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._bounds
+        # Rings before the first are empty for points outside the occupied
+        # bounds; past the last every occupied cell has been scanned
+        first_radius = max(0, min_row - row, row - max_row, min_col - col, col - max_col)
+        last_radius = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+        phi, lam = math.radians(lat), math.radians(lon)
+        cos_phi = math.cos(phi)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        phis, lambdas, cos_phis, cells = self._phi, self._lambda, self._cos_phi, self._cells
+        # Compare squared half-chord lengths (haversine "a"), monotonic in distance
+        cutoff = sin(min(max_distance_km / EARTH_RADIUS_KM / 2, math.pi / 2)) ** 2 if max_distance_km is not None else 1.0
+        # Max-heap of the best ``limit`` (-a, id) found so far
+        best: List[Tuple[float, int]] = []
+        for radius in range(first_radius, last_radius + 1):
+            for cell in self._ring(row, col, radius):
+                for place_id in cells.get(cell, ()):
+                    a = sin((phis[place_id] - phi) / 2) ** 2 + cos_phi * cos_phis[place_id] * sin((lambdas[place_id] - lam) / 2) ** 2
+                    if a > cutoff:
+                        continue
+                    if len(best) < limit:
+                        heapq.heappush(best, (-a, place_id))
+                    elif a < -best[0][0]:
+                        heapq.heapreplace(best, (-a, place_id))
+            if len(best) == limit or max_distance_km is not None:
+                clearance = self._clearance_km(lat, lon, row, col, radius)
+                if max_distance_km is not None and clearance > max_distance_km:
+                    break
+                if len(best) == limit and 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(-best[0][0]))) <= clearance:
+                    break
+
+        return [
+            self._result(place_id, 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))))
+            for a, place_id in sorted((-negated, place_id) for negated, place_id in best)
+        ]
+
+    def _result(self, place_id: int, distance_km: float) -> NearbyComune:
+        caps = self._caps[place_id]
+        return NearbyComune(
+            comune=self._comuni[place_id],
+            provincia=self._provincia[place_id],
+            cap=caps[0] if len(caps) == 1 else None,
+            cap_count=len(caps),
+            lat=self._lats[place_id],
+            lon=self._lons[place_id],
+            distance_km=round(distance_km, 3),
+        )
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+
+# Pipeline stages run in microseconds, database round trips in milliseconds
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1
+)
+IO_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with a single label.
+
+    observe() is a bisect plus a few increments under an uncontended lock,
+    cheap enough to call several times per address.
+    """
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Sequence[float] = STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # Per-bucket counts (+Inf last), sum, count
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self, labels: str = "") -> List[str]:
+        """Exposition lines; ``labels`` ('worker="12",') is prepended to every series' labels."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(value[0]), value[1], value[2]) for key, value in self._series.items()}
+        for label_value in sorted(series):
+            counts, total, count = series[label_value]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{labels}{self.label}="{label_value}",le="{_format_value(bound)}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{labels}{self.label}="{label_value}"}} {_format_value(total)}')
+            lines.append(f'{self.name}_count{{{labels}{self.label}="{label_value}"}} {count}')
+        return lines
+
+
+class Counter:
+    """Prometheus-style counter with a single label."""
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self, labels: str = "") -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_value in sorted(values):
+            lines.append(f'{self.name}{{{labels}{self.label}="{label_value}"}} {_format_value(values[label_value])}')
+        return lines
+
+
+class StageTimer:
+    """
+    Records consecutive pipeline stages as laps of one perf_counter clock,
+    and into the request's RequestTrace when one is given.
+    """
+
+    __slots__ = ("histogram", "trace", "_last")
+
+    def __init__(self, histogram: Histogram, trace=None):
+        self.histogram = histogram
+        self.trace = trace
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(stage, now - self._last)
+        if self.trace is not None:
+            self.trace.add_stage(stage, now - self._last)
+        self._last = now
+
+
+STAGE_SECONDS = Histogram(
+    "address_normalizer_stage_seconds",
+    "Time spent in each stage of the address normalization pipeline.",
+    "stage"
+)
+ISSUES_TOTAL = Counter(
+    "address_normalizer_issues_total",
+    "Normalization results reporting each issue code.",
+    "code"
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_seconds",
+    "MongoDB command round trip time by command name.",
+    "command",
+    IO_BUCKETS
+)
+LOG_WRITE_SECONDS = Histogram(
+    "log_write_seconds",
+    "Time to write one batch of request logs.",
+    "result",
+    IO_BUCKETS
+)
+
+METRICS = (STAGE_SECONDS, ISSUES_TOTAL, MONGO_COMMAND_SECONDS, LOG_WRITE_SECONDS)
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+
+    Metrics live in the memory of the process serving the request, so under
+    the pre-fork server each worker counts only its own requests. Every
+    series carries a ``worker`` label with the process id to keep the
+    workers' series apart.
+    """
+    labels = f'worker="{os.getpid()}",'
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render(labels))
+    return "\n".join(lines) + "\n"
@@ -1,56 +1,120 @@
 import re
+import time
 from typing import Optional, List, Tuple
-from rapidfuzz import process, fuzz
 
-from app.utils.text import normalize_text, extract_cap, extract_civic_number, clean_name, remove_country_suffixes
-from app.utils.street_types import normalize_street_types, extract_street_info, get_full_street_name
-from app.repositories.caps_repo import CapsRepo
-from app.repositories.synonyms_repo import SynonymsRepo
+from app.utils.text import fold_text, normalize_text
+from app.utils.street_types import get_full_street_name
+from app.utils.tokenizer import find_cap, find_civic_number, find_province, find_street, locality_parts, tokenize
+from app.services.cache import NormalizationCache
+from app.services.fuzzy import FuzzyMatch
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.metrics import ISSUES_TOTAL, STAGE_SECONDS, StageTimer
+from app.services.stradario import street_issues
+from app.services.tracing import RequestTrace, TracedGazetteer
 from app.schemas.address import AddressComponents
 
 
 class AddressNormalizer:
-    def __init__(self, caps_repo: CapsRepo, synonyms_repo: SynonymsRepo):
-        self.caps_repo = caps_repo
-        self.synonyms_repo = synonyms_repo
+    def __init__(
+        self,
+        gazetteer_store: GazetteerStore,
+        fuzzy_score_cutoff: Optional[float] = 85.0,
+        cache: Optional[NormalizationCache] = None
+    ):
+        self.gazetteer_store = gazetteer_store
+        # Minimum rapidfuzz ratio to correct a misspelled comune; None disables
+        self.fuzzy_score_cutoff = fuzzy_score_cutoff
+        self.cache = cache
 
-    def normalize_city_name(self, city: str) -> str:
+    def normalize_city_name(self, city: str, gazetteer: Optional[Gazetteer] = None) -> str:
         """Translate city name from English/other languages to Italian."""
         if not city:
             return city
         
-        # Get translation from synonyms repo
-        return self.synonyms_repo.get_translation("city", city.strip())
+        if gazetteer is None:
+            gazetteer = self.gazetteer_store.current
+        
+        # Get translation from synonyms dataset
+        return gazetteer.get_translation("city", city.strip())
 
-    def extract_components(self, address_text: str) -> Tuple[AddressComponents, List[str]]:
+    def extract_components(
+        self,
+        address_text: str,
+        gazetteer: Optional[Gazetteer] = None,
+        trace: Optional[RequestTrace] = None
+    ) -> Tuple[AddressComponents, List[str]]:
         """
         Extract and normalize address components from free-form text.
         Returns tuple of (AddressComponents, issues_list).
+        Stage durations are added to trace; a detailed trace also records
+        every gazetteer lookup and bypasses the cache.
         """
+        # Pin one snapshot so a concurrent reload cannot mix dataset versions
+        if gazetteer is None:
+            gazetteer = self.gazetteer_store.current
+        
+        components, issues = self._lookup(address_text, gazetteer, trace)
+        self._record_issues(issues)
+        return components, issues
+
+    def _lookup(self, address_text: str, gazetteer: Gazetteer, trace: Optional[RequestTrace] = None) -> Tuple[AddressComponents, List[str]]:
+        if trace is not None and trace.detailed:
+            if self.cache is not None:
+                trace.cache = "bypass"
+            return self._extract_components(address_text, TracedGazetteer(gazetteer, trace), trace)
+        if self.cache is None:
+            return self._extract_components(address_text, gazetteer, trace)
+        
+        # Output keeps the input's casing (e.g. street names), so only
+        # whitespace is canonicalised; the version key invalidates on reload
+        key = (gazetteer.version, normalize_text(address_text))
+        cached = self.cache.get(key)
+        if trace is not None:
+            trace.cache = "miss" if cached is None else "hit"
+        if cached is None:
+            cached = self._extract_components(address_text, gazetteer, trace)
+            self.cache.put(key, cached)
+        
+        components, issues = cached
+        return components.model_copy(), list(issues)
+
+    def _extract_components(
+        self,
+        address_text: str,
+        gazetteer: Gazetteer,
+        trace: Optional[RequestTrace] = None
+    ) -> Tuple[AddressComponents, List[str]]:
         issues = []
+        timer = StageTimer(STAGE_SECONDS, trace)
         
-        # Initial text cleanup
+        # One pass classifies CAP, numbers, street types, province and country
         text = normalize_text(address_text)
-        text = remove_country_suffixes(text)
+        tokens = tokenize(text, gazetteer.provinces)
+        timer.lap("tokenize")
         
-        # Extract CAP first as it's most reliable
-        cap = extract_cap(text)
+        # CAP is the most reliable component
+        cap = find_cap(tokens)
+        provincia_hint = find_province(tokens)
         
-        # Normalize street types (English to Italian)
-        text = normalize_street_types(text)
-        
-        # Extract street information
-        street_name, street_type = extract_street_info(text)
+        # Extract street information; the civic number follows the street name
+        street_name, street_type, street_end = find_street(tokens, text)
         full_street = get_full_street_name(street_name, street_type) if street_name and street_type else None
+        civic_number = find_civic_number(tokens, street_end)
+        timer.lap("street_extraction")
         
-        # Extract civic number
-        civic_number = extract_civic_number(text)
+        # Remaining comma-separated parts are potential city names
+        parts = locality_parts(tokens, street_end)
+        timer.lap("city_candidates")
         
-        # Extract potential city name (after comma, before CAP)
-        city_candidates = self._extract_city_candidates(text, cap)
+        # Translate them (English/other languages to Italian)
+        city_candidates = self._translate_city_candidates(parts, gazetteer)
+        timer.lap("synonym_lookup")
         
         # Resolve location data using CAP as source of truth
-        comune, provincia, resolved_cap = self._resolve_location(cap, city_candidates, issues)
+        comune, provincia, resolved_cap = self._resolve_location(
+            cap, city_candidates, issues, gazetteer, provincia_hint, full_street, civic_number
+        )
+        timer.lap("resolution")
         
         # Use resolved CAP if we found one
         if resolved_cap and not cap:
@@ -67,74 +131,110 @@ class AddressNormalizer:
         
         return components, issues
 
-    def _extract_city_candidates(self, text: str, cap: Optional[str]) -> List[str]:
-        """Extract potential city names from text."""
-        candidates = []
-        
-        # Remove CAP and street info to isolate city names
-        working_text = text
-        if cap:
-            working_text = working_text.replace(cap, "")
-        
-        # Remove street patterns
-        street_pattern = r"\b(Via|Viale|Piazza|Piazzale|Corso|Località|Largo|Strada)\s+[^,]*"
-        working_text = re.sub(street_pattern, "", working_text, flags=re.IGNORECASE)
+    def extract_components_batch(self, addresses: List[str]) -> List[Tuple[AddressComponents, List[str]]]:
+        """
+        Extract components for many addresses against a single dataset snapshot.
+        Inputs that only differ in whitespace are normalized once; results are
+        returned in input order and match extract_components item by item.
+        """
+        gazetteer = self.gazetteer_store.current
+        resolved = {}
+        results = []
         
-        # Split by commas and extract potential city names
-        parts = [part.strip() for part in working_text.split(",")]
+        for address_text in addresses:
+            key = normalize_text(address_text)
+            if key not in resolved:
+                resolved[key] = self._lookup(address_text, gazetteer)
+            components, issues = resolved[key]
+            self._record_issues(issues)
+            results.append((components.model_copy(), list(issues)))
         
+        return results
+
+    def _translate_city_candidates(self, parts: List[str], gazetteer: Gazetteer) -> List[str]:
+        """Potential city names from the locality parts of the address."""
+        candidates = []
         for part in parts:
-            # Clean names (remove titles, extra punctuation)
-            cleaned = clean_name(part)
-            if cleaned and len(cleaned) > 2:  # Ignore very short strings
-                # Translate city name
-                translated = self.normalize_city_name(cleaned)
+            if len(part) > 2:  # Ignore very short strings
+                translated = self.normalize_city_name(part, gazetteer)
                 if translated:
                     candidates.append(translated)
-        
         return candidates
 
-    def _resolve_location(self, cap: Optional[str], city_candidates: List[str], issues: List[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    def _resolve_location(
+        self,
+        cap: Optional[str],
+        city_candidates: List[str],
+        issues: List[str],
+        gazetteer: Gazetteer,
+        provincia_hint: Optional[str] = None,
+        street: Optional[str] = None,
+        number: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
         Resolve comune and provincia using CAP as source of truth.
+        provincia_hint is a province code written in the address ("(MI)").
+        When the stradario covers the comune, the street picks the CAP of a
+        multi-CAP comune and is checked against the comune and CAP.
         """
         comune = None
         provincia = None
+        # CAP taken as the lowest of a multi-CAP comune, not from the address
+        guessed_cap = False
         
         if cap:
             # CAP is present - use as source of truth
-            cap_data = self.caps_repo.find_by_cap(cap)
+            cap_data = gazetteer.find_by_cap(cap)
             if cap_data:
                 comune = cap_data["comune"]
                 provincia = cap_data["provincia"]
                 
-                # Check if user-provided city conflicts with CAP
-                if city_candidates:
-                    cap_city_lower = comune.lower()
-                    if not any(candidate.lower() == cap_city_lower for candidate in city_candidates):
-                        issues.append("CITY_PROVINCE_OVERRIDDEN_BY_CAP")
+                # Check if user-provided city or provincia conflicts with CAP
+                cap_city = fold_text(comune)
+                if (
+                    (city_candidates and not any(fold_text(candidate) == cap_city for candidate in city_candidates))
+                    or (provincia_hint and provincia_hint != provincia)
+                ):
+                    issues.append("CITY_PROVINCE_OVERRIDDEN_BY_CAP")
             else:
                 issues.append("CAP_UNKNOWN")
                 # Try to use city candidates if CAP lookup failed
                 if city_candidates:
                     comune = city_candidates[0]  # Use first candidate
+                    if not gazetteer.first_by_comune(comune)[1]:
+                        # Unknown CAPs usually keep a valid provincial prefix
+                        match = self._match_comune(comune, gazetteer, cap=cap)
+                        if match:
+                            if fold_text(match.comune) != fold_text(comune):
+                                issues.append("COMUNE_FUZZY_MATCHED")
+                            comune = match.comune
+                            provincia = match.provincia
         else:
             # No CAP - try to infer from city candidates
             if city_candidates:
                 city = city_candidates[0]
-                possible_caps = self.caps_repo.find_by_comune(city)
+                first_cap, cap_count = gazetteer.first_by_comune(city)
                 
-                if len(possible_caps) == 1:
+                if not cap_count:
+                    # Differently cased or accented ("MILANO", "Forli") or misspelled ("Milno") comune
+                    match = self._match_comune(city, gazetteer, provincia=provincia_hint)
+                    if match:
+                        if fold_text(match.comune) != fold_text(city):
+                            issues.append("COMUNE_FUZZY_MATCHED")
+                        city = match.comune
+                        first_cap, cap_count = gazetteer.first_by_comune(city)
+                
+                if cap_count == 1:
                     # Unique CAP found
-                    cap_data = possible_caps[0]
+                    cap_data = first_cap
                     cap = cap_data["cap"]
                     comune = cap_data["comune"]
                     provincia = cap_data["provincia"]
-                elif len(possible_caps) > 1:
-                    # Multiple CAPs for this comune
-                    issues.append("MULTIPLE_CAPS_FOR_COMUNE")
-                    # Use the first one but indicate uncertainty
-                    cap_data = possible_caps[0]
+                elif cap_count > 1:
+                    # Multiple CAPs for this comune: use the first one unless
+                    # the street narrows it down (MULTIPLE_CAPS_FOR_COMUNE below)
+                    guessed_cap = True
+                    cap_data = first_cap
                     cap = cap_data["cap"]
                     comune = cap_data["comune"]
                     provincia = cap_data["provincia"]
@@ -145,13 +245,49 @@ class AddressNormalizer:
             else:
                 issues.append("INSUFFICIENT_LOCALITY")
         
+        street_problems = []
+        if street and comune and gazetteer.has_streets(comune, provincia):
+            match = gazetteer.find_street(comune, street, number, provincia)
+            if guessed_cap and match:
+                street_caps = match.number_caps or match.caps
+                if len(street_caps) == 1:
+                    cap = street_caps[0]
+                    guessed_cap = False
+            street_problems = street_issues(match, None if guessed_cap else cap)
+        if guessed_cap:
+            issues.append("MULTIPLE_CAPS_FOR_COMUNE")
+        issues.extend(street_problems)
+        
         return comune, provincia, cap
 
-    def format_address(self, components: AddressComponents) -> str:
+    def _match_comune(
+        self,
+        name: str,
+        gazetteer: Gazetteer,
+        cap: Optional[str] = None,
+        provincia: Optional[str] = None
+    ) -> Optional[FuzzyMatch]:
+        """Comune for a name the exact lookup missed: the same name up to case and accents, else a fuzzy match."""
+        return gazetteer.fuzzy_index.exact(name, provincia) or self._fuzzy_match(name, gazetteer, cap=cap, provincia=provincia)
+
+    def _fuzzy_match(
+        self,
+        name: str,
+        gazetteer: Gazetteer,
+        cap: Optional[str] = None,
+        provincia: Optional[str] = None
+    ) -> Optional[FuzzyMatch]:
+        """Correct a comune name against the gazetteer's fuzzy index."""
+        if self.fuzzy_score_cutoff is None:
+            return None
+        return gazetteer.fuzzy_index.match(name, self.fuzzy_score_cutoff, cap=cap, provincia=provincia)
+
+    def format_address(self, components: AddressComponents, trace: Optional[RequestTrace] = None) -> str:
         """
         Format address components into standard Italian postal format:
         <Street + Number>, <CAP> <Comune> <Provincia>, Italia
         """
+        started = time.perf_counter()
         parts = []
         
         # Street and number part
@@ -184,8 +320,17 @@ class AddressNormalizer:
         result = re.sub(r"\s+", " ", result)
         result = re.sub(r",\s*,", ",", result)
         
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe("format", elapsed)
+        if trace is not None:
+            trace.add_stage("format", elapsed)
         return result.strip()
 
+    @staticmethod
+    def _record_issues(issues: List[str]) -> None:
+        for issue in issues:
+            ISSUES_TOTAL.inc(issue)
+
     def calculate_confidence(self, issues: List[str]) -> float:
         """Calculate confidence score based on issues encountered."""
         confidence = 1.0
@@ -196,7 +341,11 @@ class AddressNormalizer:
             "CITY_PROVINCE_OVERRIDDEN_BY_CAP": 0.05,
             "MULTIPLE_CAPS_FOR_COMUNE": 0.15,
             "COMUNE_NOT_FOUND": 0.25,
-            "INSUFFICIENT_LOCALITY": 0.3
+            "COMUNE_FUZZY_MATCHED": 0.1,
+            "INSUFFICIENT_LOCALITY": 0.3,
+            "STREET_NOT_FOUND": 0.1,
+            "STREET_CAP_MISMATCH": 0.1,
+            "CIVIC_NUMBER_OUT_OF_RANGE": 0.05
         }
         
         for issue in issues:
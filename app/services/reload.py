@@ -0,0 +1,33 @@
+"""
+Reload requests from workers to the pre-fork master (``python -m app.server``).
+
+The master records its pid here before forking, so every worker inherits
+it; dataset endpoints then signal the master when the data changed.
+"""
+import os
+import signal
+from typing import Optional
+
+
+# Pid of the pre-fork master, set before forking; None in any other process
+_master_pid: Optional[int] = None
+
+
+def register_master() -> int:
+    """Record the current process as the pre-fork master; returns its pid."""
+    global _master_pid
+    _master_pid = os.getpid()
+    return _master_pid
+
+
+def request_reload() -> bool:
+    """
+    Ask the pre-fork master to reload the gazetteer in all workers.
+
+    Returns False when this process is not a worker of the pre-fork server
+    (plain uvicorn, tests, CLI), where there is nothing else to reload.
+    """
+    if _master_pid is None or os.getppid() != _master_pid:
+        return False
+    os.kill(_master_pid, signal.SIGHUP)
+    return True
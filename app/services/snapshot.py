@@ -0,0 +1,112 @@
+"""
+Prebuilt binary gazetteer snapshots for fast worker start-up.
+
+A snapshot holds a fully indexed Gazetteer (CAP ranges, fuzzy index, lookup
+tables) so a worker maps the file and unpickles it instead of parsing JSON
+and rebuilding indexes. Snapshots are build artifacts produced by
+``python -m app.cli build-snapshot``; like any pickle they must only be
+loaded from trusted paths.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+from app.config import settings
+from app.services import dataset_files
+from app.services.gazetteer import Gazetteer
+
+
+SNAPSHOT_PATH = os.path.join(dataset_files.DATA_DIR, "gazetteer.snapshot")
+
+MAGIC = b"ADDRGAZ\x00"
+# Bump when Gazetteer or its indexes change layout; older snapshots are ignored
+FORMAT_VERSION = 4
+HEADER = struct.Struct("<8sII")  # magic, format version, metadata length
+
+
+def snapshot_path() -> str:
+    return settings.gazetteer_snapshot_path or SNAPSHOT_PATH
+
+
+def write_snapshot(gazetteer: Gazetteer, path: Optional[str] = None) -> dict:
+    """Write ``gazetteer`` to ``path`` atomically; returns the snapshot metadata."""
+    path = path or snapshot_path()
+    metadata = {
+        "version": gazetteer.version,
+        "source": gazetteer.source,
+        "built_at": datetime.utcnow().isoformat(),
+        **{key: value for key, value in gazetteer.stats().items() if key not in ("version", "source", "loaded_at")},
+    }
+    meta_bytes = json.dumps(metadata).encode("utf-8")
+    payload = pickle.dumps(gazetteer, protocol=pickle.HIGHEST_PROTOCOL)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".gazetteer-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return metadata
+
+
+def read_metadata(path: Optional[str] = None) -> Optional[dict]:
+    """Snapshot metadata without loading the payload, or None if missing/incompatible."""
+    path = path or snapshot_path()
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return None
+            magic, format_version, meta_length = HEADER.unpack(header)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                return None
+            return json.loads(f.read(meta_length))
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(path: Optional[str] = None) -> Optional[Gazetteer]:
+    """
+    Map a snapshot file and rebuild the Gazetteer from it.
+
+    Returns None when the file is missing or was built by an incompatible
+    version of the code, so callers can fall back to another source.
+    """
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if len(mapped) < HEADER.size:
+                return None
+            magic, format_version, meta_length = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                return None
+            with memoryview(mapped) as view, view[HEADER.size + meta_length:] as payload:
+                gazetteer = pickle.loads(payload)
+    except (OSError, ValueError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+        print(f"⚠️ Could not load gazetteer snapshot {path}: {e}")
+        return None
+
+    # A snapshot from code with fewer Gazetteer fields that kept the same
+    # FORMAT_VERSION would otherwise fail on first use of the missing field
+    missing = [slot for slot in Gazetteer.__slots__ if slot not in ("source", "loaded_at") and not hasattr(gazetteer, slot)]
+    if not isinstance(gazetteer, Gazetteer) or missing:
+        print(f"⚠️ Ignoring incompatible gazetteer snapshot {path}: missing {', '.join(missing) or 'gazetteer'}")
+        return None
+
+    gazetteer.source = "snapshot"
+    gazetteer.loaded_at = datetime.utcnow().isoformat()
+    return gazetteer
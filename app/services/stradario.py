@@ -0,0 +1,348 @@
+"""
+Street-level reference dataset (stradario): which streets exist in each
+comune, under which CAPs and for which civic number ranges.
+
+A national stradario has millions of rows, so the StreetIndex keeps no
+per-street Python objects: folded street names are concatenated in one
+UTF-8 blob, rows live in parallel typed arrays grouped per street, and an
+open-addressing hash table keyed on (comune, street name) finds a street
+in constant time. The index is written to disk as those raw arrays.
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services import dataset_files
+from app.services.cap_import import COMUNE_FIELDS, PROVINCIA_FIELDS, _iter_csv_rows, _pick
+from app.utils.street_types import normalize_street_types
+from app.utils.text import fold_text
+
+
+STRADARIO_PATH = os.path.join(dataset_files.DATA_DIR, "stradario.bin")
+
+MAGIC = b"ADDRSTR\x00"
+# Bump when StreetIndex changes layout; older files are ignored
+FORMAT_VERSION = 1
+
+STREET_TYPE_FIELDS = ("dug", "tipo", "street_type", "tipo_strada")
+STREET_FIELDS = ("street", "strada", "odonimo", "toponimo", "denominazione_strada", "nome_strada", "via")
+CAP_FIELDS = ("cap",)
+FROM_FIELDS = ("from", "civico_da", "numero_da", "da", "dal")
+TO_FIELDS = ("to", "civico_a", "numero_a", "a", "al")
+PARITY_FIELDS = ("parity", "lato", "pari_dispari", "numerazione")
+
+# Civic range parity
+ALL_NUMBERS = 0
+ODD = 1
+EVEN = 2
+PARITY_VALUES = {"odd": ODD, "dispari": ODD, "d": ODD, "even": EVEN, "pari": EVEN, "p": EVEN}
+
+# Leading digits of a civic number ("12", "10bis", "7A")
+CIVIC_PATTERN = re.compile(r"^\s*(\d+)")
+
+# Hash table load factor; the table is at least this many times the street count
+TABLE_SPARSENESS = 1.5
+
+
+def street_key(street: str) -> str:
+    """Lookup key of a street: canonical street type, folded ("V.le Mazzini" -> "viale mazzini")."""
+    return fold_text(normalize_street_types(street))
+
+
+def civic_value(number: Optional[str]) -> Optional[int]:
+    """Numeric part of a civic number, or None when it has none."""
+    match = CIVIC_PATTERN.match(number) if number else None
+    return int(match.group(1)) if match else None
+
+
+@dataclass(frozen=True)
+class StreetMatch:
+    # Every CAP the street is listed under
+    caps: Tuple[str, ...]
+    # CAPs whose civic ranges include the number; None when no number was given
+    number_caps: Optional[Tuple[str, ...]]
+    # Whether any civic range includes the number, with or without a CAP;
+    # None when no number was given
+    number_covered: Optional[bool] = None
+
+
+class StreetIndex:
+    """
+    Compact (comune, street) -> CAP and civic range index.
+
+    Streets are numbered in build order; street ``i`` has its folded name at
+    ``_blob[_name_offsets[i]:_name_offsets[i + 1]]``, its comune in
+    ``_street_comune[i]`` and its rows at ``_row_bounds[i]:_row_bounds[i + 1]``
+    of the row arrays. A civic range of 0-0 covers the whole street, and one
+    without an end runs from its start to the end of the street.
+    """
+
+    __slots__ = (
+        "_comuni", "_comune_provincia", "_comune_ids",
+        "_blob", "_name_offsets", "_street_comune", "_table",
+        "_row_bounds", "_row_caps", "_row_from", "_row_to", "_row_parity",
+        "version",
+    )
+
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str], str, Optional[str], int, int, int]]):
+        """rows: (comune, provincia, street, cap, civic from, civic to, parity) tuples."""
+        self._comuni: List[str] = []
+        self._comune_provincia: List[Optional[str]] = []
+        # Folded comune name -> ids, several for homonyms in different province
+        self._comune_ids: Dict[str, List[int]] = {}
+        comune_ids: Dict[Tuple[str, Optional[str]], int] = {}
+        street_ids: Dict[Tuple[int, str], int] = {}
+        street_rows: List[List[Tuple[int, int, int, int]]] = []
+        digest = hashlib.sha256()
+
+        for comune, provincia, street, cap, start, end, parity in rows:
+            key = street_key(street)
+            if not key:
+                continue
+            digest.update(f"{comune}|{provincia}|{key}|{cap}|{start}|{end}|{parity}\n".encode("utf-8"))
+
+            comune_id = comune_ids.get((comune, provincia))
+            if comune_id is None:
+                comune_id = comune_ids[(comune, provincia)] = len(self._comuni)
+                self._comuni.append(comune)
+                self._comune_provincia.append(provincia)
+                self._comune_ids.setdefault(fold_text(comune), []).append(comune_id)
+
+            street_id = street_ids.get((comune_id, key))
+            if street_id is None:
+                street_id = street_ids[(comune_id, key)] = len(street_rows)
+                street_rows.append([])
+            street_rows[street_id].append((int(cap) if cap else 0, start, end, parity))
+
+        self._blob = bytearray()
+        self._name_offsets = array("I", [0])
+        self._street_comune = array("I", bytes(4 * len(street_rows)))
+        # Dict order is street id order
+        for (comune_id, key), street_id in street_ids.items():
+            self._blob.extend(key.encode("utf-8"))
+            self._name_offsets.append(len(self._blob))
+            self._street_comune[street_id] = comune_id
+        self._blob = bytes(self._blob)
+
+        self._row_bounds = array("I", [0])
+        self._row_caps = array("I")
+        self._row_from = array("I")
+        self._row_to = array("I")
+        self._row_parity = array("B")
+        for street in street_rows:
+            for cap, start, end, parity in sorted(set(street)):
+                self._row_caps.append(cap)
+                self._row_from.append(start)
+                self._row_to.append(end)
+                self._row_parity.append(parity)
+            self._row_bounds.append(len(self._row_caps))
+
+        size = 1
+        while size < max(8, len(street_rows) * TABLE_SPARSENESS):
+            size *= 2
+        # Slot value is street id + 1; 0 marks an empty slot
+        self._table = array("I", bytes(4 * size))
+        for street_id in range(len(street_rows)):
+            slot = self._slot(self._street_comune[street_id], self._name(street_id))
+            while self._table[slot]:
+                slot = (slot + 1) & (size - 1)
+            self._table[slot] = street_id + 1
+
+        self.version = digest.hexdigest()[:16]
+
+    def _name(self, street_id: int) -> bytes:
+        return self._blob[self._name_offsets[street_id]:self._name_offsets[street_id + 1]]
+
+    def _slot(self, comune_id: int, name: bytes) -> int:
+        # zlib.crc32 is stable across processes, unlike hash() on str
+        return zlib.crc32(name, comune_id) & (len(self._table) - 1)
+
+    def _find_comune(self, comune: str, provincia: Optional[str]) -> Optional[int]:
+        ids = self._comune_ids.get(fold_text(comune))
+        if not ids:
+            return None
+        for comune_id in ids:
+            if not provincia or self._comune_provincia[comune_id] == provincia:
+                return comune_id
+        return None
+
+    def covers(self, comune: str, provincia: Optional[str] = None) -> bool:
+        """Whether the dataset lists streets for this comune (missing streets are then errors)."""
+        return self._find_comune(comune, provincia) is not None
+
+    def find(self, comune: str, street: str, number: Optional[str] = None, provincia: Optional[str] = None) -> Optional[StreetMatch]:
+        """CAPs of ``street`` in ``comune`` (and of the range holding ``number``), or None if unknown."""
+        comune_id = self._find_comune(comune, provincia)
+        if comune_id is None:
+            return None
+        name = street_key(street).encode("utf-8")
+        mask = len(self._table) - 1
+        slot = self._slot(comune_id, name)
+        while True:
+            value = self._table[slot]
+            if not value:
+                return None
+            street_id = value - 1
+            if self._street_comune[street_id] == comune_id and self._name(street_id) == name:
+                return self._match(street_id, civic_value(number))
+            slot = (slot + 1) & mask
+
+    def _match(self, street_id: int, civic: Optional[int]) -> StreetMatch:
+        caps = []
+        number_caps = [] if civic is not None else None
+        covered = False
+        for row in range(self._row_bounds[street_id], self._row_bounds[street_id + 1]):
+            cap = f"{self._row_caps[row]:05d}" if self._row_caps[row] else None
+            if cap and cap not in caps:
+                caps.append(cap)
+            if civic is not None and self._covers_number(row, civic):
+                covered = True
+                if cap and cap not in number_caps:
+                    number_caps.append(cap)
+        if civic is None:
+            return StreetMatch(caps=tuple(caps), number_caps=None)
+        return StreetMatch(caps=tuple(caps), number_caps=tuple(number_caps), number_covered=covered)
+
+    def _covers_number(self, row: int, civic: int) -> bool:
+        start, end = self._row_from[row], self._row_to[row]
+        if start == end == 0:
+            return True
+        parity = self._row_parity[row]
+        if (parity == ODD and civic % 2 == 0) or (parity == EVEN and civic % 2 == 1):
+            return False
+        # A range without an end runs to the end of the street
+        return civic >= start and (end == 0 or civic <= end)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "comuni": len(self._comuni),
+            "streets": len(self._name_offsets) - 1,
+            "rows": len(self._row_caps),
+            "bytes": (
+                len(self._blob)
+                + sum(len(values) * values.itemsize for values in (
+                    self._name_offsets, self._street_comune, self._table, self._row_bounds,
+                    self._row_caps, self._row_from, self._row_to, self._row_parity,
+                ))
+            ),
+        }
+
+
+def street_issues(match: Optional[StreetMatch], cap: Optional[str]) -> List[str]:
+    """Issue codes for a street checked against a comune that the stradario covers."""
+    if match is None:
+        return ["STREET_NOT_FOUND"]
+    if match.number_covered is False:
+        return ["CIVIC_NUMBER_OUT_OF_RANGE"]
+    caps = match.number_caps or match.caps
+    if cap and caps and cap not in caps:
+        return ["STREET_CAP_MISMATCH"]
+    return []
+
+
+@dataclass
+class StreetImport:
+    rows: List[Tuple[str, Optional[str], str, Optional[str], int, int, int]] = field(default_factory=list)
+    invalid_rows: int = 0
+
+
+def _number(value) -> int:
+    match = CIVIC_PATTERN.match(str(value)) if value not in (None, "") else None
+    return int(match.group(1)) if match else 0
+
+
+def _normalize_row(row: Dict[str, object]):
+    row = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    comune = _pick(row, COMUNE_FIELDS)
+    street = _pick(row, STREET_FIELDS)
+    if not comune or not street:
+        return None
+    street_type = _pick(row, STREET_TYPE_FIELDS)
+    if street_type:
+        street = f"{street_type} {street}"
+    provincia = _pick(row, PROVINCIA_FIELDS)
+    cap = _pick(row, CAP_FIELDS)
+    cap = str(cap).strip().zfill(5) if cap not in (None, "") and str(cap).strip().isdigit() else None
+    parity = PARITY_VALUES.get(str(_pick(row, PARITY_FIELDS) or "").strip().lower(), ALL_NUMBERS)
+    return (
+        str(comune).strip(),
+        str(provincia).strip().upper() if provincia else None,
+        str(street).strip(),
+        cap,
+        _number(_pick(row, FROM_FIELDS)),
+        _number(_pick(row, TO_FIELDS)),
+        parity,
+    )
+
+
+def _iter_json_rows(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("streets") or data.get("data") or []
+    yield from data
+
+
+def load_street_source(path: str, input_format: Optional[str] = None) -> StreetImport:
+    """
+    Read a stradario export (json or csv, detected from the extension by
+    default): one row per street, CAP and civic range, with the street type
+    either in its own column (DUG, "VIA") or at the start of the name.
+    """
+    input_format = (input_format or ("json" if path.lower().endswith(".json") else "csv")).lower()
+    rows = _iter_json_rows(path) if input_format == "json" else _iter_csv_rows(path)
+    result = StreetImport()
+    for row in rows:
+        normalized = _normalize_row(row)
+        if normalized is None:
+            result.invalid_rows += 1
+        else:
+            result.rows.append(normalized)
+    return result
+
+
+def stradario_path() -> str:
+    return settings.stradario_path or STRADARIO_PATH
+
+
+def write_street_index(index: StreetIndex, path: Optional[str] = None) -> None:
+    """Write ``index`` to ``path`` atomically."""
+    path = path or stradario_path()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stradario-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + FORMAT_VERSION.to_bytes(4, "little"))
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_street_index(path: Optional[str] = None) -> Optional[StreetIndex]:
+    """The stradario index, or None when no file exists or it was built by an incompatible version."""
+    path = path or stradario_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            header = f.read(len(MAGIC) + 4)
+            if header[:len(MAGIC)] != MAGIC or int.from_bytes(header[len(MAGIC):], "little") != FORMAT_VERSION:
+                print(f"⚠️ Ignoring stradario {path}: built by an incompatible version; re-run import-streets")
+                return None
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        print(f"⚠️ Could not load stradario {path}: {e}")
+        return None
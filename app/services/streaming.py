@@ -0,0 +1,274 @@
+import codecs
+import csv
+import io
+import json
+from collections import deque
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from app.services.normalizer import AddressNormalizer
+
+
+NDJSON = "ndjson"
+CSV = "csv"
+
+CSV_OUTPUT_FIELDS = [
+    "row", "input", "formatted", "street", "number", "cap", "comune",
+    "provincia", "country", "confidence", "issues", "error",
+]
+
+# (row number, address or None, error message or None)
+Row = Tuple[int, Optional[str], Optional[str]]
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    """Pick the input format from a Content-Type header, defaulting to NDJSON."""
+    if content_type and "csv" in content_type.lower():
+        return CSV
+    return NDJSON
+
+
+# Bounds on one input row: a physical line, and a CSV record whose quoted
+# fields span lines. A stray quote would otherwise swallow the rest of the
+# body into one record; past these bounds the row is rejected instead
+MAX_LINE_LENGTH = 64 * 1024
+MAX_RECORD_LINES = 50
+# Characters of a rejected row echoed back as its input
+REJECTED_PREVIEW_LENGTH = 200
+
+
+class RejectedRecord(str):
+    """
+    Placeholder for an input row that could not be read (overlong line,
+    unterminated quoted field). Holds a preview of the row; parsing it raises
+    ValueError with ``error``, so it becomes a per-row error.
+    """
+
+    error: str
+
+    def __new__(cls, text: str, error: str) -> "RejectedRecord":
+        record = super().__new__(cls, text[:REJECTED_PREVIEW_LENGTH])
+        record.error = error
+        return record
+
+
+def _overlong_line(text: str) -> RejectedRecord:
+    return RejectedRecord(text, f"Line longer than {MAX_LINE_LENGTH} characters")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode a UTF-8 byte stream into lines without buffering the whole body.
+    A line over MAX_LINE_LENGTH is yielded as a RejectedRecord and the rest
+    of it is skipped, up to the next newline.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    skipping = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > MAX_LINE_LENGTH:
+                yield _overlong_line(line)
+            else:
+                yield line.rstrip("\r")
+        if len(pending) > MAX_LINE_LENGTH:
+            if not skipping:
+                yield _overlong_line(pending)
+            skipping = True
+            pending = ""
+    pending += decoder.decode(b"", final=True)
+    if pending and not skipping:
+        yield pending.rstrip("\r") if len(pending) <= MAX_LINE_LENGTH else _overlong_line(pending)
+
+
+def iter_text_lines(source: TextIO) -> Iterator[str]:
+    """Lines of a text file without their line ending, bounded like iter_lines."""
+    while True:
+        line = source.readline(MAX_LINE_LENGTH + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_LENGTH and not line.endswith(("\n", "\r")):
+            yield _overlong_line(line)
+            # Skip the rest of the line
+            while line and not line.endswith(("\n", "\r")):
+                line = source.readline(MAX_LINE_LENGTH + 1)
+            continue
+        yield line.rstrip("\r\n")
+
+
+class CsvRecordSplitter:
+    """
+    Groups physical lines into CSV records (quoted fields may span lines).
+
+    A record still inside a quoted field after MAX_RECORD_LINES lines or
+    MAX_LINE_LENGTH characters, or at the end of the input, is taken to
+    start with a stray quote: its first line is rejected and reading
+    resumes at the line after it, so the rows that followed are not lost.
+    """
+
+    def __init__(self, max_lines: int = MAX_RECORD_LINES, max_length: int = MAX_LINE_LENGTH):
+        self.max_lines = max_lines
+        self.max_length = max_length
+        self._lines: List[str] = []
+        self._length = 0
+        self._quotes = 0
+
+    def feed(self, line: str) -> List[str]:
+        """Add one line; returns the records it completes."""
+        records: List[str] = []
+        self._consume(deque([line]), records)
+        return records
+
+    def close(self) -> List[str]:
+        """End of input: returns the remaining records."""
+        records: List[str] = []
+        while self._lines:
+            self._consume(deque(self._reject_open(records)), records)
+        return records
+
+    def _consume(self, queue: deque, records: List[str]) -> None:
+        while queue:
+            line = queue.popleft()
+            if isinstance(line, RejectedRecord):
+                if self._lines:
+                    # An unreadable line cannot continue a quoted field
+                    queue.appendleft(line)
+                    queue.extendleft(reversed(self._reject_open(records)))
+                else:
+                    records.append(line)
+                continue
+
+            self._lines.append(line)
+            self._length += len(line) + 1
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append("\n".join(self._lines))
+                self._reset()
+            elif len(self._lines) > self.max_lines or self._length > self.max_length:
+                queue.extendleft(reversed(self._reject_open(records)))
+
+    def _reject_open(self, records: List[str]) -> List[str]:
+        """Reject the open record's first line; returns the lines to read again."""
+        first, *rest = self._lines
+        self._reset()
+        records.append(RejectedRecord(first, "Unterminated quoted field"))
+        return rest
+
+    def _reset(self) -> None:
+        self._lines = []
+        self._length = 0
+        self._quotes = 0
+
+
+def iter_csv_records(lines: Iterable[str]) -> Iterator[str]:
+    """Group physical lines into CSV records; see CsvRecordSplitter."""
+    splitter = CsvRecordSplitter()
+    for line in lines:
+        yield from splitter.feed(line)
+    yield from splitter.close()
+
+
+async def aiter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Async counterpart of iter_csv_records."""
+    splitter = CsvRecordSplitter()
+    async for line in lines:
+        for record in splitter.feed(line):
+            yield record
+    for record in splitter.close():
+        yield record
+
+
+def parse_ndjson_line(line: str, column: str = "address") -> str:
+    """Extract the address from an NDJSON line (object with `column`, or a bare string)."""
+    if isinstance(line, RejectedRecord):
+        raise ValueError(line.error)
+    try:
+        value = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e.msg}")
+    if isinstance(value, dict):
+        value = value.get(column)
+    if not isinstance(value, str):
+        raise ValueError(f"Expected a string '{column}' field")
+    return value
+
+
+class CsvRowParser:
+    """Parses CSV records into addresses using the column named in the header."""
+
+    def __init__(self, header_record: str, column: str = "address"):
+        if isinstance(header_record, RejectedRecord):
+            raise ValueError(f"Unreadable CSV header: {header_record.error}")
+        header = next(csv.reader([header_record]), [])
+        names = [name.strip().lower() for name in header]
+        if column.lower() not in names:
+            raise ValueError(f"CSV header has no '{column}' column")
+        self.index = names.index(column.lower())
+
+    def parse(self, record: str) -> str:
+        if isinstance(record, RejectedRecord):
+            raise ValueError(record.error)
+        fields = next(csv.reader([record]), [])
+        if len(fields) <= self.index:
+            raise ValueError(f"Row has {len(fields)} columns, expected at least {self.index + 1}")
+        return fields[self.index]
+
+
+def normalize_rows(normalizer: AddressNormalizer, rows: List[Row]) -> List[dict]:
+    """
+    Normalize a chunk of parsed rows, keeping row order and per-row errors.
+    Valid rows are resolved together against one dataset snapshot.
+    """
+    addresses = [address for _, address, error in rows if error is None]
+    extracted = iter(normalizer.extract_components_batch(addresses))
+
+    items = []
+    for row, address, error in rows:
+        if error is not None:
+            items.append({"row": row, "input": address, "error": error})
+            continue
+        components, issues = next(extracted)
+        items.append({
+            "row": row,
+            "input": address,
+            "formatted": normalizer.format_address(components),
+            "components": components.model_dump(),
+            "confidence": normalizer.calculate_confidence(issues),
+            "issues": issues,
+        })
+    return items
+
+
+def format_ndjson(items: List[dict]) -> str:
+    return "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+
+
+def format_csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(CSV_OUTPUT_FIELDS)
+    return buffer.getvalue()
+
+
+def format_csv_rows(items: List[dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for item in items:
+        components = item.get("components") or {}
+        writer.writerow([
+            item["row"],
+            item.get("input") or "",
+            item.get("formatted", ""),
+            components.get("street") or "",
+            components.get("number") or "",
+            components.get("cap") or "",
+            components.get("comune") or "",
+            components.get("provincia") or "",
+            components.get("country") or "",
+            item.get("confidence", ""),
+            "|".join(item.get("issues", [])),
+            item.get("error") or "",
+        ])
+    return buffer.getvalue()
@@ -0,0 +1,120 @@
+"""
+Per-request timing for the Server-Timing header and opt-in lookup traces.
+
+A RequestTrace collects the duration of each pipeline stage for one request.
+Detailed traces (admin only) also wrap the gazetteer so every lookup and
+synonym translation is recorded with its arguments, result and duration.
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Pipeline stages folded into the coarser Server-Timing metrics
+SERVER_TIMING_METRICS = {
+    "tokenize": "parse",
+    "street_extraction": "parse",
+    "city_candidates": "parse",
+    "synonym_lookup": "lookup",
+    "resolution": "lookup",
+    "cap_lookup": "lookup",
+    "checks": "validate",
+    "format": "format",
+    "log": "log",
+}
+
+
+class RequestTrace:
+    """Stage durations, and optionally every gazetteer lookup, for one request."""
+
+    def __init__(self, detailed: bool = False):
+        self.detailed = detailed
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.lookups: List[dict] = []
+        # "hit", "miss" or "bypass" (detailed traces skip the cache); None when not used
+        self.cache: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - started)
+
+    def record_lookup(self, operation: str, args: tuple, result: Any, seconds: float) -> None:
+        self.lookups.append({
+            "operation": operation,
+            "args": list(args),
+            "result": _describe(result),
+            "ms": round(seconds * 1000, 3),
+        })
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: parse/lookup/format/log durations in ms, plus total."""
+        metrics: Dict[str, float] = {}
+        for stage, seconds in self.stages.items():
+            metric = SERVER_TIMING_METRICS.get(stage, stage)
+            metrics[metric] = metrics.get(metric, 0.0) + seconds
+
+        entries = [f"{metric};dur={seconds * 1000:.3f}" for metric, seconds in metrics.items()]
+        if self.cache:
+            entries.append(f'cache;desc="{self.cache}"')
+        entries.append(f"total;dur={self.elapsed() * 1000:.3f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_ms": round(self.elapsed() * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            "cache": self.cache,
+            "lookups": self.lookups,
+        }
+
+
+def _describe(result: Any) -> Any:
+    """JSON-friendly copy of a lookup result (FuzzyMatch, (record, count) tuples)."""
+    if is_dataclass(result):
+        return asdict(result)
+    if isinstance(result, tuple):
+        return [_describe(item) for item in result]
+    return result
+
+
+class _TracedCalls:
+    """Proxy timing every method call on ``target`` into a RequestTrace."""
+
+    def __init__(self, target: Any, trace: RequestTrace, prefix: str):
+        self._target = target
+        self._trace = trace
+        self._prefix = prefix
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+
+        def traced(*args, **kwargs):
+            started = time.perf_counter()
+            result = value(*args, **kwargs)
+            call_args = args + tuple(f"{key}={item}" for key, item in kwargs.items() if item is not None)
+            self._trace.record_lookup(f"{self._prefix}.{name}", call_args, result, time.perf_counter() - started)
+            return result
+
+        return traced
+
+
+class TracedGazetteer(_TracedCalls):
+    """Gazetteer whose lookups, synonym translations and fuzzy matches are traced."""
+
+    def __init__(self, gazetteer, trace: RequestTrace):
+        super().__init__(gazetteer, trace, "gazetteer")
+        self.fuzzy_index = _TracedCalls(gazetteer.fuzzy_index, trace, "fuzzy_index")
@@ -1,17 +1,72 @@
-from typing import List, Tuple
+import re
+import time
+from typing import Dict, List, Optional, Tuple
 from app.schemas.address import AddressComponents
-from app.repositories.caps_repo import CapsRepo
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.stradario import street_issues
+from app.services.tracing import RequestTrace, TracedGazetteer
 
 
-class AddressValidator:
-    def __init__(self, caps_repo: CapsRepo):
-        self.caps_repo = caps_repo
+# Letters, spaces, apostrophes, periods, hyphens and accented vowels
+STREET_PATTERN = re.compile(r"^[A-Za-z\s\.'àáâäèéêëìíîïòóôöùúûü-]+$")
+# Digits optionally followed by letters (e.g., "123", "45A", "7bis")
+NUMBER_PATTERN = re.compile(r"^\d+[A-Za-z]*$")
+
+# Confidence lost per stradario issue
+STREET_PENALTIES = {
+    "STREET_NOT_FOUND": 0.2,
+    "STREET_CAP_MISMATCH": 0.3,
+    "CIVIC_NUMBER_OUT_OF_RANGE": 0.1,
+}
+
 
-    def validate_components(self, components: AddressComponents) -> Tuple[bool, List[str], float]:
+class AddressValidator:
+    def __init__(self, gazetteer_store: GazetteerStore):
+        self.gazetteer_store = gazetteer_store
+
+    def validate_components(
+        self,
+        components: AddressComponents,
+        trace: Optional[RequestTrace] = None
+    ) -> Tuple[bool, List[str], float]:
         """
         Validate address components and return validation status, issues, and confidence.
         Returns tuple of (is_valid, issues, confidence).
         """
+        gazetteer = self.gazetteer_store.current
+        if trace is None:
+            cap_data = gazetteer.find_by_cap(components.cap) if components.cap else None
+            return self._validate(components, cap_data, gazetteer)
+        
+        if trace.detailed:
+            gazetteer = TracedGazetteer(gazetteer, trace)
+        started = time.perf_counter()
+        cap_data = gazetteer.find_by_cap(components.cap) if components.cap else None
+        looked_up = time.perf_counter()
+        result = self._validate(components, cap_data, gazetteer)
+        trace.add_stage("cap_lookup", looked_up - started)
+        trace.add_stage("checks", time.perf_counter() - looked_up)
+        return result
+
+    def validate_components_batch(self, items: List[AddressComponents]) -> List[Tuple[bool, List[str], float]]:
+        """
+        Validate many records against a single dataset snapshot.
+        Each distinct CAP is resolved once; results are returned in input order
+        and match validate_components item by item.
+        """
+        gazetteer = self.gazetteer_store.current
+        caps: Dict[str, Optional[dict]] = {
+            cap: gazetteer.find_by_cap(cap)
+            for cap in {components.cap for components in items if components.cap}
+        }
+        return [self._validate(components, caps.get(components.cap), gazetteer) for components in items]
+
+    def _validate(
+        self,
+        components: AddressComponents,
+        cap_data: Optional[dict],
+        gazetteer: Gazetteer
+    ) -> Tuple[bool, List[str], float]:
         issues = []
         confidence = 1.0
 
@@ -27,7 +82,6 @@ class AddressValidator:
 
         # Cross-validate CAP with comune and provincia
         if components.cap:
-            cap_data = self.caps_repo.find_by_cap(components.cap)
             if cap_data:
                 # Check if provided comune matches CAP
                 if components.comune and cap_data["comune"].lower() != components.comune.lower():
@@ -54,6 +108,11 @@ class AddressValidator:
                 issues.append("INVALID_NUMBER_FORMAT")
                 confidence -= 0.1
 
+        # Check the street against the stradario of its comune
+        for issue in self._street_issues(components, cap_data, gazetteer):
+            issues.append(issue)
+            confidence -= STREET_PENALTIES[issue]
+
         # Check completeness
         if not components.cap and not components.comune:
             issues.append("MISSING_LOCATION_INFO")
@@ -64,6 +123,24 @@ class AddressValidator:
 
         return is_valid, issues, confidence
 
+    def _street_issues(self, components: AddressComponents, cap_data: Optional[dict], gazetteer: Gazetteer) -> List[str]:
+        """
+        Stradario issues for the street, looked up in the given comune or else
+        the CAP's. Comuni the stradario does not cover are not checked.
+        """
+        if not components.street:
+            return []
+        if components.comune:
+            comune, provincia = components.comune, components.provincia
+        elif cap_data:
+            comune, provincia = cap_data["comune"], cap_data["provincia"]
+        else:
+            return []
+        if not gazetteer.has_streets(comune, provincia):
+            return []
+        match = gazetteer.find_street(comune, components.street, components.number, provincia)
+        return street_issues(match, components.cap)
+
     def _is_valid_cap_format(self, cap: str) -> bool:
         """Check if CAP has valid 5-digit format."""
         return cap.isdigit() and len(cap) == 5
@@ -78,17 +155,11 @@ class AddressValidator:
             return False
         
         # Check if it contains reasonable characters
-        import re
-        # Allow letters, spaces, apostrophes, periods, and some common punctuation
-        valid_pattern = r"^[A-Za-z\s\.'àáâäèéêëìíîïòóôöùúûü-]+$"
-        return bool(re.match(valid_pattern, street))
+        return bool(STREET_PATTERN.match(street))
 
     def _is_valid_number_format(self, number: str) -> bool:
         """Basic validation of civic number format."""
         if not number:
             return False
         
-        import re
-        # Should be digits optionally followed by letters (e.g., "123", "45A", "7bis")
-        valid_pattern = r"^\d+[A-Za-z]*$"
-        return bool(re.match(valid_pattern, number))
\ No newline at end of file
+        return bool(NUMBER_PATTERN.match(number))
\ No newline at end of file
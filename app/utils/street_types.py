@@ -1,5 +1,5 @@
 import re
-from typing import Dict
+from typing import Dict, Iterable, List
 
 
 # Street type translations from English to Italian
@@ -42,46 +42,85 @@ ITALIAN_ABBREVIATIONS = {
 }
 
 
-def normalize_street_types(text: str) -> str:
-    """Normalize street types from English to Italian and expand abbreviations."""
-    result = text
-    
-    # First normalize English street types to Italian
-    for english, italian in STREET_TYPES_TRANSLATIONS.items():
-        # Use word boundaries to avoid partial matches
-        pattern = rf"\b{re.escape(english)}\b"
-        result = re.sub(pattern, italian, result, flags=re.IGNORECASE)
-    
-    # Then expand Italian abbreviations
-    for abbrev, full in ITALIAN_ABBREVIATIONS.items():
-        # Case insensitive replacement for abbreviations
-        pattern = rf"\b{re.escape(abbrev)}\b"
-        result = re.sub(pattern, full, result, flags=re.IGNORECASE)
-    
-    return result
+# Street types recognised by app.utils.tokenizer (tokenize / find_street), in order of precedence
+STREET_TYPES = [
+    "Piazzale", "Piazza", "Viale", "Via", "Corso", "Località", "Largo", "Strada", "Corte"
+]
 
 
-def extract_street_info(text: str) -> tuple[str, str]:
-    """
-    Extract street name and type from text.
-    Returns tuple of (street_name, street_type) or (None, None) if not found.
+class StreetTypeRewriter:
     """
-    # Common Italian street types in order of specificity
-    street_types = [
-        "Piazzale", "Piazza", "Viale", "Via", "Corso", "Località", "Largo", "Strada", "Corte"
-    ]
+    Precompiled street-type engine.
     
-    for street_type in street_types:
-        # Look for pattern: street_type + space + street_name
-        pattern = rf"\b({street_type})\s+([^,\d]*?)(?=\s*\d|\s*,|$)"
-        match = re.search(pattern, text, re.IGNORECASE)
+    All English street types and Italian abbreviations are folded into one
+    alternation regex with a replacement lookup table, so rewriting is a
+    single scan of the text. The address tokenizer is built from the same
+    tables.
+    """
+
+    def __init__(self, replacements: Dict[str, str], street_types: List[str]):
+        self.replacements = {alias.lower(): full for alias, full in replacements.items()}
+        self.street_types = list(street_types)
         
-        if match:
-            street_name = match.group(2).strip()
-            if street_name:  # Make sure we found a name
-                return street_name, street_type
-    
-    return None, None
+        # Longest aliases first so "square" wins over "sq"; dotted aliases
+        # ("str.", "loc.") cannot end on a word boundary, so only anchor the start
+        aliases = sorted(self.replacements, key=len, reverse=True)
+        self._rewrite_pattern = re.compile(
+            "|".join(
+                rf"\b{re.escape(alias)}\b" if alias[-1].isalnum() else rf"\b{re.escape(alias)}"
+                for alias in aliases
+            ),
+            re.IGNORECASE
+        )
+
+    def _replace(self, match: re.Match) -> str:
+        full = self.replacements[match.group(0).lower()]
+        # "str.Roma" -> "Strada Roma"
+        end = match.end()
+        if match.group(0)[-1] == "." and end < len(match.string) and match.string[end].isalnum():
+            return full + " "
+        return full
+
+    def rewrite(self, text: str) -> str:
+        return self._rewrite_pattern.sub(self._replace, text)
+
+
+def _build_rewriter() -> StreetTypeRewriter:
+    # English translations take precedence over Italian abbreviations
+    replacements = {**ITALIAN_ABBREVIATIONS, **STREET_TYPES_TRANSLATIONS}
+    return StreetTypeRewriter(replacements, STREET_TYPES)
+
+
+_rewriter = _build_rewriter()
+
+
+def register_street_type(street_type: str, aliases: Iterable[str] = ()) -> None:
+    """
+    Register an extra street type (e.g. "Vicolo") and its abbreviations
+    (e.g. "vic.") and rebuild the precompiled rewriter once.
+    """
+    register_street_types({street_type: list(aliases)})
+
+
+def register_street_types(street_types: Dict[str, List[str]]) -> None:
+    """Register several street types at once, mapping each to its aliases."""
+    global _rewriter
+    for street_type, aliases in street_types.items():
+        if street_type not in STREET_TYPES:
+            STREET_TYPES.append(street_type)
+        for alias in aliases:
+            ITALIAN_ABBREVIATIONS[alias.lower()] = street_type
+    _rewriter = _build_rewriter()
+
+
+def get_rewriter() -> StreetTypeRewriter:
+    """The rewriter for the currently registered street types."""
+    return _rewriter
+
+
+def normalize_street_types(text: str) -> str:
+    """Normalize street types from English to Italian and expand abbreviations."""
+    return _rewriter.rewrite(text)
 
 
 def get_full_street_name(street_name: str, street_type: str) -> str:
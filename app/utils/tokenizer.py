@@ -0,0 +1,321 @@
+"""
+Single-pass lexer for free-form address text.
+
+One compiled regex splits the text into classified tokens (CAP, civic number,
+street type, province code, country, word) and comma separators. The
+normalizer reads the CAP, street, civic number and locality parts from this
+token stream instead of rescanning the string once per component.
+"""
+import re
+from typing import AbstractSet, Dict, List, NamedTuple, Optional, Tuple
+
+from app.utils import street_types
+
+
+# Token kinds
+CAP = "cap"
+NUMBER = "number"
+STREET_TYPE = "street_type"
+PROVINCE = "province"
+COUNTRY = "country"
+WORD = "word"
+SEPARATOR = "separator"
+
+# Trailing words dropped as the country ("..., Milano, Italia")
+COUNTRY_NAMES = frozenset({"italia", "italy", "it"})
+
+# Leading titles ignored in locality parts ("Prof. Rossi"); "Dr" doubles as
+# a street alias, so a part starting "Dr <name>" is read as the title
+TITLES = frozenset({"mr", "mrs", "ms", "dr", "prof"})
+
+# "Via 4 Novembre", "Corso 22 Marzo": the number belongs to the street name
+MONTHS = frozenset({
+    "gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno",
+    "luglio", "agosto", "settembre", "ottobre", "novembre", "dicembre",
+})
+
+NUMBER_SUFFIXES = ("bis", "ter", "quater")
+
+
+class Token(NamedTuple):
+    kind: str
+    # As written in the input
+    text: str
+    # Canonical form: full street type ("Piazza"), compact civic number
+    # ("10bis", "12A"), uppercase province code; the text otherwise
+    value: str
+    start: int
+    end: int
+    # Index of the comma-separated part the token belongs to
+    segment: int
+
+
+class AddressTokenizer:
+    """
+    Precompiled lexer built from the street-type tables of a StreetTypeRewriter.
+
+    The regex only splits the text into separators, civic numbers with their
+    suffixes ("10/A", "7 bis"), dotted abbreviations ("p.zza", "str.Roma")
+    and words; street types are then recognised with one dict lookup per
+    word, and a 5-digit number is a CAP. Country and province codes are
+    classified by position once the pass is done.
+    """
+
+    def __init__(self, rewriter: street_types.StreetTypeRewriter):
+        self.rewriter = rewriter
+        self._canonical: Dict[str, str] = {street_type.lower(): street_type for street_type in rewriter.street_types}
+        self._canonical.update(rewriter.replacements)
+
+        suffixes = "|".join(NUMBER_SUFFIXES)
+        self._pattern = re.compile(
+            rf"(?P<separator>,)"
+            rf"|(?P<number>\b(?P<digits>\d+)(?:\s*/\s*(?P<letter>[A-Za-z])|\s*(?P<ordinal>(?i:{suffixes}))|(?P<tail>[A-Za-z]))?\b)"
+            rf"|(?P<word>[^\W_]+(?:\.(?:[^\W\d_]+\b)?)?)"
+        )
+
+    def tokenize(self, text: str, provinces: AbstractSet[str] = frozenset()) -> List[Token]:
+        """Classify ``text`` (whitespace already normalized) into tokens."""
+        tokens: List[Token] = []
+        append = tokens.append
+        canonical = self._canonical
+        segment = 0
+        # Start of the current part, for the province check at its end
+        part_start = 0
+        for match in self._pattern.finditer(text):
+            kind = match.lastgroup
+            matched = match.group()
+            start, end = match.span()
+            if kind == WORD:
+                if "." in matched:
+                    self._split_dotted(matched, start, segment, tokens)
+                    continue
+                street_type = canonical.get(matched.lower())
+                if street_type is None:
+                    append(Token(WORD, matched, matched, start, end, segment))
+                else:
+                    append(Token(STREET_TYPE, matched, street_type, start, end, segment))
+            elif kind == NUMBER:
+                if match.group("digits") != matched:
+                    append(Token(NUMBER, matched, self._number_value(match), start, end, segment))
+                else:
+                    append(Token(CAP if len(matched) == 5 else NUMBER, matched, matched, start, end, segment))
+            else:
+                if provinces:
+                    self._mark_province(tokens, part_start, text, provinces)
+                append(Token(SEPARATOR, matched, matched, start, end, segment))
+                segment += 1
+                part_start = len(tokens)
+
+        if provinces:
+            self._mark_province(tokens, part_start, text, provinces)
+        self._mark_titles(tokens)
+        self._mark_country(tokens)
+        return tokens
+
+    def _split_dotted(self, matched: str, start: int, segment: int, tokens: List[Token]) -> None:
+        """Dotted word: an abbreviation ("p.zza"), one glued to a name ("str.Roma") or plain words ("S.")."""
+        street_type = self._canonical.get(matched.lower())
+        if street_type is not None:
+            tokens.append(Token(STREET_TYPE, matched, street_type, start, start + len(matched), segment))
+            return
+
+        offset = 0
+        head = matched[:matched.index(".") + 1]
+        street_type = self._canonical.get(head.lower())
+        if street_type is not None:
+            tokens.append(Token(STREET_TYPE, head, street_type, start, start + len(head), segment))
+            offset = len(head)
+
+        for piece in matched[offset:].split("."):
+            if piece:
+                street_type = self._canonical.get(piece.lower())
+                kind = WORD if street_type is None else STREET_TYPE
+                tokens.append(Token(kind, piece, street_type or piece, start + offset, start + offset + len(piece), segment))
+            offset += len(piece) + 1
+
+    @staticmethod
+    def _number_value(match: re.Match) -> str:
+        letter = match.group("letter") or match.group("tail")
+        if letter:
+            return match.group("digits") + letter.upper()
+        return match.group("digits") + match.group("ordinal").lower()
+
+    @staticmethod
+    def _mark_titles(tokens: List[Token]) -> None:
+        """Turn street aliases that open a part as a title ("Dr Rossi, Via Roma 3") back into words."""
+        for index in range(len(tokens) - 1):
+            token = tokens[index]
+            if (
+                token.kind == STREET_TYPE
+                and token.text.lower() in TITLES
+                and (index == 0 or tokens[index - 1].kind == SEPARATOR)
+                and tokens[index + 1].kind == WORD
+            ):
+                tokens[index] = token._replace(kind=WORD, value=token.text)
+
+    @staticmethod
+    def _mark_country(tokens: List[Token]) -> None:
+        """Turn trailing country names into COUNTRY tokens ("Corso Italia" is left alone)."""
+        index = len(tokens) - 1
+        while index >= 0:
+            token = tokens[index]
+            if token.kind == SEPARATOR:
+                index -= 1
+                continue
+            if token.kind != WORD or token.text.lower() not in COUNTRY_NAMES:
+                return
+            if index > 0 and tokens[index - 1].kind == STREET_TYPE:
+                return
+            tokens[index] = token._replace(kind=COUNTRY)
+            index -= 1
+
+    @staticmethod
+    def _mark_province(tokens: List[Token], part_start: int, text: str, provinces: AbstractSet[str]) -> None:
+        """
+        Turn the last word of the part starting at ``part_start`` (before any
+        country name) into a PROVINCE token when it is a known code written as
+        "(MI)" or "(mi)", or as "MI" after other words. Codes that double as
+        street aliases ("(CT)", "AV") are reclassified too.
+        """
+        words = 0
+        last = None
+        for index in range(part_start, len(tokens)):
+            token = tokens[index]
+            if token.kind == WORD or token.kind == STREET_TYPE:
+                words += 1
+                if token.text.lower() not in COUNTRY_NAMES:
+                    last = index
+        if last is None:
+            return
+
+        token = tokens[last]
+        if len(token.text) != 2 or token.text.upper() not in provinces:
+            return
+        enclosed = text[token.start - 1:token.start] == "(" and text[token.end:token.end + 1] == ")"
+        if enclosed or (token.text.isupper() and words > 1):
+            tokens[last] = token._replace(kind=PROVINCE, value=token.text.upper())
+
+
+def find_cap(tokens: List[Token]) -> Optional[str]:
+    """First CAP in the address."""
+    for token in tokens:
+        if token.kind == CAP:
+            return token.value
+    return None
+
+
+def find_province(tokens: List[Token]) -> Optional[str]:
+    """Last province code written in the address."""
+    for token in reversed(tokens):
+        if token.kind == PROVINCE:
+            return token.value
+    return None
+
+
+def _join(tokens: List[Token], text: str) -> str:
+    """Canonical values of consecutive tokens, keeping the punctuation between them."""
+    parts = [tokens[0].value]
+    for previous, token in zip(tokens, tokens[1:]):
+        parts.append(text[previous.end:token.start] or " ")
+        parts.append(token.value)
+    return "".join(parts)
+
+
+def _street_name_end(tokens: List[Token], index: int) -> int:
+    """Index just past the street name that follows the street type at ``index``."""
+    end = index + 1
+    if (
+        end + 1 < len(tokens)
+        and tokens[end].kind == NUMBER
+        and tokens[end + 1].kind == WORD
+        and tokens[end + 1].text.lower() in MONTHS
+    ):
+        end += 2
+    while end < len(tokens) and tokens[end].kind in (WORD, STREET_TYPE) and not tokens[end].text[0].isdigit():
+        end += 1
+    return end
+
+
+def find_street(tokens: List[Token], text: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """
+    (street name, street type, index past the name) or (None, None, None).
+
+    The name runs from the street type up to the next number or comma; when
+    several street types appear, the first occurrence of each is a candidate
+    and STREET_TYPES precedence picks among them.
+    """
+    first_seen: Dict[str, Tuple[int, int]] = {}
+    for index, token in enumerate(tokens):
+        if token.kind == STREET_TYPE and token.value not in first_seen:
+            first_seen[token.value] = (index, _street_name_end(tokens, index))
+
+    for street_type in street_types.STREET_TYPES:
+        span = first_seen.get(street_type)
+        if span and span[1] > span[0] + 1:
+            return _join(tokens[span[0] + 1:span[1]], text), street_type, span[1]
+    return None, None, None
+
+
+def find_civic_number(tokens: List[Token], street_end: Optional[int] = None) -> Optional[str]:
+    """
+    Civic number following the street name, else the first number in the
+    address. CAPs are separate tokens, so they are never taken as the number.
+    """
+    if street_end is not None and street_end < len(tokens) and tokens[street_end].kind == NUMBER:
+        return tokens[street_end].value
+    for token in tokens:
+        if token.kind == NUMBER:
+            return token.value
+    return None
+
+
+def locality_parts(tokens: List[Token], street_end: Optional[int] = None) -> List[str]:
+    """
+    Words of each comma-separated part that may name the comune, in order.
+
+    A part is cut at its first street type ("Via Roma 10") and resumes after
+    the civic number ("Via Roma 10 Milano"); a part ending in a street type
+    ("Downing Street") is dropped. CAPs, numbers, province codes, the
+    country and leading titles are skipped.
+    """
+    resume = None
+    if street_end is not None and street_end < len(tokens) and tokens[street_end].kind in (NUMBER, CAP):
+        resume = street_end + 1
+
+    parts: List[List[str]] = []
+    words: List[str] = []
+    segment = None
+    cut = False
+    for index, token in enumerate(tokens):
+        if token.segment != segment or index == resume:
+            segment = token.segment
+            words = []
+            parts.append(words)
+            cut = False
+        if cut:
+            continue
+        if token.kind == STREET_TYPE:
+            cut = True
+            if index + 1 == len(tokens) or tokens[index + 1].kind == SEPARATOR:
+                words.clear()
+        elif token.kind == WORD:
+            if not words and token.text.lower() in TITLES and index + 1 < len(tokens) and tokens[index + 1].kind == WORD:
+                continue
+            words.append(token.text)
+    return [" ".join(words) for words in parts if words]
+
+
+_tokenizer: Optional[AddressTokenizer] = None
+
+
+def tokenize(text: str, provinces: AbstractSet[str] = frozenset()) -> List[Token]:
+    """
+    Tokenize address text with the current street-type tables; ``provinces``
+    holds the province codes recognised as PROVINCE tokens.
+    """
+    global _tokenizer
+    rewriter = street_types.get_rewriter()
+    if _tokenizer is None or _tokenizer.rewriter is not rewriter:
+        # Street types were registered since the last call
+        _tokenizer = AddressTokenizer(rewriter)
+    return _tokenizer.tokenize(text, provinces)
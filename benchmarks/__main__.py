@@ -0,0 +1,269 @@
+"""
+Benchmark suite for the normalization pipeline.
+
+    python -m benchmarks run --size 2000 --seed 42 --output bench.json
+    python -m benchmarks compare baseline.json bench.json
+    python -m benchmarks load --workers 1 2 4 --concurrency 1 8 32 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from benchmarks.corpus import generate_addresses, generate_components
+from benchmarks.memory_repos import wire_memory_app
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(timings: List[float], passes: List[float], ops_per_pass: int) -> dict:
+    """Per-op latency percentiles (microseconds) and best-pass throughput."""
+    timings.sort()
+    return {
+        "ops": len(timings),
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": _percentile(timings, 0.50) * 1e6,
+        "p95_us": _percentile(timings, 0.95) * 1e6,
+        "p99_us": _percentile(timings, 0.99) * 1e6,
+        "max_us": timings[-1] * 1e6,
+        "ops_per_sec": ops_per_pass / min(passes),
+    }
+
+
+def bench_sync(func: Callable, inputs: List, repeat: int, warmup: int) -> dict:
+    for item in inputs[:warmup]:
+        func(item)
+    timings = []
+    passes = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        pass_started = clock()
+        for item in inputs:
+            started = clock()
+            func(item)
+            timings.append(clock() - started)
+        passes.append(clock() - pass_started)
+    return _summarize(timings, passes, len(inputs))
+
+
+async def bench_async(func: Callable, inputs: List, repeat: int, warmup: int) -> dict:
+    for item in inputs[:warmup]:
+        await func(item)
+    timings = []
+    passes = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        pass_started = clock()
+        for item in inputs:
+            started = clock()
+            await func(item)
+            timings.append(clock() - started)
+        passes.append(clock() - pass_started)
+    return _summarize(timings, passes, len(inputs))
+
+
+def _build_app(gazetteer):
+    """The real FastAPI app wired to in-memory repositories instead of MongoDB."""
+    from app.main import app
+
+    # Cache disabled so every request measures the full pipeline
+    return wire_memory_app(app, gazetteer)
+
+
+async def _bench_http(gazetteer, addresses: List[str], repeat: int, warmup: int) -> Dict[str, dict]:
+    import httpx
+
+    app = _build_app(gazetteer)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def normalize(address):
+            response = await client.post("/normalize", json={"address": address})
+            response.raise_for_status()
+
+        batch = addresses[:100]
+
+        async def normalize_batch(_):
+            response = await client.post("/normalize/batch", json={"addresses": batch})
+            response.raise_for_status()
+
+        return {
+            "http_normalize": await bench_async(normalize, addresses, repeat, warmup),
+            "http_normalize_batch_100": await bench_async(normalize_batch, range(max(1, len(addresses) // 100)), repeat, 1),
+        }
+
+
+def run_benchmarks(size: int, seed: int, repeat: int, only: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    from app.services.gazetteer import Gazetteer, GazetteerStore
+    from app.services.normalizer import AddressNormalizer
+    from app.services.validators import AddressValidator
+    from app.utils.street_types import normalize_street_types
+
+    addresses = generate_addresses(size, seed)
+    components = generate_components(size, seed)
+    warmup = min(size, 200)
+
+    gazetteer = Gazetteer.from_files()
+    store = GazetteerStore(gazetteer)
+    # Cache disabled so every call measures the full pipeline
+    normalizer = AddressNormalizer(store)
+    validator = AddressValidator(store)
+
+    selected = set(only or ())
+    wanted = lambda name: not selected or any(name.startswith(prefix) for prefix in selected)
+
+    results = {}
+    if wanted("normalize_street_types"):
+        results["normalize_street_types"] = bench_sync(normalize_street_types, addresses, repeat, warmup)
+    if wanted("extract_components"):
+        results["extract_components"] = bench_sync(normalizer.extract_components, addresses, repeat, warmup)
+    if wanted("validate_components"):
+        results["validate_components"] = bench_sync(validator.validate_components, components, repeat, warmup)
+    if wanted("http"):
+        results.update(asyncio.run(_bench_http(gazetteer, addresses, repeat, warmup)))
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> int:
+    results = run_benchmarks(args.size, args.seed, args.repeat, args.only)
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"size": args.size, "seed": args.seed},
+        "repeat": args.repeat,
+        "benchmarks": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, result in results.items():
+        print(f"{name:<28} {result['p50_us']:>10.1f} µs p50 {result['p95_us']:>10.1f} µs p95 "
+              f"{result['ops_per_sec']:>12.0f} ops/s", file=sys.stderr)
+    return 0
+
+
+def load(args) -> int:
+    from benchmarks.loadtest import run_load
+
+    results = run_load(args)
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "target": args.url or args.app,
+        "corpus": {"size": args.size, "seed": args.seed},
+        "batch_size": args.batch_size,
+        "duration": args.duration,
+        "load": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if any(result["requests"] == 0 for result in results) else 0
+
+
+def compare(args) -> int:
+    """Print the p50 and throughput change per benchmark; exit 1 on a regression past the threshold."""
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    if baseline.get("corpus") != candidate.get("corpus"):
+        print(f"⚠️ Corpus differs: {baseline.get('corpus')} vs {candidate.get('corpus')}", file=sys.stderr)
+
+    regressed = False
+    print(f"{'benchmark':<28} {'p50 before':>12} {'p50 after':>12} {'change':>9} {'ops/s change':>13}")
+    for name, after in candidate["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            print(f"{name:<28} {'-':>12} {after['p50_us']:>10.1f}µs {'new':>9}")
+            continue
+        change = (after["p50_us"] - before["p50_us"]) / before["p50_us"] * 100
+        throughput = (after["ops_per_sec"] - before["ops_per_sec"]) / before["ops_per_sec"] * 100
+        flag = ""
+        if change > args.threshold:
+            regressed = True
+            flag = "  ⚠️"
+        print(f"{name:<28} {before['p50_us']:>10.1f}µs {after['p50_us']:>10.1f}µs {change:>+8.1f}% {throughput:>+12.1f}%{flag}")
+    return 1 if regressed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write a JSON report")
+    run_parser.add_argument("--size", type=int, default=2000, help="Addresses in the generated corpus (default: 2000)")
+    run_parser.add_argument("--seed", type=int, default=42, help="Corpus generator seed (default: 42)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus (default: 5)")
+    run_parser.add_argument("--only", nargs="*", help="Run only benchmarks whose name starts with these prefixes")
+    run_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    run_parser.set_defaults(handler=run)
+
+    load_parser = commands.add_parser("load", help="HTTP load test with concurrency sweeps against a live server")
+    load_parser.add_argument("--scenarios", nargs="+", default=["normalize", "normalize_batch", "validate"],
+                             choices=["normalize", "normalize_batch", "validate", "validate_batch"],
+                             help="Endpoints to load (default: normalize normalize_batch validate)")
+    load_parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64],
+                             help="Requests kept in flight, one sweep level each (default: 1 4 16 64)")
+    load_parser.add_argument("--workers", nargs="+", type=int, default=[1],
+                             help="uvicorn worker counts to start a server with (default: 1)")
+    load_parser.add_argument("--app", default="benchmarks.standalone:app",
+                             help="ASGI app served by uvicorn; app.main:app needs MongoDB "
+                                  "(default: benchmarks.standalone:app, in-memory)")
+    load_parser.add_argument("--url", help="Load an already running server instead of starting one")
+    load_parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level (default: 10)")
+    load_parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each level (default: 2)")
+    load_parser.add_argument("--batch-size", type=int, default=100, help="Items per batch request (default: 100)")
+    load_parser.add_argument("--client-processes", type=int, default=1,
+                             help="Processes generating the load, for sweeps the client cannot saturate alone (default: 1)")
+    load_parser.add_argument("--size", type=int, default=2000, help="Addresses in the generated corpus (default: 2000)")
+    load_parser.add_argument("--seed", type=int, default=42, help="Corpus generator seed (default: 42)")
+    load_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    load_parser.set_defaults(handler=load)
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports")
+    compare_parser.add_argument("baseline", help="Report from the reference commit")
+    compare_parser.add_argument("candidate", help="Report from the commit under test")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="p50 slowdown (%%) reported as a regression (default: 10)")
+    compare_parser.set_defaults(handler=compare)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
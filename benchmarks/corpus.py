@@ -0,0 +1,123 @@
+"""
+Seeded generator of realistic messy Italian addresses.
+
+The same (size, seed) always yields the same corpus, so benchmark runs on
+different commits measure identical inputs.
+"""
+import random
+from typing import Dict, List, Optional
+
+from app.schemas.address import AddressComponents
+from app.services import dataset_files
+
+
+STREET_NAMES = [
+    "Roma", "Garibaldi", "Mazzini", "Cavour", "Dante", "Verdi", "Marconi",
+    "Vittorio Emanuele II", "XX Settembre", "della Repubblica", "dei Mille",
+    "San Francesco", "Matteotti", "Gramsci", "Colombo", "delle Rose",
+]
+
+# Street type spellings as they show up in user input
+STREET_TYPE_VARIANTS = {
+    "Via": ["via", "Via", "VIA", "v.", "street", "st", "road"],
+    "Piazza": ["piazza", "p.zza", "p.za", "square", "sq", "plaza"],
+    "Corso": ["corso", "c.so", "C.so"],
+    "Viale": ["viale", "v.le", "avenue", "ave", "blvd"],
+    "Largo": ["largo", "l.go"],
+    "Piazzale": ["piazzale", "p.le"],
+    "Strada": ["strada", "str."],
+    "Località": ["località", "loc.", "localita"],
+}
+
+COUNTRY_SUFFIXES = ["", "", "", ", Italia", ", Italy", " IT"]
+
+# Share of addresses drawn for each messiness scenario
+SCENARIOS = (
+    ("clean", 0.35),
+    ("english_city", 0.15),
+    ("missing_cap", 0.2),
+    ("conflicting_provincia", 0.1),
+    ("conflicting_city", 0.1),
+    ("noisy", 0.1),
+)
+
+
+class CorpusGenerator:
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.caps = dataset_files.load_caps()
+        synonyms = dataset_files.load_synonyms()
+        # English/foreign names keyed by the Italian comune they translate to
+        self.english_names: Dict[str, List[str]] = {}
+        for item in synonyms:
+            if item["type"] == "city":
+                self.english_names.setdefault(item["translation"], []).append(item["original"])
+        self.provinces = sorted({cap["provincia"] for cap in self.caps})
+        self.translated_caps = [cap for cap in self.caps if cap["comune"] in self.english_names] or self.caps
+        self._scenarios = [name for name, _ in SCENARIOS]
+        self._weights = [weight for _, weight in SCENARIOS]
+
+    def _street(self) -> str:
+        street_type = self.rng.choice(list(STREET_TYPE_VARIANTS))
+        spelling = self.rng.choice(STREET_TYPE_VARIANTS[street_type])
+        number = str(self.rng.randint(1, 250))
+        if self.rng.random() < 0.1:
+            number += self.rng.choice(["A", "B", "bis"])
+        return f"{spelling} {self.rng.choice(STREET_NAMES)} {number}"
+
+    def _other_cap(self, cap: dict) -> dict:
+        while True:
+            other = self.rng.choice(self.caps)
+            if other["comune"] != cap["comune"]:
+                return other
+
+    def address(self) -> str:
+        scenario = self.rng.choices(self._scenarios, self._weights)[0]
+        cap = self.rng.choice(self.translated_caps if scenario == "english_city" else self.caps)
+        street = self._street()
+        city = cap["comune"]
+        provincia = cap["provincia"]
+        cap_code: Optional[str] = cap["cap"]
+
+        if scenario == "english_city" and city in self.english_names:
+            city = self.rng.choice(self.english_names[city])
+        elif scenario == "missing_cap":
+            cap_code = None
+        elif scenario == "conflicting_provincia":
+            provincia = self.rng.choice([p for p in self.provinces if p != provincia])
+        elif scenario == "conflicting_city":
+            city = self._other_cap(cap)["comune"]
+        elif scenario == "noisy":
+            city = self.rng.choice([city.upper(), city.lower(), f"  {city}  "])
+            street = street.replace(" ", "  ", 1)
+
+        locality = " ".join(part for part in (cap_code, city, f"({provincia})" if self.rng.random() < 0.5 else provincia) if part)
+        return f"{street}, {locality}{self.rng.choice(COUNTRY_SUFFIXES)}"
+
+    def components(self) -> AddressComponents:
+        """Structured components for the validator, some deliberately inconsistent."""
+        cap = self.rng.choice(self.caps)
+        roll = self.rng.random()
+        comune = cap["comune"]
+        provincia = cap["provincia"]
+        if roll < 0.15:
+            comune = self._other_cap(cap)["comune"]
+        elif roll < 0.25:
+            provincia = self.rng.choice(self.provinces)
+        return AddressComponents(
+            street=f"{self.rng.choice(list(STREET_TYPE_VARIANTS))} {self.rng.choice(STREET_NAMES)}",
+            number=str(self.rng.randint(1, 250)),
+            cap=None if roll > 0.9 else cap["cap"],
+            comune=comune,
+            provincia=provincia,
+        )
+
+
+def generate_addresses(size: int, seed: int = 42) -> List[str]:
+    generator = CorpusGenerator(seed)
+    return [generator.address() for _ in range(size)]
+
+
+def generate_components(size: int, seed: int = 42) -> List[AddressComponents]:
+    generator = CorpusGenerator(seed)
+    return [generator.components() for _ in range(size)]
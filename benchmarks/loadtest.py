@@ -0,0 +1,283 @@
+"""
+End-to-end HTTP load test: concurrency sweeps against a running server.
+
+Each level keeps ``concurrency`` requests in flight (closed loop) for a fixed
+duration and reports throughput, latency percentiles and the error rate. A
+GET /health probe runs alongside the load; /health does no work, so its
+latency growing with the load means the event loop is being blocked.
+
+Servers are started with uvicorn for every requested worker count, serving
+benchmarks.standalone:app (in-memory repositories) unless another app is
+given, e.g. app.main:app against a local mongod.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.corpus import generate_addresses, generate_components
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POSTMAN_COLLECTION = os.path.join(REPO_ROOT, "Italian_Address_Service.postman_collection.json")
+
+SCENARIOS = ("normalize", "normalize_batch", "validate", "validate_batch")
+
+# Seconds between two /health probes
+PROBE_INTERVAL = 0.1
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def postman_payloads(path: str = POSTMAN_COLLECTION) -> Tuple[List[str], List[dict]]:
+    """Addresses and validation components from the example requests of the Postman collection."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+    except (OSError, ValueError):
+        return [], []
+
+    addresses: List[str] = []
+    components: List[dict] = []
+    pending = list(collection.get("item", []))
+    while pending:
+        item = pending.pop(0)
+        pending.extend(item.get("item", []))
+        raw = ((item.get("request") or {}).get("body") or {}).get("raw")
+        if not raw:
+            continue
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            continue
+        # The collection predates the current field names ("raw_address")
+        address = body.get("address") or body.get("raw_address")
+        if isinstance(address, str):
+            addresses.append(address)
+        elif isinstance(body.get("components"), dict):
+            components.append(body["components"])
+    return addresses, components
+
+
+def build_payloads(size: int, seed: int, batch_size: int) -> Dict[str, List[Tuple[str, dict]]]:
+    """(path, JSON body) requests per scenario: the Postman examples plus a generated corpus."""
+    examples, example_components = postman_payloads()
+    addresses = examples + generate_addresses(size, seed)
+    components = example_components + [
+        item.model_dump(exclude_none=True) for item in generate_components(size, seed)
+    ]
+
+    def batches(items: List) -> List[List]:
+        count = max(1, len(items) // batch_size)
+        return [items[i * batch_size:(i + 1) * batch_size] for i in range(count)]
+
+    return {
+        "normalize": [("/normalize", {"address": address}) for address in addresses],
+        "normalize_batch": [("/normalize/batch", {"addresses": batch}) for batch in batches(addresses)],
+        "validate": [("/validate", {"components": item}) for item in components],
+        "validate_batch": [("/validate/batch", {"items": batch}) for batch in batches(components)],
+    }
+
+
+async def _drive(url: str, requests: List[Tuple[str, dict]], concurrency: int,
+                 duration: float, warmup: float, seed: int, probe: bool) -> dict:
+    """Keep ``concurrency`` requests in flight for ``warmup`` + ``duration`` seconds."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    latencies: List[float] = []
+    probes: List[float] = []
+    errors = 0
+    clock = time.perf_counter
+    started = clock()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        async def user(offset: int) -> None:
+            nonlocal errors
+            index = offset
+            while True:
+                path, body = requests[index % len(requests)]
+                index += 1
+                sent = clock()
+                if sent >= stop_at:
+                    return
+                try:
+                    response = await client.post(path, json=body)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                if sent >= measure_from:
+                    latencies.append(clock() - sent)
+                    errors += failed
+
+        async def health_probe() -> None:
+            while clock() < stop_at:
+                sent = clock()
+                try:
+                    await client.get("/health")
+                except httpx.HTTPError:
+                    pass
+                if sent >= measure_from:
+                    probes.append(clock() - sent)
+                await asyncio.sleep(PROBE_INTERVAL)
+
+        rng = random.Random(seed)
+        tasks = [user(rng.randrange(len(requests))) for _ in range(concurrency)]
+        if probe:
+            tasks.append(health_probe())
+        await asyncio.gather(*tasks)
+
+    return {"latencies": latencies, "errors": errors, "probes": probes}
+
+
+def _drive_process(url, requests, concurrency, duration, warmup, seed, probe) -> dict:
+    return asyncio.run(_drive(url, requests, concurrency, duration, warmup, seed, probe))
+
+
+def run_level(url: str, requests: List[Tuple[str, dict]], concurrency: int, duration: float,
+              warmup: float, seed: int, client_processes: int = 1) -> dict:
+    """
+    One concurrency level. With several client processes the in-flight
+    requests are split between them, so the client is not the bottleneck
+    when the server has many workers.
+    """
+    processes = max(1, min(client_processes, concurrency))
+    if processes == 1:
+        parts = [asyncio.run(_drive(url, requests, concurrency, duration, warmup, seed, True))]
+    else:
+        shares = [concurrency // processes + (i < concurrency % processes) for i in range(processes)]
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [
+                pool.submit(_drive_process, url, requests, share, duration, warmup, seed + i, i == 0)
+                for i, share in enumerate(shares)
+            ]
+            parts = [future.result() for future in futures]
+
+    latencies = sorted(latency for part in parts for latency in part["latencies"])
+    probes = sorted(latency for part in parts for latency in part["probes"])
+    errors = sum(part["errors"] for part in parts)
+    count = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "throughput_rps": count / duration,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "health_p50_ms": _percentile(probes, 0.50) * 1000,
+        "health_p99_ms": _percentile(probes, 0.99) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} not ready after {timeout:.0f}s")
+
+
+class UvicornServer:
+    """uvicorn serving ``app`` with ``workers`` processes on a free local port."""
+
+    def __init__(self, app: str, workers: int, startup_timeout: float = 60.0):
+        self.app = app
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.url = f"http://127.0.0.1:{_free_port()}"
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "UvicornServer":
+        port = self.url.rsplit(":", 1)[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", self.app, "--host", "127.0.0.1", "--port", port,
+             "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=REPO_ROOT,
+        )
+        try:
+            _wait_until_ready(self.url, self.process, self.startup_timeout)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def sweep(url: str, payloads: Dict[str, List[Tuple[str, dict]]], scenarios: List[str],
+          concurrency_levels: List[int], duration: float, warmup: float, seed: int,
+          client_processes: int = 1, workers: Optional[int] = None) -> List[dict]:
+    results = []
+    for scenario in scenarios:
+        for concurrency in concurrency_levels:
+            result = run_level(url, payloads[scenario], concurrency, duration, warmup, seed, client_processes)
+            result = {"workers": workers, "scenario": scenario, **result}
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    return results
+
+
+def format_result(result: dict) -> str:
+    workers = "-" if result["workers"] is None else result["workers"]
+    return (
+        f"workers={workers:<3} {result['scenario']:<16} c={result['concurrency']:<4} "
+        f"{result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+        f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  "
+        f"errors {result['error_rate']:>6.2%}  health p99 {result['health_p99_ms']:>7.1f} ms"
+    )
+
+
+def run_load(args) -> List[dict]:
+    payloads = build_payloads(args.size, args.seed, args.batch_size)
+    options = dict(
+        scenarios=args.scenarios,
+        concurrency_levels=args.concurrency,
+        duration=args.duration,
+        warmup=args.warmup,
+        seed=args.seed,
+        client_processes=args.client_processes,
+    )
+    if args.url:
+        return sweep(args.url.rstrip("/"), payloads, **options)
+
+    results = []
+    for workers in args.workers:
+        with UvicornServer(args.app, workers) as server:
+            results.extend(sweep(server.url, payloads, workers=workers, **options))
+    return results
@@ -0,0 +1,102 @@
+"""
+In-memory stand-ins for the async repositories, so the HTTP path can be
+benchmarked without a MongoDB server. They implement the subset of the
+repository surface the routers use.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.repositories.caps_repo import CAPS_KEY
+from app.repositories.comuni_repo import COMUNI_KEY
+from app.repositories.synonyms_repo import SYNONYMS_KEY, _prepare_synonyms
+from app.repositories.sync import plan_sync
+
+
+class MemoryCollectionRepo:
+    def __init__(
+        self,
+        documents: Optional[List[dict]] = None,
+        key_fields: Sequence[str] = (),
+        prepare: Optional[Callable[[List[dict]], List[dict]]] = None
+    ):
+        # key_fields and prepare mirror the MongoDB repository's sync()
+        self.documents = list(documents or [])
+        self.key_fields = tuple(key_fields)
+        self.prepare = prepare
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def find_all(self) -> List[dict]:
+        return [dict(document) for document in self.documents]
+
+    async def insert_many(self, documents: List[dict]) -> bool:
+        self.documents.extend(documents)
+        return True
+
+    async def sync(self, documents: List[dict]) -> Dict[str, int]:
+        """Replace the documents, reporting the same change counts as the MongoDB repository."""
+        if self.prepare is not None:
+            documents = self.prepare(documents)
+        existing = [{**document, "_id": index} for index, document in enumerate(self.documents)]
+        _, counts = plan_sync(existing, documents, self.key_fields)
+
+        # First entry per key wins, as in plan_sync
+        seen = set()
+        self.documents = []
+        for document in documents:
+            key = tuple(document.get(name) for name in self.key_fields)
+            if key not in seen:
+                seen.add(key)
+                self.documents.append(dict(document))
+        return counts
+
+    async def count(self) -> int:
+        return len(self.documents)
+
+    async def clear(self) -> bool:
+        self.documents.clear()
+        return True
+
+
+class MemoryLogsRepo:
+    """Keeps only a running count, so long runs do not grow memory."""
+
+    def __init__(self):
+        self.writer = None
+        self.saved = 0
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def save(self, log_data: Dict[str, Any]) -> bool:
+        self.saved += 1
+        return True
+
+    async def save_many(self, logs_data: List[Dict[str, Any]]) -> bool:
+        self.saved += len(logs_data)
+        return True
+
+    async def count(self) -> int:
+        return self.saved
+
+
+def wire_memory_app(app, gazetteer, cache=None, fuzzy_score_cutoff: Optional[float] = 85.0):
+    """Attach in-memory repositories and services for ``gazetteer`` to ``app.state``."""
+    from app.db import PoolStatsListener
+    from app.services import dataset_files
+    from app.services.gazetteer import GazetteerStore
+    from app.services.normalizer import AddressNormalizer
+    from app.services.validators import AddressValidator
+
+    caps, comuni, synonyms = dataset_files.load_all()
+    store = GazetteerStore(gazetteer)
+    app.state.pool_stats = PoolStatsListener()
+    app.state.caps_repo = MemoryCollectionRepo(caps, CAPS_KEY)
+    app.state.comuni_repo = MemoryCollectionRepo(comuni, COMUNI_KEY)
+    app.state.synonyms_repo = MemoryCollectionRepo(_prepare_synonyms(synonyms), SYNONYMS_KEY, _prepare_synonyms)
+    app.state.logs_repo = MemoryLogsRepo()
+    app.state.gazetteer = store
+    app.state.normalization_cache = cache
+    app.state.normalizer = AddressNormalizer(store, fuzzy_score_cutoff=fuzzy_score_cutoff, cache=cache)
+    app.state.validator = AddressValidator(store)
+    return app
@@ -0,0 +1,40 @@
+"""
+The real FastAPI app served from in-memory repositories instead of MongoDB,
+for load tests on a machine without a database:
+
+    uvicorn benchmarks.standalone:app --workers 4
+
+The gazetteer is loaded the way a worker without MongoDB loads it (snapshot,
+then the bundled files); the normalization cache follows the usual settings.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.config import settings
+from app.main import app
+from app.services.cache import NormalizationCache
+from app.services.gazetteer import Gazetteer
+from app.services.snapshot import load_snapshot
+from app.utils.street_types import register_street_types
+from benchmarks.memory_repos import wire_memory_app
+
+
+@asynccontextmanager
+async def memory_lifespan(app: FastAPI):
+    if settings.extra_street_types:
+        register_street_types(settings.extra_street_types)
+
+    gazetteer = await asyncio.to_thread(load_snapshot)
+    if gazetteer is None:
+        gazetteer = await asyncio.to_thread(Gazetteer.from_files)
+    cache = (
+        NormalizationCache(settings.cache_max_entries, settings.cache_ttl_seconds)
+        if settings.cache_max_entries > 0 else None
+    )
+    wire_memory_app(app, gazetteer, cache=cache, fuzzy_score_cutoff=settings.fuzzy_score_cutoff or None)
+    yield
+
+
+app.router.lifespan_context = memory_lifespan
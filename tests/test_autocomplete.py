@@ -0,0 +1,82 @@
+from app.services.autocomplete import MAX_SUGGESTIONS, AutocompleteIndex
+
+
+ROMA_CAPS = [f"00{number}" for number in range(118, 125)]
+
+
+def _index():
+    return AutocompleteIndex([
+        ("Roma", "Roma", "RM", ROMA_CAPS),
+        ("Rome", "Roma", "RM", ROMA_CAPS),
+        ("Rovigo", "Rovigo", "RO", ["45100"]),
+        ("Rho", "Rho", "MI", ["20017"]),
+        ("Reggio Emilia", "Reggio Emilia", "RE", ["42121", "42122"]),
+        ("Milano", "Milano", "MI", ["20121", "20122"]),
+        ("Romano di Lombardia", "Romano di Lombardia", "BG", ["24058"]),
+        ("L'Aquila", "L'Aquila", "AQ", ["67100"]),
+        ("Forlì", "Forlì", "FC", ["47121"]),
+    ])
+
+
+def _matches(suggestions):
+    return [(suggestion.match, suggestion.matched) for suggestion in suggestions]
+
+
+def test_prefix_lookups():
+    index = _index()
+
+    assert _matches(index.suggest("Rov")) == [("comune", "Rovigo")]
+    assert _matches(index.suggest("rome")) == [("synonym", "Rome")]
+    assert index.suggest("rome")[0].comune == "Roma"
+    # Later words, names without spaces and accents
+    assert _matches(index.suggest("emilia")) == [("comune", "Reggio Emilia")]
+    assert _matches(index.suggest("laquila")) == [("comune", "L'Aquila")]
+    assert _matches(index.suggest("FORLI")) == [("comune", "Forlì")]
+    assert index.suggest("zz") == []
+    assert index.suggest("  ") == []
+
+
+def test_cap_prefixes():
+    index = _index()
+
+    suggestions = index.suggest("201")
+    assert [(suggestion.match, suggestion.cap, suggestion.comune) for suggestion in suggestions] == [
+        ("cap", "20121", "Milano"), ("cap", "20122", "Milano"),
+    ]
+    assert suggestions[0].cap_count == 2
+    assert index.suggest("999") == []
+
+
+def test_ranking_by_tier_then_cap_count():
+    index = _index()
+
+    # Roma (7 CAPs) ranks before smaller comuni
+    assert _matches(index.suggest("ro")) == [
+        ("comune", "Roma"), ("comune", "Romano di Lombardia"), ("comune", "Rovigo"), ("provincia", "RO"),
+    ]
+    # An exact name ranks before longer names sharing the prefix
+    assert _matches(index.suggest("roma")) == [("comune", "Roma"), ("comune", "Romano di Lombardia")]
+    # The province code ranks after the full-name matches
+    assert _matches(index.suggest("mi")) == [("comune", "Milano"), ("provincia", "MI")]
+
+
+def test_province_filter():
+    index = _index()
+
+    assert _matches(index.suggest("r", provincia="mi")) == [("comune", "Rho")]
+    assert _matches(index.suggest("20", provincia="RM")) == []
+
+
+def test_result_limit():
+    index = _index()
+
+    assert _matches(index.suggest("r", limit=2)) == [("comune", "Roma"), ("comune", "Reggio Emilia")]
+    assert index.suggest("r", limit=0) == []
+
+    many = AutocompleteIndex(
+        (f"Borgo {number}", f"Borgo {number}", "TO", [f"10{number:03d}"]) for number in range(MAX_SUGGESTIONS * 2)
+    )
+    # Precomputed short prefixes and scanned longer ones are both capped
+    assert len(many.suggest("bo", limit=1000)) == MAX_SUGGESTIONS
+    assert len(many.suggest("borgo", limit=1000)) == MAX_SUGGESTIONS
+    assert len(many.suggest("10", limit=1000)) == MAX_SUGGESTIONS
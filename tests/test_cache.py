@@ -0,0 +1,71 @@
+from app.services import cache as cache_module
+from app.services.cache import NormalizationCache
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.normalizer import AddressNormalizer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = NormalizationCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = NormalizationCache(ttl_seconds=60)
+    cache.put("a", 1)
+
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def _gazetteer(comune):
+    return Gazetteer([{"cap": "20121", "comune": comune, "provincia": "MI"}], [{"comune": comune, "provincia": "MI"}], [])
+
+
+def test_dataset_swap_invalidates_cached_results():
+    cache = NormalizationCache()
+    store = GazetteerStore(_gazetteer("Milano"))
+    normalizer = AddressNormalizer(store, cache=cache)
+    address = "Via Roma 1, 20121 Milano"
+
+    assert normalizer.extract_components(address)[0].comune == "Milano"
+    assert normalizer.extract_components(address)[0].comune == "Milano"
+    assert cache.stats()["hits"] == 1
+
+    store.swap(_gazetteer("Milano Centro"))
+
+    assert normalizer.extract_components(address)[0].comune == "Milano Centro"
+    assert cache.stats()["hits"] == 1
+
+
+def test_clear_drops_every_entry():
+    cache = NormalizationCache()
+    cache.put("a", 1)
+
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats()["clears"] == 1
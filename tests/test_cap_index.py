@@ -0,0 +1,67 @@
+from app.services.cap_index import CapRangeIndex
+
+
+def _records():
+    records = [{"cap": f"{cap:05d}", "comune": "Roma", "provincia": "RM"} for cap in range(118, 200)]
+    records += [{"cap": f"{cap}", "comune": "Milano", "provincia": "MI"} for cap in range(20121, 20163)]
+    records += [
+        {"cap": "10121", "comune": "Torino", "provincia": "TO"},
+        # A CAP shared by several comuni; the first record owns it
+        {"cap": "39040", "comune": "Castelrotto", "provincia": "BZ"},
+        {"cap": "39040", "comune": "Laion", "provincia": "BZ"},
+        {"cap": "39040", "comune": "Villandro", "provincia": "BZ"},
+        # Invalid CAPs are ignored
+        {"cap": "123", "comune": "Nowhere", "provincia": None},
+        {"cap": None, "comune": "Nowhere", "provincia": None},
+    ]
+    return records
+
+
+def test_range_boundaries():
+    index = CapRangeIndex(_records())
+
+    assert index.find_by_cap("00118")["comune"] == "Roma"
+    assert index.find_by_cap("00199") == {"cap": "00199", "comune": "Roma", "provincia": "RM"}
+    assert index.find_by_cap("00117") is None
+    assert index.find_by_cap("00200") is None
+    assert index.find_by_cap("20121")["comune"] == "Milano"
+    assert index.find_by_cap("20162")["comune"] == "Milano"
+    assert index.find_by_cap("20163") is None
+    assert index.stats()["ranges"] == 4
+
+
+def test_single_cap_range():
+    index = CapRangeIndex(_records())
+
+    assert index.find_by_cap("10121") == {"cap": "10121", "comune": "Torino", "provincia": "TO"}
+    assert index.find_by_cap("10120") is None
+    assert index.find_by_cap("10122") is None
+    assert index.find_by_comune("Torino") == [{"cap": "10121", "comune": "Torino", "provincia": "TO"}]
+    assert index.first_by_comune("Torino") == ({"cap": "10121", "comune": "Torino", "provincia": "TO"}, 1)
+
+
+def test_cap_shared_by_several_comuni():
+    index = CapRangeIndex(_records())
+
+    assert index.find_by_cap("39040")["comune"] == "Castelrotto"
+    assert [record["comune"] for record in index.find_all_by_cap("39040")] == ["Castelrotto", "Laion", "Villandro"]
+    assert index.find_by_comune("Laion") == [{"cap": "39040", "comune": "Laion", "provincia": "BZ"}]
+    assert index.stats() == {"caps": 82 + 42 + 2, "ranges": 4, "shared_caps": 1, "comuni": 6}
+
+
+def test_comune_ranges_expand_in_cap_order():
+    index = CapRangeIndex(_records())
+
+    caps = [record["cap"] for record in index.find_by_comune("Roma")]
+    assert caps == [f"{cap:05d}" for cap in range(118, 200)]
+    assert index.first_by_comune("Milano") == ({"cap": "20121", "comune": "Milano", "provincia": "MI"}, 42)
+
+
+def test_misses():
+    index = CapRangeIndex(_records())
+
+    for cap in ("99999", "00000", "abcde", "2012", "201210", "", None):
+        assert index.find_by_cap(cap) is None
+        assert index.find_all_by_cap(cap) == []
+    assert index.find_by_comune("Nowhere") == []
+    assert index.first_by_comune("Nowhere") == (None, 0)
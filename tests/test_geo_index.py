@@ -0,0 +1,32 @@
+import math
+import random
+
+from app.services.geo_index import EARTH_RADIUS_KM, GeoGridIndex
+
+
+def _entries(count=500):
+    rng = random.Random(7)
+    return [(f"C{i}", "MI", rng.uniform(36.6, 47.0), rng.uniform(6.6, 18.5), ["20100"]) for i in range(count)]
+
+
+def _brute_force(entries, lat, lon, limit):
+    def distance(entry):
+        phi1, phi2 = math.radians(lat), math.radians(entry[2])
+        a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(entry[3] - lon) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+    return [entry[0] for entry in sorted(entries, key=distance)[:limit]]
+
+
+def test_nearest_matches_brute_force_inside_and_far_outside_bounds():
+    entries = _entries()
+    index = GeoGridIndex(entries)
+
+    for lat, lon in ((45.46, 9.19), (41.9, 12.5), (0.0, 0.0), (-33.87, 151.21), (40.71, -74.0), (89.9, 179.9)):
+        assert [result.comune for result in index.nearest(lat, lon, 5)] == _brute_force(entries, lat, lon, 5)
+
+
+def test_far_point_respects_max_distance():
+    index = GeoGridIndex(_entries())
+
+    assert index.nearest(-33.87, 151.21, 5, max_distance_km=500) == []
+    assert len(index.nearest(-33.87, 151.21, 5, max_distance_km=20000)) == 5
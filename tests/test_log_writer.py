@@ -0,0 +1,111 @@
+import asyncio
+
+from app.repositories.logs_repo import BufferedLogWriter
+
+
+class Sink:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def write(self, batch):
+        if self.fail:
+            raise RuntimeError("mongo down")
+        self.batches.append(batch)
+
+    @property
+    def entries(self):
+        return [entry for batch in self.batches for entry in batch]
+
+
+def test_drop_oldest_keeps_the_newest_entries():
+    async def scenario():
+        sink = Sink()
+        writer = BufferedLogWriter(sink.write, max_queue_size=3, batch_size=100, overflow_policy="drop_oldest")
+        for number in range(5):
+            await writer.put({"n": number})
+        writer.start()
+        await writer.stop()
+        return sink, writer
+
+    sink, writer = asyncio.run(scenario())
+
+    assert sink.entries == [{"n": 2}, {"n": 3}, {"n": 4}]
+    assert (writer.enqueued, writer.dropped, writer.written) == (5, 2, 3)
+
+
+def test_sample_sheds_new_entries_past_half_full():
+    async def scenario(sample_rate):
+        sink = Sink()
+        writer = BufferedLogWriter(
+            sink.write, max_queue_size=4, batch_size=100, overflow_policy="sample", sample_rate=sample_rate
+        )
+        for number in range(10):
+            await writer.put({"n": number})
+        writer.start()
+        await writer.stop()
+        return sink, writer
+
+    sink, writer = asyncio.run(scenario(0.0))
+    assert sink.entries == [{"n": 0}, {"n": 1}]
+    assert (writer.enqueued, writer.dropped) == (2, 8)
+
+    # Every entry is admitted until the queue is full; new ones are dropped after that
+    sink, writer = asyncio.run(scenario(1.0))
+    assert sink.entries == [{"n": number} for number in range(4)]
+    assert (writer.enqueued, writer.dropped) == (4, 6)
+
+
+def test_block_waits_for_space_without_dropping():
+    async def scenario():
+        sink = Sink()
+        writer = BufferedLogWriter(sink.write, max_queue_size=2, batch_size=2, overflow_policy="block")
+        await writer.put({"n": 0})
+        await writer.put({"n": 1})
+        producer = asyncio.create_task(writer.put({"n": 2}))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        blocked = not producer.done()
+
+        writer.start()
+        await asyncio.wait_for(producer, timeout=5)
+        await writer.stop()
+        return sink, writer, blocked
+
+    sink, writer, blocked = asyncio.run(scenario())
+
+    assert blocked
+    assert sink.entries == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert writer.dropped == 0
+
+
+def test_stop_flushes_partial_batches():
+    async def scenario():
+        sink = Sink()
+        writer = BufferedLogWriter(sink.write, batch_size=3, flush_interval_seconds=60)
+        writer.start()
+        for number in range(7):
+            await writer.put({"n": number})
+        await asyncio.wait_for(writer.stop(), timeout=5)
+        return sink, writer
+
+    sink, writer = asyncio.run(scenario())
+
+    assert sink.entries == [{"n": number} for number in range(7)]
+    assert [len(batch) for batch in sink.batches] == [3, 3, 1]
+    assert not writer.running
+    assert writer.stats()["queued"] == 0
+
+
+def test_failed_batches_are_counted():
+    async def scenario():
+        writer = BufferedLogWriter(Sink(fail=True).write, batch_size=2)
+        writer.start()
+        for number in range(3):
+            await writer.put({"n": number})
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+
+    assert (writer.written, writer.failed, writer.batches) == (0, 3, 0)
@@ -0,0 +1,34 @@
+from app.services.gazetteer import Gazetteer, GazetteerStore
+from app.services.normalizer import AddressNormalizer
+
+
+def _normalizer():
+    gazetteer = Gazetteer(
+        [
+            {"cap": "20121", "comune": "Milano", "provincia": "MI"},
+            {"cap": "47121", "comune": "Forlì", "provincia": "FC"},
+        ],
+        [{"comune": "Milano", "provincia": "MI"}, {"comune": "Forlì", "provincia": "FC"}],
+        [],
+    )
+    return AddressNormalizer(GazetteerStore(gazetteer))
+
+
+def test_case_and_accent_differences_are_not_fuzzy_matches():
+    normalizer = _normalizer()
+
+    for address, comune in (("Via Roma 10, MILANO", "Milano"), ("Corso Garibaldi 5, Forli", "Forlì")):
+        components, issues = normalizer.extract_components(address)
+        assert components.comune == comune
+        assert issues == []
+
+    components, issues = normalizer.extract_components("Corso Garibaldi 5, 47121 FORLI")
+    assert components.comune == "Forlì"
+    assert issues == []
+
+
+def test_misspelled_comune_is_still_a_fuzzy_match():
+    components, issues = _normalizer().extract_components("Via Roma 10, Milno")
+
+    assert components.comune == "Milano"
+    assert issues == ["COMUNE_FUZZY_MATCHED"]
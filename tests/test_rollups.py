@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import mongomock
+
+from app.repositories.logs_repo import LogsRepo
+from app.services import analytics
+from app.services.analytics import RollupBatch
+
+
+def _entry(timestamp, latency_ms, issues=(), components=None, confidence=0.95):
+    return {
+        "timestamp": timestamp,
+        "latency_ms": latency_ms,
+        "output": {"issues": list(issues), "components": components or {}, "confidence": confidence},
+    }
+
+
+def _repo():
+    return LogsRepo(mongomock.MongoClient().db)
+
+
+def test_updates_upsert_minute_and_hour_rollups():
+    batch = RollupBatch().add_many([
+        _entry("2024-05-01T10:31:05", 3, ["CAP_UNKNOWN"], {"cap": "99999"}),
+        _entry("2024-05-01T10:31:50", 40),
+        _entry("2024-05-01T10:32:00", 7, confidence=1.0),
+    ])
+
+    upserts = {query["_id"]: update for query, update, upsert in batch.updates() if upsert}
+
+    assert set(upserts) == {"minute:2024-05-01T10:31", "minute:2024-05-01T10:32", "hour:2024-05-01T10"}
+    minute = upserts["minute:2024-05-01T10:31"]
+    assert minute["$setOnInsert"] == {"granularity": "minute", "bucket": "2024-05-01T10:31"}
+    assert minute["$inc"] == {
+        "count": 2,
+        "latency_ms.count": 2,
+        "latency_ms.sum": 43,
+        "latency_ms.buckets.3": 1,
+        "latency_ms.buckets.6": 1,
+        "confidence.9": 2,
+        "issues.CAP_UNKNOWN": 1,
+    }
+    assert minute["$max"] == {"latency_ms.max": 40}
+    hour = upserts["hour:2024-05-01T10"]
+    assert hour["$inc"]["count"] == 3
+    assert hour["$inc"]["confidence.10"] == 1
+    assert hour["$max"] == {"latency_ms.max": 40}
+
+
+def test_entries_without_a_usable_timestamp_are_skipped():
+    assert not RollupBatch().add_many([_entry(None, 3), _entry("2024-05-01", 3)])
+
+
+def test_unknown_values_are_tracked_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(analytics, "MAX_TRACKED_VALUES", 2)
+    repo = _repo()
+
+    repo._insert_entries([_entry("2024-05-01T10:31:00", 1, ["CAP_UNKNOWN"], {"cap": cap}) for cap in ("11111", "22222")])
+    repo._insert_entries([_entry("2024-05-01T10:31:30", 1, ["CAP_UNKNOWN"], {"cap": cap}) for cap in ("11111", "33333")])
+
+    rollup = repo.rollups.find_one({"_id": "minute:2024-05-01T10:31"})
+    assert rollup["unknown_caps"] == {"11111": 2, "22222": 1}
+    assert rollup["unknown_caps_tracked"] == 2
+    assert rollup["unknown_caps_other"] == 1
+    assert rollup["count"] == 4
+
+
+def test_rebuild_replaces_rollups_before_the_cutoff_only():
+    repo = _repo()
+    repo.col.insert_many([
+        _entry("2024-05-01T09:10:00", 5),
+        _entry("2024-05-01T09:50:00", 5),
+        _entry("2024-05-01T10:05:00", 5),
+    ])
+    repo.rollups.insert_many([
+        # Stale counts before the cutoff are replaced
+        {"_id": "hour:2024-05-01T09", "granularity": "hour", "bucket": "2024-05-01T09", "count": 99},
+        # Buckets before the cutoff without log entries are dropped
+        {"_id": "hour:2024-05-01T08", "granularity": "hour", "bucket": "2024-05-01T08", "count": 1},
+        # Live writers own the buckets from the cutoff on
+        {"_id": "hour:2024-05-01T10", "granularity": "hour", "bucket": "2024-05-01T10", "count": 7},
+        {"_id": "minute:2024-05-01T10:05", "granularity": "minute", "bucket": "2024-05-01T10:05", "count": 7},
+    ])
+
+    total, cutoff = repo.rebuild_rollups(cutoff=datetime(2024, 5, 1, 10, 40))
+
+    assert (total, cutoff) == (2, "2024-05-01T10")
+    counts = {rollup["_id"]: rollup["count"] for rollup in repo.rollups.find()}
+    assert counts == {
+        "hour:2024-05-01T09": 2,
+        "minute:2024-05-01T09:10": 1,
+        "minute:2024-05-01T09:50": 1,
+        "hour:2024-05-01T10": 7,
+        "minute:2024-05-01T10:05": 7,
+    }
+    assert "normalization_rollups_rebuild" not in repo.rollups.database.list_collection_names()
@@ -0,0 +1,46 @@
+from app.services.stradario import ALL_NUMBERS, EVEN, ODD, StreetIndex, street_issues
+
+
+def _issues(index, street, number, cap=None):
+    return street_issues(index.find("Milano", street, number, "MI"), cap)
+
+
+def test_capless_row_covering_the_whole_street():
+    index = StreetIndex([("Milano", "MI", "Via Roma", None, 0, 0, ALL_NUMBERS)])
+
+    match = index.find("Milano", "Via Roma", "5", "MI")
+
+    assert match.number_covered is True
+    assert match.number_caps == ()
+    assert street_issues(match, "20121") == []
+
+
+def test_capless_range_only_covers_its_numbers():
+    index = StreetIndex([("Milano", "MI", "Via Roma", None, 1, 9, ODD)])
+
+    assert _issues(index, "Via Roma", "5") == []
+    assert _issues(index, "Via Roma", "6") == ["CIVIC_NUMBER_OUT_OF_RANGE"]
+    assert _issues(index, "Via Roma", "11") == ["CIVIC_NUMBER_OUT_OF_RANGE"]
+
+
+def test_ranges_map_numbers_to_caps():
+    index = StreetIndex([
+        ("Milano", "MI", "Via Roma", "20121", 1, 99, ODD),
+        ("Milano", "MI", "Via Roma", "20122", 2, 0, EVEN),
+    ])
+
+    assert index.find("Milano", "Via Roma", "7", "MI").number_caps == ("20121",)
+    assert index.find("Milano", "Via Roma", "200", "MI").number_caps == ("20122",)
+    assert _issues(index, "Via Roma", "7", "20122") == ["STREET_CAP_MISMATCH"]
+    assert _issues(index, "Via Roma", "101") == ["CIVIC_NUMBER_OUT_OF_RANGE"]
+    assert _issues(index, "Via Verdi", "1") == ["STREET_NOT_FOUND"]
+
+
+def test_no_number_checks_street_caps_only():
+    index = StreetIndex([("Milano", "MI", "Via Roma", "20121", 1, 9, ODD)])
+
+    match = index.find("Milano", "Via Roma", None, "MI")
+
+    assert match.number_covered is None
+    assert street_issues(match, "20121") == []
+    assert street_issues(match, "20122") == ["STREET_CAP_MISMATCH"]
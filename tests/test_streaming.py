@@ -0,0 +1,57 @@
+import asyncio
+import io
+
+from app.services import streaming
+
+
+def _rows(records, parse):
+    rows = []
+    for record in records:
+        try:
+            rows.append((parse(record), None))
+        except ValueError as e:
+            rows.append((str(record), str(e)))
+    return rows
+
+
+def test_unterminated_quote_rejects_only_its_row():
+    source = io.StringIO('address\nVia "Roma 10, Milano\nVia Po 3, Torino\n"Via Dante 7, Bergamo"\n')
+    records = streaming.iter_csv_records(streaming.iter_text_lines(source))
+    parser = streaming.CsvRowParser(next(records))
+
+    assert _rows(records, parser.parse) == [
+        ('Via "Roma 10, Milano', "Unterminated quoted field"),
+        ("Via Po 3", None),
+        ("Via Dante 7, Bergamo", None),
+    ]
+
+
+def test_unterminated_quote_is_bounded_by_record_lines():
+    lines = ['"Via Roma 10'] + [f"Via Po {number}" for number in range(1, 200)]
+    records = list(streaming.iter_csv_records(lines))
+
+    assert isinstance(records[0], streaming.RejectedRecord)
+    assert records[1:] == lines[1:]
+
+
+def test_quoted_field_spanning_lines_is_one_record():
+    records = list(streaming.iter_csv_records(['"Via Roma 10', 'Milano"', "Via Po 3"]))
+
+    assert records == ['"Via Roma 10\nMilano"', "Via Po 3"]
+
+
+def test_overlong_line_is_rejected_and_skipped():
+    async def chunks():
+        yield b'{"address": "Via Po 3, Torino"}\n'
+        for _ in range(3):
+            yield b"x" * streaming.MAX_LINE_LENGTH
+        yield b'\n{"address": "Via Roma 10, Milano"}\n'
+
+    async def collect():
+        return [line async for line in streaming.iter_lines(chunks())]
+
+    rows = _rows(asyncio.run(collect()), streaming.parse_ndjson_line)
+
+    assert rows[0] == ("Via Po 3, Torino", None)
+    assert rows[1][1] == f"Line longer than {streaming.MAX_LINE_LENGTH} characters"
+    assert rows[2] == ("Via Roma 10, Milano", None)
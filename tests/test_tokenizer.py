@@ -0,0 +1,89 @@
+from app.utils import tokenizer
+
+
+def _street(text):
+    tokens = tokenizer.tokenize(text)
+    name, street_type, end = tokenizer.find_street(tokens, text)
+    return street_type, name, tokenizer.find_civic_number(tokens, end)
+
+
+def test_leading_dr_is_a_title_not_a_street_alias():
+    assert _street("Dr Rossi, Via Roma 3") == ("Via", "Roma", "3")
+    assert _street("Dr. Rossi, Via Roma 3, Milano") == ("Via", "Roma", "3")
+    assert _street("dr rossi via roma 3 milano") == ("Via", "roma", "3")
+    assert tokenizer.locality_parts(tokenizer.tokenize("Dr Rossi, Milano")) == ["Rossi", "Milano"]
+
+
+PROVINCES = frozenset({"MI", "RM", "TO", "CT"})
+
+
+def _parse(text):
+    tokens = tokenizer.tokenize(text, PROVINCES)
+    name, street_type, end = tokenizer.find_street(tokens, text)
+    return {
+        "cap": tokenizer.find_cap(tokens),
+        "province": tokenizer.find_province(tokens),
+        "street": (street_type, name),
+        "number": tokenizer.find_civic_number(tokens, end),
+        "localities": tokenizer.locality_parts(tokens, end),
+    }
+
+
+def test_full_address_components():
+    assert _parse("Via Roma 10, 20121 Milano (MI), Italia") == {
+        "cap": "20121",
+        "province": "MI",
+        "street": ("Via", "Roma"),
+        "number": "10",
+        "localities": ["Milano"],
+    }
+
+
+def test_comma_less_address():
+    assert _parse("via roma 10 20121 milano MI") == {
+        "cap": "20121",
+        "province": "MI",
+        "street": ("Via", "roma"),
+        "number": "10",
+        "localities": ["milano"],
+    }
+
+
+def test_street_type_abbreviations_and_civic_suffixes():
+    assert _parse("P.zza Garibaldi 7/A, Napoli")["street"] == ("Piazza", "Garibaldi")
+    assert _parse("P.zza Garibaldi 7/A, Napoli")["number"] == "7A"
+    assert _parse("str.Roma 3 Torino")["street"] == ("Strada", "Roma")
+    assert _parse("Viale Monza 120 bis Milano")["number"] == "120bis"
+
+
+def test_numbers_inside_street_names():
+    parsed = _parse("Via 4 Novembre 12, Roma RM")
+
+    assert parsed["street"] == ("Via", "4 Novembre")
+    assert parsed["number"] == "12"
+    assert parsed["province"] == "RM"
+    assert parsed["cap"] is None
+
+
+def test_province_codes_and_country_names_need_their_position():
+    # A street alias written as an enclosed province code is the province
+    assert _parse("Via Etnea 10, Catania (CT)")["province"] == "CT"
+    # A lowercase code standing alone is a word, not a province
+    assert _parse("Via Po 3, to")["province"] is None
+    # "Italia" after a street type is a street name, not the country
+    assert _parse("Corso Italia 5, Milano")["street"] == ("Corso", "Italia")
+
+
+def test_titles_are_dropped_from_locality_parts():
+    assert _parse("Prof. Bianchi, Corso Vercelli 9, Torino")["localities"] == ["Bianchi", "Torino"]
+    assert _parse("Sig Bianchi, Torino")["localities"] == ["Sig Bianchi", "Torino"]
+
+
+def test_part_ending_in_a_street_type_is_not_a_locality():
+    assert _parse("Downing Street, London") == {
+        "cap": None,
+        "province": None,
+        "street": (None, None),
+        "number": None,
+        "localities": ["London"],
+    }